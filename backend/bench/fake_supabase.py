@@ -0,0 +1,481 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+# PostgREST on Supabase returns at most this many rows per request
+MAX_ROWS = 1000
+
+# Conflict target of each table (what upsert merges on); "id" is assumed otherwise
+PRIMARY_KEYS = {
+    "player_game": ("player_id", "game_id"),
+    "pending_game": ("game_id",),
+    "gameweek": ("gameweek",),
+    "squad_player": ("squad_id", "player_id"),
+    "squad_lineup": ("squad_id", "gameweek", "player_id"),
+    "squad_gameweek_points": ("squad_id", "gameweek"),
+    "squad_season_points": ("squad_id",),
+    "player_aggregate": ("player_id",),
+    "player_transfer_stats": ("player_id",),
+}
+
+
+# -----------------------------
+# Filters
+# -----------------------------
+
+def _coerce(value, like):
+    """Cast a filter literal to the type of the stored value it's compared with."""
+    if value is None or like is None:
+        return value
+    if isinstance(like, bool):
+        return str(value).lower() == "true"
+    if isinstance(like, int):
+        return int(value)
+    if isinstance(like, float):
+        return float(value)
+    return str(value)
+
+
+class _InList(list):
+    """in_() values with their coerced sets cached per column type."""
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.sets = {}
+
+
+def _in_set(values, kind):
+    if not isinstance(values, _InList):
+        return {_coerce(v, kind()) for v in values}
+    if kind not in values.sets:
+        values.sets[kind] = {_coerce(v, kind()) for v in values}
+    return values.sets[kind]
+
+
+def _compare(op, left, right):
+    if op == "is":
+        return left is None if str(right).lower() == "null" else left == _coerce(right, True)
+    if op == "in":
+        return left is not None and left in _in_set(right, type(left))
+    if left is None:
+        return False
+
+    right = _coerce(right, left)
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }[op]
+
+
+def _split_top_level(text):
+    """Split a PostgREST logic string on commas outside parentheses and quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and quoted:
+            i += 2
+            continue
+        if c == '"':
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and c == ",":
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _parse_logic(text):
+    """Parse `a.gt.1,and(a.eq.1,b.gt.2)` into a predicate over a row."""
+    clauses = []
+    for part in _split_top_level(text):
+        if part.startswith(("and(", "or(")) and part.endswith(")"):
+            name, inner = part.split("(", 1)
+            nested = _parse_logic(inner[:-1])
+            combine = all if name == "and" else any
+            clauses.append(lambda row, nested=nested, combine=combine: combine(p(row) for p in nested))
+        else:
+            column, op, value = part.split(".", 2)
+            negate = op == "not"
+            if negate:
+                op, value = value.split(".", 1)
+            value = _unquote(value)
+            if op == "in":
+                value = _InList(_unquote(v) for v in _split_top_level(value.strip("()")))
+            clauses.append(
+                lambda row, c=column, o=op, v=value, n=negate: _compare(o, row.get(c), v) != n
+            )
+    return clauses
+
+
+def _parse_keyset(text):
+    """
+    Recognize table_reader's keyset filter `k1.gt.x,and(k1.eq.x,k2.gt.y)`
+    and return (keys, last), or None for any other `or` filter.
+    """
+    keys, last = [], []
+    for i, part in enumerate(_split_top_level(text)):
+        terms = _split_top_level(part[4:-1]) if part.startswith("and(") and part.endswith(")") else [part]
+        if len(terms) != i + 1:
+            return None
+        for j, term in enumerate(terms):
+            column, op, value = term.split(".", 2)
+            if op != ("gt" if j == i else "eq") or (j < i and (column, _unquote(value)) != (keys[j], last[j])):
+                return None
+        column, _, value = terms[-1].split(".", 2)
+        keys.append(column)
+        last.append(_unquote(value))
+    return (tuple(keys), tuple(last)) if keys else None
+
+
+# -----------------------------
+# Query builder
+# -----------------------------
+
+class FakeQuery:
+    """The subset of the postgrest-py request builder this repo uses."""
+
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.on_conflict = None
+        self.count = None
+        self.returning = "representation"
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+        self.lookup = None  # (column, values) of the first eq / in filter, served from an index
+        self.seek = None    # (keys, last) of a keyset page filter, served from a sorted copy
+        self._negate = False
+
+    # actions
+    def select(self, columns="*", count=None):
+        self.action, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, rows, count=None, returning="representation"):
+        self.action, self.payload, self.count = "insert", rows, count
+        self.returning = str(returning)
+        return self
+
+    def upsert(self, rows, on_conflict="", count=None, returning="representation", ignore_duplicates=False):
+        self.action, self.payload, self.count = "upsert", rows, count
+        self.on_conflict = on_conflict or None
+        self.returning = str(returning)
+        return self
+
+    def update(self, values, count=None, returning="representation"):
+        self.action, self.payload, self.count = "update", values, count
+        self.returning = str(returning)
+        return self
+
+    def delete(self, count=None, returning="representation"):
+        self.action, self.count = "delete", count
+        self.returning = str(returning)
+        return self
+
+    # filters
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _filter(self, column, op, value):
+        negate, self._negate = self._negate, False
+        if self.lookup is None and not negate and op in ("eq", "in"):
+            self.lookup = (column, value if op == "in" else [value])
+        if self.seek is None and not negate and op == "gt":
+            self.seek = ((column,), (value,))
+        self.filters.append(lambda row: _compare(op, row.get(column), value) != negate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", _InList(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters):
+        clauses = _parse_logic(filters)
+        if self.seek is None:
+            self.seek = _parse_keyset(filters)
+        self.filters.append(lambda row: any(c(row) for c in clauses))
+        return self
+
+    # modifiers
+    def order(self, column, desc=False, nullsfirst=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self.row_limit = size
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+
+class FakeRPC:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        return self.client._call_rpc(self.name, self.params)
+
+
+# -----------------------------
+# Client
+# -----------------------------
+
+class FakeSupabase:
+    """
+    In-process stand-in for the Supabase client: tables live in dicts keyed
+    by primary key, queries are evaluated in Python and every request is
+    counted. Enough of the table/RPC API for the pipelines to run unchanged.
+
+    rpcs: {name: fn(db, params) -> data} for the database functions used.
+    latency: seconds slept per request, to model network round trips.
+    """
+
+    def __init__(self, tables=None, rpcs=None, latency=0.0, primary_keys=None):
+        self.tables = {}
+        self.rpcs = dict(rpcs or {})
+        self.latency = latency
+        self.primary_keys = {**PRIMARY_KEYS, **(primary_keys or {})}
+        self.requests = Counter()     # "table.action" -> requests
+        self.rows_written = Counter()  # table -> rows inserted / upserted / updated
+        self._next_id = Counter()
+        self._versions = Counter()  # table -> writes, invalidates _indexes
+        self._indexes = {}          # (table, column) -> (version, {value: [row keys]})
+        self._sorted = {}           # (table, columns) -> (version, sort keys, rows)
+        self._lock = threading.RLock()
+
+        for table_name, rows in (tables or {}).items():
+            self.load(table_name, rows)
+
+    def table(self, table_name):
+        return FakeQuery(self, table_name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self, name, params or {})
+
+    # direct access for fixtures and RPC implementations
+    def rows(self, table_name):
+        return list(self.tables.get(table_name, {}).values())
+
+    def load(self, table_name, rows):
+        with self._lock:
+            for row in rows:
+                self._store(table_name, dict(row), merge=False)
+
+    def mark_changed(self, table_name):
+        """Call after editing rows() in place (e.g. from an RPC)."""
+        self._versions[table_name] += 1
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.rows_written.clear()
+
+    # -----------------------------
+    # Evaluation
+    # -----------------------------
+
+    def _key_columns(self, table_name, on_conflict=None):
+        if on_conflict:
+            return tuple(c.strip() for c in on_conflict.split(","))
+        return self.primary_keys.get(table_name, ("id",))
+
+    def _store(self, table_name, row, merge, key_columns=None, reject_duplicates=False):
+        table = self.tables.setdefault(table_name, {})
+        self._versions[table_name] += 1
+        key_columns = key_columns or self._key_columns(table_name)
+        if key_columns == ("id",) and row.get("id") is None:
+            self._next_id[table_name] += 1
+            row["id"] = self._next_id[table_name]
+        elif key_columns == ("id",) and isinstance(row["id"], int):
+            self._next_id[table_name] = max(self._next_id[table_name], row["id"])
+
+        key = tuple(row.get(c) for c in key_columns)
+        if key in table and reject_duplicates:
+            raise APIError({
+                "code": "23505",
+                "message": f'duplicate key value violates unique constraint "{table_name}_pkey"',
+            })
+        if merge and key in table:
+            table[key].update(row)
+        else:
+            table[key] = row
+        return table[key]
+
+    def _index(self, table_name, column):
+        version = self._versions[table_name]
+        cached = self._indexes.get((table_name, column))
+        if cached is None or cached[0] != version:
+            index = {}
+            for key, row in self.tables.get(table_name, {}).items():
+                index.setdefault(row.get(column), []).append(key)
+            cached = self._indexes[(table_name, column)] = (version, index)
+        return cached[1]
+
+    def _sorted_rows(self, table_name, columns):
+        version = self._versions[table_name]
+        cached = self._sorted.get((table_name, columns))
+        if cached is None or cached[0] != version:
+            rows = sorted(
+                (r for r in self.tables.get(table_name, {}).values() if all(r.get(c) is not None for c in columns)),
+                key=lambda r: tuple(r[c] for c in columns),
+            )
+            cached = self._sorted[(table_name, columns)] = (version, [tuple(r[c] for c in columns) for r in rows], rows)
+        return cached[1], cached[2]
+
+    def _seek(self, query, limit):
+        """
+        Keyset page as an index seek: bisect past the last key in a sorted
+        copy and scan forward until the page is full. Only valid when the
+        page is ordered by exactly the keyset columns (ascending).
+        """
+        keys, last = query.seek
+        if query.lookup is not None or [(c, False) for c in keys] != query.orders:
+            return None
+        sort_keys, rows = self._sorted_rows(query.table_name, keys)
+        if not rows:
+            return []
+        start = bisect_right(sort_keys, tuple(_coerce(v, s) for v, s in zip(last, sort_keys[0])))
+
+        page = []
+        for row in rows[start:]:
+            if all(f(row) for f in query.filters):
+                page.append(row)
+                if len(page) == limit:
+                    break
+        return page
+
+    def _matching(self, query):
+        table = self.tables.get(query.table_name, {})
+        candidates = table.values()
+        if query.lookup is not None:
+            column, values = query.lookup
+            index = self._index(query.table_name, column)
+            sample = next((v for v in index if v is not None), None)
+            wanted = {_coerce(v, sample) for v in values}
+            candidates = [table[k] for v in wanted for k in index.get(v, ())]
+        return [r for r in candidates if all(f(r) for f in query.filters)]
+
+    def _project(self, row, columns):
+        if columns.strip() == "*":
+            return dict(row)
+        return {c: row.get(c) for c in (c.strip() for c in columns.split(","))}
+
+    def _execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests[f"{query.table_name}.{query.action}"] += 1
+            rows = getattr(self, f"_{query.action}")(query)
+
+        count = getattr(query, "total", len(rows)) if query.count else None
+        if query.action != "select" and "minimal" in query.returning:
+            rows = []
+        return SimpleNamespace(data=rows, count=count)
+
+    def _select(self, query):
+        limit = min(query.row_limit or MAX_ROWS, MAX_ROWS)
+        rows = self._seek(query, limit) if query.seek else None
+        if rows is not None:
+            return [self._project(r, query.columns) for r in rows]
+
+        rows = self._matching(query)
+        query.total = len(rows)   # an exact count ignores the limit, as in PostgREST
+        for column, desc in reversed(query.orders):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        return [self._project(r, query.columns) for r in rows[:limit]]
+
+    def _insert(self, query):
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        table = self.tables.setdefault(query.table_name, {})
+        snapshot = dict(table), self._next_id[query.table_name]
+        try:
+            stored = [self._store(query.table_name, dict(r), merge=False, reject_duplicates=True) for r in rows]
+        except APIError:
+            # A statement either fully lands or not at all
+            self.tables[query.table_name], self._next_id[query.table_name] = snapshot
+            self._versions[query.table_name] += 1
+            raise
+        self.rows_written[query.table_name] += len(stored)
+        return [dict(r) for r in stored]
+
+    def _upsert(self, query):
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        key_columns = self._key_columns(query.table_name, query.on_conflict)
+        stored = [self._store(query.table_name, dict(r), merge=True, key_columns=key_columns) for r in rows]
+        self.rows_written[query.table_name] += len(stored)
+        return [dict(r) for r in stored]
+
+    def _update(self, query):
+        if not query.filters:
+            raise APIError({"code": "21000", "message": "UPDATE requires a WHERE clause"})
+        rows = self._matching(query)
+        self._versions[query.table_name] += 1
+        for r in rows:
+            r.update(query.payload)
+        self.rows_written[query.table_name] += len(rows)
+        return [dict(r) for r in rows]
+
+    def _delete(self, query):
+        if not query.filters:
+            raise APIError({"code": "21000", "message": "DELETE requires a WHERE clause"})
+        table = self.tables.get(query.table_name, {})
+        self._versions[query.table_name] += 1
+        doomed = [k for k, r in table.items() if all(f(r) for f in query.filters)]
+        return [table.pop(k) for k in doomed]
+
+    def _call_rpc(self, name, params):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests[f"rpc.{name}"] += 1
+            if name not in self.rpcs:
+                raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{name}"})
+            return SimpleNamespace(data=self.rpcs[name](self, params), count=None)
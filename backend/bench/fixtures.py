@@ -0,0 +1,271 @@
+import json
+import os
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from backend.scripts.nba_cache import cache_key
+
+SEASON_START = date(2025, 10, 21)
+TEAM_IDS = list(range(1610612737, 1610612767))  # the 30 NBA team ids
+ROSTER_SIZE = 15
+ROOKIES_PER_TEAM = 1        # in box scores but not yet in the player table
+CAREER_SEASONS = [f"{y}-{str(y + 1)[2:]}" for y in range(2015, 2025)]
+POSITIONS = ["Guard", "Forward", "Center"]
+
+# Data sizes the benchmark runs at
+SIZES = {
+    "night":  {"days": 1,   "games_per_day": 8, "history_players": 30, "squads": 200},
+    "month":  {"days": 30,  "games_per_day": 8, "history_players": 150, "squads": 2000},
+    "season": {"days": 165, "games_per_day": 8, "history_players": len(TEAM_IDS) * ROSTER_SIZE, "squads": 20000},
+}
+SQUAD_POSITIONS = {"Guard": 5, "Forward": 5, "Center": 3}
+STARTERS = 10
+
+
+# -----------------------------
+# Synthetic league
+# -----------------------------
+
+def game_dates(days):
+    return [SEASON_START + timedelta(days=i) for i in range(days)]
+
+
+def build_league(seed=0):
+    """Teams, rostered players (stored) and rookies (only in box scores)."""
+    rng = random.Random(seed)
+    players, rookies = [], []
+    next_id = 1_620_000
+
+    for team_id in TEAM_IDS:
+        for slot in range(ROSTER_SIZE + ROOKIES_PER_TEAM):
+            next_id += 1
+            birth_year = rng.randint(1986, 2006)
+            player = {
+                "id": next_id,
+                "first_name": f"Player{next_id}",
+                "last_name": f"Team{team_id % 100}",
+                "pos": POSITIONS[slot % 3],
+                "team_id": team_id,
+                "height_in": rng.randint(72, 88),
+                "weight_lb": rng.randint(170, 280),
+                "birthdate": f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "price": None,
+                "current_price": None,
+            }
+            (rookies if slot >= ROSTER_SIZE else players).append(player)
+
+    return players, rookies
+
+
+def stat_line(rng, minutes):
+    fga = rng.randint(0, minutes // 2)
+    fgm = rng.randint(0, fga)
+    tpa = rng.randint(0, fga)
+    tpm = rng.randint(0, min(tpa, fgm))
+    fta = rng.randint(0, 10)
+    ftm = rng.randint(0, fta)
+    return {
+        "points": 2 * (fgm - tpm) + 3 * tpm + ftm,
+        "reboundsTotal": rng.randint(0, 15),
+        "assists": rng.randint(0, 12),
+        "steals": rng.randint(0, 4),
+        "blocks": rng.randint(0, 4),
+        "turnovers": rng.randint(0, 6),
+        "threePointersMade": tpm,
+        "threePointersAttempted": tpa,
+        "fieldGoalsMade": fgm,
+        "fieldGoalsAttempted": fga,
+        "freeThrowsMade": ftm,
+        "freeThrowsAttempted": fta,
+        "minutes": f"PT{minutes:02d}M00.00S",
+    }
+
+
+def squad_players(rng, squads, players):
+    """Random legal squads: 13 players, 10 starters, captain, vice and bench_order 1-3."""
+    by_pos = defaultdict(list)
+    for p in players:
+        by_pos[p["pos"]].append(p["id"])
+
+    rows = []
+    for squad_id in range(1, squads + 1):
+        picks = [pid for pos, k in SQUAD_POSITIONS.items() for pid in rng.sample(by_pos[pos], k)]
+        rng.shuffle(picks)
+        for slot, pid in enumerate(picks):
+            rows.append({
+                "squad_id": squad_id,
+                "player_id": pid,
+                "is_starting": slot < STARTERS,
+                "is_captain": slot == 0,
+                "is_vice_captain": slot == 1,
+                "bench_order": slot - STARTERS + 1 if slot >= STARTERS else None,
+            })
+    return rows
+
+
+def box_score(rng, game_id, day, home, away, roster_by_team):
+    """A final LIVE box score `game` dict for home vs away."""
+    def side(team_id):
+        players = []
+        for p in roster_by_team[team_id]:
+            minutes = rng.choice([0, 0] + list(range(4, 41)))
+            players.append({"personId": p["id"], "statistics": stat_line(rng, minutes)})
+        return {"teamId": team_id, "score": rng.randint(90, 130), "players": players}
+
+    return {
+        "gameId": game_id,
+        "gameTimeUTC": f"{day.isoformat()}T00:00:00Z",
+        "gameStatus": 3,
+        "homeTeam": side(home),
+        "awayTeam": side(away),
+    }
+
+
+def career(rng, player_id, team_id):
+    """PlayerCareerStats normalized dict with 1-10 regular seasons."""
+    seasons = CAREER_SEASONS[-rng.randint(1, len(CAREER_SEASONS)):]
+    rows = []
+    for season_id in seasons:
+        gp = rng.randint(10, 82)
+        rows.append({
+            "SEASON_ID": season_id, "TEAM_ID": team_id,
+            "PTS": rng.randint(0, 30) * gp, "REB": rng.randint(0, 12) * gp, "AST": rng.randint(0, 10) * gp,
+            "STL": rng.randint(0, 2) * gp, "BLK": rng.randint(0, 2) * gp, "TOV": rng.randint(0, 4) * gp,
+            "FG3M": rng.randint(0, 3) * gp, "FG3A": rng.randint(0, 8) * gp, "FGM": rng.randint(0, 10) * gp,
+            "FGA": rng.randint(0, 20) * gp, "FTM": rng.randint(0, 6) * gp, "FTA": rng.randint(0, 8) * gp,
+            "MIN": rng.randint(5, 38) * gp, "GP": gp, "GS": rng.randint(0, gp),
+        })
+    return {"SeasonTotalsRegularSeason": rows}
+
+
+def common_player_info(player):
+    return {"CommonPlayerInfo": [{
+        "PERSON_ID": player["id"],
+        "FIRST_NAME": player["first_name"],
+        "LAST_NAME": player["last_name"],
+        "POSITION": player["pos"],
+        "TEAM_ID": player["team_id"],
+        "HEIGHT": f"{player['height_in'] // 12}-{player['height_in'] % 12}",
+        "WEIGHT": str(player["weight_lb"]),
+        "BIRTHDATE": player["birthdate"],
+    }]}
+
+
+# -----------------------------
+# Recorded responses
+# -----------------------------
+
+def write_fixture(cache_dir, endpoint, params, data):
+    """Store a response exactly as nba_cache would have recorded it."""
+    path = os.path.join(cache_dir, endpoint, f"{cache_key(endpoint, params)}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"endpoint": endpoint, "params": params, "fetched_at": 0, "expires_at": None, "data": data}, f)
+
+
+def build_dataset(size, cache_dir, seed=0):
+    """
+    Write nba_api fixtures for `size` into cache_dir (for NBA_CACHE_MODE=replay)
+    and return the matching starting database: {table: rows}.
+    """
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    players, rookies = build_league(seed)
+
+    roster_by_team = defaultdict(list)
+    for p in players + rookies:
+        roster_by_team[p["team_id"]].append(p)
+
+    pending, game_number = [], 0
+    for day in game_dates(spec["days"]):
+        teams = rng.sample(TEAM_IDS, spec["games_per_day"] * 2)
+        available = []
+        for home, away in zip(teams[::2], teams[1::2]):
+            game_number += 1
+            game_id = f"00225{game_number:05d}"
+            write_fixture(cache_dir, "live_boxscore", {"game_id": game_id},
+                          box_score(rng, game_id, day, home, away, roster_by_team))
+            available.append({"GAME_ID": game_id})
+            pending.append({"game_id": game_id, "game_date": day.isoformat(), "processed": False})
+
+        write_fixture(cache_dir, "scoreboardv2", {"game_date": day.isoformat(), "league_id": "00"},
+                      {"Available": available})
+
+    for p in players + rookies:
+        write_fixture(cache_dir, "commonplayerinfo", {"player_id": p["id"]}, common_player_info(p))
+        write_fixture(cache_dir, "playercareerstats", {"player_id": p["id"]}, career(rng, p["id"], p["team_id"]))
+
+    gameweeks = [
+        {
+            "gameweek": week + 1,
+            "start_date": (SEASON_START + timedelta(weeks=week)).isoformat(),
+            "end_date": (SEASON_START + timedelta(weeks=week, days=6)).isoformat(),
+        }
+        for week in range(26)
+    ]
+
+    return {
+        "player": [dict(p) for p in players],
+        "gameweek": gameweeks,
+        "pending_game": pending,
+        "squad_player": squad_players(rng, spec["squads"], players),
+    }
+
+
+# -----------------------------
+# Database functions
+# -----------------------------
+
+def rpc_get_player_averages(db, params):
+    """Per-player season averages from player_game (the get_player_averages SQL function)."""
+    games = pd.DataFrame(db.rows("player_game"))
+    if games.empty:
+        return []
+    return (
+        games.groupby("player_id")
+        .agg(
+            avg_fp=("score", "mean"),
+            avg_pts=("points", "mean"),
+            avg_reb=("rebounds", "mean"),
+            avg_ast=("assists", "mean"),
+            avg_stl=("steals", "mean"),
+            avg_blk=("blocks", "mean"),
+            avg_minutes=("minutes", "mean"),
+            games_played=("game_id", "count"),
+        )
+        .reset_index()
+        .to_dict("records")
+    )
+
+
+def rpc_update_player_prices(db, params):
+    players = db.tables.get("player", {})
+    for update in params["price_updates"]:
+        row = players.get((update["id"],))
+        if row is not None:
+            row.update(price=update["price"], updated_at=update["updated_at"])
+    db.mark_changed("player")
+    db.rows_written["player"] += len(params["price_updates"])
+    return None
+
+
+def rpc_commit_transfer_run(db, params):
+    for row in params["p_stats"]:
+        db._store("player_transfer_stats", dict(row), merge=True)
+    db._store("transfer_state", {
+        "id": 1, "last_trade_id": params["p_last_trade_id"], "pending_ids": list(params["p_pending_ids"]),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, merge=True)
+    db.rows_written["player_transfer_stats"] += len(params["p_stats"])
+    db.rows_written["transfer_state"] += 1
+    return None
+
+
+RPCS = {
+    "get_player_averages": rpc_get_player_averages,
+    "update_player_prices": rpc_update_player_prices,
+    "commit_transfer_run": rpc_commit_transfer_run,
+}
@@ -0,0 +1,244 @@
+"""
+End-to-end pipeline benchmark, fully offline.
+
+Runs the ingest, history, squad scoring and pricing jobs against FakeSupabase and nba_api
+fixtures replayed from a throwaway cache, at several data sizes, and reports
+per-stage latency, request counts, rows written and peak memory.
+
+    python -m backend.bench.run                       # every size
+    python -m backend.bench.run --sizes night month --json log/bench.json
+    python -m backend.bench.run --baseline log/bench.json   # exit 1 on regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.bench.fixtures import RPCS, SIZES, build_dataset, game_dates
+
+STAGES = ["init_player_history", "process_pending_games", "main_for_date", "squad_scoring", "init_player_prices"]
+TIME_TOLERANCE = 0.25   # fraction slower than baseline before a stage is flagged
+TIME_FLOOR = 0.05       # seconds; ignore noise on very fast stages
+
+
+# -----------------------------
+# Sandbox
+# -----------------------------
+
+def _block_network():
+    """Fail loudly if anything tries to leave the process."""
+    def refuse(*args, **kwargs):
+        raise RuntimeError("network access attempted during offline benchmark")
+
+    socket.create_connection = refuse
+    socket.socket.connect = refuse
+
+
+class Sandbox:
+    """Points every pipeline module at one FakeSupabase and the fixture cache."""
+
+    def __init__(self):
+        self.db = None
+        self.nba_requests = Counter()
+
+        import supabase
+        supabase.create_client = lambda *args, **kwargs: self.db
+
+        from backend.scripts import nba_cache
+        self.nba_cache = nba_cache
+        nba_cache.CACHE_MODE = "replay"
+        replay = nba_cache.cached_request
+
+        def counted(endpoint, *args, **kwargs):
+            self.nba_requests[endpoint] += 1
+            return replay(endpoint, *args, **kwargs)
+
+        nba_cache.cached_request = counted
+
+    def use(self, db, cache_dir):
+        from backend.scripts import gameweek_calendar, init_player_history, init_player_prices
+
+        self.db = db
+        self.nba_cache.CACHE_DIR = cache_dir
+        init_player_history.supabase = db
+        init_player_prices.create_client = lambda *args, **kwargs: db
+        gameweek_calendar.get_calendar(db, refresh=True)
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+
+def run_stage(sandbox, name, fn, trace_memory=True, verbose=False):
+    sandbox.db.reset_counters()
+    sandbox.nba_requests.clear()
+    if trace_memory:
+        tracemalloc.start()
+
+    out = sys.stdout if verbose else io.StringIO()
+    error = None
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            fn()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "db_requests": sum(sandbox.db.requests.values()),
+        "nba_requests": sum(sandbox.nba_requests.values()),
+        "rows_written": sum(sandbox.db.rows_written.values()),
+        "peak_mb": round(peak / 2**20, 2) if peak is not None else None,
+        "db_requests_by_kind": dict(sandbox.db.requests),
+        "error": error,
+    }
+
+
+def score_all_gameweeks(db, days):
+    from backend.scripts import squad_scoring
+    from backend.scripts.gameweek_calendar import get_calendar
+    from backend.scripts.table_reader import read_dataframe
+
+    weeks = sorted(set(get_calendar(db).lookup_many(game_dates(days)).tolist()))
+    # Fixture squads never change, so squad_player stands in for every week's snapshot
+    lineups = read_dataframe(
+        db, squad_scoring.LIVE_LINEUP_TABLE, squad_scoring.LINEUP_COLUMNS, key=("squad_id", "player_id"),
+    )
+    for gameweek in weeks:
+        squad_scoring.score_gameweek(db, gameweek, lineups)
+
+
+def bench_size(sandbox, size, workdir, stages, latency=0.0, seed=0, trace_memory=True, verbose=False):
+    from backend.scripts import fetch_box, init_player_history, init_player_prices
+
+    cache_dir = os.path.join(workdir, "fixtures", size)
+    tables = build_dataset(size, cache_dir, seed)
+    db = FakeSupabase(tables, rpcs=RPCS, latency=latency)
+    sandbox.use(db, cache_dir)
+
+    spec = SIZES[size]
+    player_ids = [p["id"] for p in tables["player"]][:spec["history_players"]]
+    journal = os.path.join(workdir, "log", f"bench_journal_{size}.jsonl")
+
+    pipeline = {
+        "init_player_history": lambda: init_player_history.ingest_player_history(
+            player_ids, journal_path=journal, restart=True, rate=1000),
+        "process_pending_games": lambda: fetch_box.process_pending_games(db),
+        # Same nights again: measures the idempotent rerun path
+        "main_for_date": lambda: [fetch_box.main_for_date(d, db) for d in game_dates(spec["days"])],
+        "squad_scoring": lambda: score_all_gameweeks(db, spec["days"]),
+        "init_player_prices": init_player_prices.main,
+    }
+
+    results = []
+    for name in stages:
+        result = run_stage(sandbox, name, pipeline[name], trace_memory, verbose)
+        result["size"] = size
+        results.append(result)
+        print(format_row(result))
+    return results
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+HEADER = f"{'size':<8} {'stage':<24} {'seconds':>9} {'db_reqs':>8} {'nba_reqs':>9} {'rows':>8} {'peak_MB':>8}"
+
+
+def format_row(r):
+    peak = f"{r['peak_mb']:.1f}" if r["peak_mb"] is not None else "-"
+    line = (f"{r['size']:<8} {r['stage']:<24} {r['seconds']:>9.3f} {r['db_requests']:>8} "
+            f"{r['nba_requests']:>9} {r['rows_written']:>8} {peak:>8}")
+    return line + (f"  ❌ {r['error']}" if r["error"] else "")
+
+
+def compare(results, baseline, tolerance=TIME_TOLERANCE):
+    """Regressions vs a previous --json run: more requests, or notably slower."""
+    previous = {(r["size"], r["stage"]): r for r in baseline["results"]}
+    problems = []
+    for r in results:
+        old = previous.get((r["size"], r["stage"]))
+        if old is None:
+            continue
+        if r["error"] and not old["error"]:
+            problems.append(f"{r['size']}/{r['stage']}: now fails ({r['error']})")
+        if r["db_requests"] > old["db_requests"]:
+            problems.append(f"{r['size']}/{r['stage']}: db requests {old['db_requests']} → {r['db_requests']}")
+        if r["nba_requests"] > old["nba_requests"]:
+            problems.append(f"{r['size']}/{r['stage']}: nba requests {old['nba_requests']} → {r['nba_requests']}")
+        if r["seconds"] > old["seconds"] * (1 + tolerance) and r["seconds"] - old["seconds"] > TIME_FLOOR:
+            problems.append(f"{r['size']}/{r['stage']}: {old['seconds']:.3f}s → {r['seconds']:.3f}s")
+    return problems
+
+
+# -----------------------------
+# Main
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the backend pipelines.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per Supabase request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE, help="allowed slowdown vs baseline")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows every stage)")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    # Jobs write log/, test_data/ etc. relative to cwd; keep them in the scratch dir
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="squad-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    _block_network()
+    sandbox = Sandbox()
+
+    print(f"Benchmark workdir: {workdir}")
+    print(HEADER)
+    results = []
+    for size in args.sizes:
+        results += bench_size(sandbox, size, workdir, args.stages, args.latency_ms / 1000,
+                              args.seed, not args.no_memory, args.verbose)
+
+    if json_path:
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"latency_ms": args.latency_ms, "seed": args.seed, "results": results}, f, indent=2)
+        print(f"📁 Results written to {json_path}")
+
+    failed = [r for r in results if r["error"]]
+    problems = compare(results, baseline, args.tolerance) if baseline else []
+    for p in problems:
+        print(f"⚠️ Regression: {p}")
+
+    sys.exit(1 if failed or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
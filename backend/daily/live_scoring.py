@@ -0,0 +1,19 @@
+from backend.scripts.live_scoring import run_live_scoring
+from supabase import create_client
+import os
+import sys
+
+def main():
+    supabase = create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_SERVICE_KEY")
+    )
+
+    # Optional first arg: stop after N minutes (keeps each workflow run bounded)
+    max_minutes = float(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    print("Evening job: Live scoring in-progress games...")
+    run_live_scoring(supabase, max_minutes=max_minutes)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,35 @@
 from backend.scripts.fetch_box import process_pending_games
+from backend.scripts.metrics import instrument_supabase, job
+from backend.scripts.reprice import reprice_changed_players
+from backend.scripts.squad_scoring import gameweeks_for_games, score_gameweek
 from supabase import create_client
+import argparse
 import os
 
 def main():
-    supabase = create_client(
+    parser = argparse.ArgumentParser(description="Process pending NBA games.")
+    parser.add_argument("--force", action="store_true", help="rewrite rows even if their stats_hash is unchanged")
+    parser.add_argument("--date", help="replay every pending game on YYYY-MM-DD, processed or not")
+    parser.add_argument("--profile", action="store_true", help="dump cProfile output to log/profile")
+    args = parser.parse_args()
+
+    supabase = instrument_supabase(create_client(
         os.getenv("SUPABASE_URL"),
         os.getenv("SUPABASE_SERVICE_KEY")
-    )
+    ))
 
     print("Morning job: Processing pending games...")
-    process_pending_games(supabase)
+    with job("process_pending_games", profile=args.profile):
+        landed = process_pending_games(supabase, force=args.force, game_date=args.date)
+
+        # Refresh squad points for every gameweek the new games fall in
+        # (each from the lineups locked for that gameweek)
+        for gameweek in gameweeks_for_games(supabase, landed) if landed else []:
+            score_gameweek(supabase, gameweek)
+
+        # Move prices of the players who just played (full rebalance stays in init_player_prices)
+        if landed:
+            reprice_changed_players(supabase)
 
 if __name__ == "__main__":
     main()
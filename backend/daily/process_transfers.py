@@ -0,0 +1,22 @@
+from backend.scripts.metrics import instrument_supabase, job
+from backend.scripts.transfer_engine import process_transfers
+from supabase import create_client
+import argparse
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description="Count new trades and move prices on transfer demand.")
+    parser.add_argument("--refresh-ownership", action="store_true", help="reseed owner counts from squad_player")
+    args = parser.parse_args()
+
+    supabase = instrument_supabase(create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_SERVICE_KEY")
+    ))
+
+    print("Transfers job: Counting new trades...")
+    with job("process_transfers"):
+        process_transfers(supabase, refresh_ownership=args.refresh_ownership)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from backend.scripts.metrics import instrument_supabase, job
+from backend.scripts.squad_scoring import current_gameweek, snapshot_lineups
+from supabase import create_client
+import os
+
+def main():
+    supabase = instrument_supabase(create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_SERVICE_KEY")
+    ))
+
+    gameweek = current_gameweek(supabase)
+    if gameweek is None:
+        print("No gameweek starts today; nothing to lock.")
+        return
+
+    print(f"Lock job: Snapshotting lineups for gameweek {gameweek}...")
+    with job("snapshot_lineups"):
+        snapshot_lineups(supabase, gameweek)
+
+if __name__ == "__main__":
+    main()
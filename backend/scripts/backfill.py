@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from backend.scripts.fetch_box import build_game, commit_games, get_gameweek_for_date
+from backend.scripts.nba_cache import get_live_box_score, get_scoreboard
+from backend.scripts.rate_limiter import AdaptiveRateLimiter, set_limiter
+from backend.scripts.roster_cache import RosterCache
+
+load_dotenv()
+
+PROGRESS_FILE = os.path.join("log", "backfill_progress.jsonl")
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0  # nba_api requests / second, shared by all workers
+
+# -----------------------------
+# Progress checkpoint
+# -----------------------------
+
+def load_completed_dates(path=PROGRESS_FILE):
+    """Dates already checkpointed by a previous run."""
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                done.add(json.loads(line)["date"])
+    return done
+
+
+def checkpoint_date(target_date, games, path=PROGRESS_FILE):
+    """Append a completed date; one line per date so a kill can't corrupt it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "date": target_date.isoformat(),
+            "games": games,
+            "finished_at": datetime.now().isoformat(),
+        }) + "\n")
+
+# -----------------------------
+# Fetch / write stages
+# -----------------------------
+
+def date_range(start_date, end_date):
+    current = start_date
+    while current <= end_date:
+        yield current
+        current += timedelta(days=1)
+
+
+def fetch_date(target_date):
+    """
+    Download the scoreboard and every box score for target_date.
+    Unlike get_game_ids_for_date, errors propagate so a failed date is
+    never checkpointed as empty.
+    """
+    game_ids = [g["GAME_ID"] for g in get_scoreboard(target_date)["Available"]]
+    return [(gid, get_live_box_score(gid)) for gid in game_ids]
+
+
+def backfill(supabase, start_date, end_date, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+             progress_path=PROGRESS_FILE, restart=False, force=False):
+    """
+    Ingest every date in [start_date, end_date]. Dates are fetched
+    concurrently under one shared rate limit, then transformed and written
+    on this thread as they arrive. Each fully written date is checkpointed,
+    so rerunning the same command resumes where a killed run stopped.
+    """
+    done = set() if restart else load_completed_dates(progress_path)
+    todo = [d for d in date_range(start_date, end_date) if d.isoformat() not in done]
+
+    print(f"Backfilling {len(todo)} dates ({len(done)} already done) with {workers} workers at {rate} req/s")
+    if not todo:
+        return
+
+    set_limiter(AdaptiveRateLimiter(rate, burst=workers))
+    roster = RosterCache(supabase)
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_date, d): d for d in todo}
+        for future in as_completed(futures):
+            target_date = futures[future]
+            try:
+                boxes = future.result()
+                gameweek = get_gameweek_for_date(supabase, target_date)
+                games = [build_game(gid, game, gameweek, supabase, roster) for gid, game in boxes]
+
+                landed = commit_games(supabase, games, roster, force=force)
+                if len(landed) != len(games):
+                    raise RuntimeError(f"only {len(landed)}/{len(games)} games committed")
+
+                checkpoint_date(target_date, len(games), progress_path)
+                print(f"✅ {target_date}: {len(games)} games")
+
+            except Exception as e:
+                failed.append(target_date)
+                print(f"❌ {target_date}: {e}")
+
+    roster.flush()
+
+    if failed:
+        print(f"{len(failed)} dates failed, rerun to retry: {', '.join(str(d) for d in sorted(failed))}")
+    else:
+        print("✅ Backfill complete.")
+
+# -----------------------------
+# Main
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable box score backfill for a date range.")
+    parser.add_argument("start_date", help="YYYY-MM-DD")
+    parser.add_argument("end_date", help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="dates fetched at once")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="starting nba_api requests per second (adapts to errors)")
+    parser.add_argument("--progress", default=PROGRESS_FILE, help="checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and redo every date")
+    parser.add_argument("--force", action="store_true", help="rewrite rows even if their stats_hash is unchanged")
+    args = parser.parse_args()
+
+    start_date = datetime.strptime(args.start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(args.end_date, "%Y-%m-%d").date()
+
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+    backfill(supabase, start_date, end_date, args.workers, args.rate, args.progress, args.restart, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,224 @@
-def insert_in_batches(supabase, rows, table_name, batch_size=100):
-    total = len(rows)
-    print(f"Inserting {total} rows in batches of {batch_size} into Supabase {table_name}...")
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import httpx
+from postgrest.exceptions import APIError
+
+from backend.scripts.metrics import incr
+
+DEAD_LETTER_DIR = os.path.join("log", "dead_letter")
+
+MAX_RETRIES = 4
+BASE_DELAY = 0.5          # seconds, doubled per retry
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 1000
+TARGET_BATCH_SECONDS = 2.0
+MAX_PAYLOAD_BYTES = 2_000_000
+
+# Postgres codes worth retrying: serialization failure, deadlock,
+# statement timeout, too many connections
+TRANSIENT_PG_CODES = {"40001", "40P01", "57014", "53300"}
+
+
+def is_transient(exc):
+    """Network blips, gateway 5xx and retryable Postgres errors."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        return code in TRANSIENT_PG_CODES or (len(code) == 3 and code.startswith("5"))
+    return False
+
+
+def is_payload_too_large(exc):
+    return isinstance(exc, APIError) and str(exc.code or "") == "413"
+
+
+def is_row_error(exc):
+    """
+    Errors caused by the rows themselves, which bisecting can isolate:
+    data exceptions (22xxx), constraint violations (23xxx) and bodies
+    PostgREST can't map to the columns (PGRST102, e.g. mismatched keys).
+    Schema, auth and not-found errors fail every row the same way.
+    """
+    if not isinstance(exc, APIError):
+        return False
+    code = str(exc.code or "")
+    return (len(code) == 5 and code[:2] in ("22", "23")) or code == "PGRST102"
 
-    for i in range(0, total, batch_size):
-        batch = rows[i:i+batch_size]
+
+def _send(supabase, table_name, batch, on_conflict=None):
+    """One insert (or upsert, with on_conflict) request, retried with backoff + jitter on transient errors."""
+    for attempt in range(MAX_RETRIES + 1):
         try:
-            supabase.table(table_name).insert(batch).execute()
-            print(f"✅ Inserted rows {i+1}-{i+len(batch)}")
+            if on_conflict:
+                supabase.table(table_name).upsert(batch, on_conflict=on_conflict).execute()
+            else:
+                supabase.table(table_name).insert(batch).execute()
+            return
         except Exception as e:
-            print(f"❌ Error inserting batch {i+1}-{i+len(batch)}: {e}")
-            # Optionally: write the failed batch to a file for retry
+            if not is_transient(e) or attempt == MAX_RETRIES:
+                raise
+            incr("supabase.retries")
+            delay = random.uniform(0, BASE_DELAY * 2 ** attempt)
+            print(f"⏳ Transient error on {table_name} ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _insert_bisecting(supabase, table_name, batch, dead, on_conflict=None):
+    """
+    Insert batch; if rows are rejected, split it in half and recurse until
+    the offending rows are isolated. Those rows (or a whole batch that keeps
+    failing transiently) are appended to `dead` as (row, error). Any other
+    error (unknown column, missing table, auth) would fail every row, so it
+    is raised instead of dead-lettering the whole table row by row.
+    Returns the number of rows written.
+    """
+    try:
+        _send(supabase, table_name, batch, on_conflict)
+        return len(batch)
+    except Exception as e:
+        if is_transient(e):
+            dead.extend((row, str(e)) for row in batch)
+            return 0
+        if not (is_row_error(e) or is_payload_too_large(e)):
+            raise
+        if len(batch) == 1:
+            dead.extend((row, str(e)) for row in batch)
+            return 0
+
+    mid = len(batch) // 2
+    return (
+        _insert_bisecting(supabase, table_name, batch[:mid], dead, on_conflict)
+        + _insert_bisecting(supabase, table_name, batch[mid:], dead, on_conflict)
+    )
+
+
+def write_dead_letters(table_name, dead, path=None, on_conflict=None):
+    """Append failed rows to a JSONL dead-letter file for later replay."""
+    path = path or os.path.join(DEAD_LETTER_DIR, f"{table_name}.jsonl")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    failed_at = datetime.now().isoformat()
+    with open(path, "a", encoding="utf-8") as f:
+        for row, error in dead:
+            entry = {"table": table_name, "row": row, "error": error, "failed_at": failed_at}
+            if on_conflict:
+                entry["on_conflict"] = on_conflict
+            f.write(json.dumps(entry, default=str) + "\n")
+    return path
+
+
+def upsert_in_batches(supabase, rows, table_name, on_conflict, batch_size=MAX_BATCH_SIZE):
+    """
+    Upsert rows in fixed-size batches, for rebuildable tables where a
+    failed batch should just fail the job (no retry or dead letters).
+    Returns the number of rows sent.
+    """
+    for i in range(0, len(rows), batch_size):
+        supabase.table(table_name).upsert(rows[i:i + batch_size], on_conflict=on_conflict).execute()
+    incr(f"rows.{table_name}", len(rows))
+    return len(rows)
+
+
+def insert_in_batches(supabase, rows, table_name, batch_size=100, dead_letter_path=None,
+                      on_conflict=None, failed=None):
+    """
+    Insert rows in batches without losing any of them. With on_conflict
+    (e.g. "player_id,season_id,team_id") rows are upserted, so a rerun
+    doesn't duplicate them.
+
+    - transient errors are retried with backoff
+    - rejected batches are bisected to isolate the bad rows
+    - bad rows go to a dead-letter file (replay with replay_dead_letters)
+    - batch size grows while batches are fast and shrinks when they are
+      slow or the payload gets too big
+
+    Returns the number of rows written; the dead-lettered rows are also
+    appended to `failed` when a list is given.
+    """
+    total = len(rows)
+    print(f"Inserting {total} rows in batches of ~{batch_size} into Supabase {table_name}...")
+
+    size = batch_size
+    written = 0
+    dead = []
+    i = 0
+
+    while i < total:
+        batch = rows[i:i + size]
+
+        payload_bytes = len(json.dumps(batch, default=str))
+        if payload_bytes > MAX_PAYLOAD_BYTES and len(batch) > 1:
+            size = max(1, len(batch) * MAX_PAYLOAD_BYTES // payload_bytes)
+            continue
+
+        started = time.monotonic()
+        ok = _insert_bisecting(supabase, table_name, batch, dead, on_conflict)
+        elapsed = time.monotonic() - started
+        written += ok
+
+        if ok == len(batch):
+            print(f"✅ Inserted rows {i+1}-{i+len(batch)}")
+        else:
+            print(f"⚠️ Inserted {ok}/{len(batch)} rows {i+1}-{i+len(batch)}")
+
+        # Adapt to observed latency
+        if elapsed < TARGET_BATCH_SECONDS / 2:
+            size = min(MAX_BATCH_SIZE, size * 2)
+        elif elapsed > TARGET_BATCH_SECONDS:
+            size = max(MIN_BATCH_SIZE, size // 2)
+
+        i += len(batch)
+
+    incr(f"rows.{table_name}", written)
+    if dead:
+        incr("rows.dead_letter", len(dead))
+        path = write_dead_letters(table_name, dead, dead_letter_path, on_conflict)
+        if failed is not None:
+            failed.extend(row for row, _ in dead)
+        print(f"❌ {len(dead)} rows failed and were written to {path}")
+
+    return written
+
+
+def replay_dead_letters(supabase, path):
+    """
+    Re-submit every row in a dead-letter file. Rows that fail again are
+    written to a fresh dead-letter file; the replayed file is archived.
+    """
+    if not os.path.exists(path):
+        print(f"No dead letters at {path}")
+        return 0
+
+    archived = f"{path}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.replayed"
+    os.replace(path, archived)
+
+    by_table = {}
+    with open(archived, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                by_table.setdefault((entry["table"], entry.get("on_conflict")), []).append(entry["row"])
+
+    written = 0
+    for (table_name, on_conflict), rows in by_table.items():
+        written += insert_in_batches(supabase, rows, table_name, dead_letter_path=path, on_conflict=on_conflict)
+
+    print(f"Replayed {written} rows from {archived}")
+    return written
+
+
+if __name__ == "__main__":
+    # python -m backend.scripts.batching log/dead_letter/player_history.jsonl
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+    for dead_letter_file in sys.argv[1:]:
+        replay_dead_letters(supabase, dead_letter_file)
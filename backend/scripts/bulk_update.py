@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+import pandas as pd
+from postgrest.types import CountMethod, ReturnMethod
+
+from backend.scripts.table_reader import IN_CHUNK_SIZE, chunked, read_dataframe
+
+PRICE_COLUMNS = ["price", "base_price", "current_price"]
+
+
+def all_rows(query):
+    """Default filter: Supabase rejects UPDATE without a WHERE clause."""
+    return query.not_.is_("id", "null")
+
+
+def bulk_update(supabase, table_name, values, where=all_rows):
+    """
+    Set `values` on every row matching `where` with a single set-based
+    UPDATE request. `where` takes the query and adds PostgREST filters,
+    e.g. lambda q: q.is_("price", "null").
+
+    Returns the number of rows updated.
+    """
+    query = supabase.table(table_name).update(values, count=CountMethod.exact, returning=ReturnMethod.minimal)
+    response = where(query).execute()
+    return response.count or 0
+
+
+def bulk_update_by_value(supabase, table_name, column, values_by_id, extra=None, chunk_size=IN_CHUNK_SIZE):
+    """
+    Chunked fallback for per-row values: ids sharing the same new value are
+    updated together, one `id in (...)` request per value (per chunk).
+    Prices move in 0.5 steps, so a whole league is ~20 requests, not 550.
+    """
+    ids_by_value = defaultdict(list)
+    for row_id, value in values_by_id.items():
+        ids_by_value[value].append(row_id)
+
+    updated = 0
+    for value, ids in ids_by_value.items():
+        for chunk in chunked(ids, chunk_size):
+            updated += bulk_update(
+                supabase, table_name, {column: value, **(extra or {})},
+                where=lambda q, chunk=chunk: q.in_("id", chunk),
+            )
+    return updated
+
+
+def fetch_player_prices(supabase, player_ids=None):
+    """
+    player_id, price, base_price and current_price (floats, NaN = null) of
+    player_ids, or of every player when None.
+    """
+    columns = "id, " + ", ".join(PRICE_COLUMNS)
+    if player_ids is None:
+        frames = [read_dataframe(supabase, "player", columns)]
+    else:
+        frames = [
+            read_dataframe(supabase, "player", columns, where=lambda q, chunk=chunk: q.in_("id", chunk))
+            for chunk in chunked(player_ids)
+        ]
+    frames = [f for f in frames if not f.empty]
+    prices = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["id", *PRICE_COLUMNS])
+    prices = prices.reindex(columns=["id", *PRICE_COLUMNS]).rename(columns={"id": "player_id"})
+    prices["player_id"] = prices["player_id"].astype("int64")
+    for column in PRICE_COLUMNS:
+        prices[column] = pd.to_numeric(prices[column], errors="coerce").astype("float64")
+    return prices
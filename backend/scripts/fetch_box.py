@@ -1,19 +1,38 @@
 import csv
+import hashlib
 import json
 
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timedelta
 import re
 from dotenv import load_dotenv
 from supabase import create_client
-from nba_api.stats.endpoints import scoreboardv2
-from nba_api.live.nba.endpoints import boxscore, scoreboard
 
 from backend.scripts.init_players import get_player_details
+from backend.scripts.nba_cache import get_live_box_score, get_live_scoreboard, get_scoreboard
+from backend.scripts.gameweek_calendar import get_calendar
+from backend.scripts.metrics import incr, span, timed
+from backend.scripts.player_aggregates import update_player_aggregates
+from backend.scripts.roster_cache import RosterCache
+from backend.scripts.scoring import SCORING_WEIGHTS, calculate_scores, score_rows
+from backend.scripts.table_reader import chunked, iter_rows
 # from logger_config import daily_job_logger
 
 load_dotenv()
 
+# Max box scores downloaded at once
+BOX_SCORE_CONCURRENCY = int(os.getenv("BOX_SCORE_CONCURRENCY", "8"))
+
+# Unique key of player_game, used as the upsert conflict target
+PLAYER_GAME_KEY = "player_id,game_id"
+
+# Everything in a player_game row that goes into its stats_hash
+PLAYER_GAME_STAT_FIELDS = [
+    "points", "rebounds", "assists", "steals", "blocks", "turnovers",
+    "3pm", "3pa", "fgm", "fga", "ftm", "fta", "minutes", "score",
+]
+
 def save_csv(filename, rows):
     """Save a list of dicts to CSV."""
     if not rows:
@@ -37,22 +56,16 @@ def save_csv(filename, rows):
 
 def get_gameweek_for_date(supabase, target_date):
     """Return the gameweek number that target_date falls into."""
-    resp = supabase.table("gameweek").select("gameweek, start_date, end_date").execute()
-    for gw in resp.data:
-        start = datetime.strptime(gw["start_date"], "%Y-%m-%d").date()
-        end = datetime.strptime(gw["end_date"], "%Y-%m-%d").date()
-        if start <= target_date <= end:
-            return gw["gameweek"]
-    return 1
+    return get_calendar(supabase).lookup(target_date)
 
 
 def insert_todays_pending_games(supabase):
     print("Fetching today's games (LIVE API)...")
 
     try:
-        sb = scoreboard.ScoreBoard()
-        data = sb.get_dict()["scoreboard"]["games"]
-        sb_date = sb.score_board_date
+        sb = get_live_scoreboard()
+        data = sb["games"]
+        sb_date = sb["date"]
 
         rows = []
         for g in data:
@@ -71,61 +84,247 @@ def insert_todays_pending_games(supabase):
     except Exception as e:
         print("Error inserting today's games:", e)
 
-def get_unprocessed_pending_games(supabase):
-    resp = supabase.table("pending_game") \
-        .select("game_id") \
-        .eq("processed", False) \
-        .execute()
+def get_unprocessed_pending_games(supabase, game_date=None):
+    """
+    Pending game IDs still to process. With game_date, every pending game
+    on that date is returned, processed or not (for replaying a night).
+    """
+    def where(query):
+        if game_date is None:
+            return query.eq("processed", False)
+        return query.eq("game_date", str(game_date))
 
-    return [row["game_id"] for row in resp.data]
+    # Paged: a backlog or a replayed season can exceed one 1000-row response
+    return [row["game_id"] for row in iter_rows(supabase, "pending_game", "game_id", key="game_id", where=where)]
 
-def process_pending_games(supabase):
-    pending = get_unprocessed_pending_games(supabase)
+def fetch_box_scores(game_ids, max_workers=None):
+    """
+    Download LIVE box scores for game_ids in parallel.
+    Yields (game_id, game, error) as each download finishes, so callers can
+    transform and write a game while the rest are still in flight.
+    """
+    if not game_ids:
+        return
 
-    print(f"Found {len(pending)} pending games to process")
+    max_workers = max(1, min(max_workers or BOX_SCORE_CONCURRENCY, len(game_ids)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_box_score, gid): gid for gid in game_ids}
+        for future in as_completed(futures):
+            gid = futures[future]
+            try:
+                yield gid, future.result(), None
+            except Exception as e:
+                yield gid, None, e
+
+@timed("fetch.box_score", log=False)
+def fetch_box_score(game_id):
+    return get_live_box_score(game_id)
+
+@timed("transform", log=False)
+def build_game(game_id, game, gameweek, supabase, roster):
+    """Transform one LIVE box score into the rows commit_games writes."""
+    return {
+        "game_id": game_id,
+        "game": get_game_details_for_game(game, gameweek),
+        "player_games": get_player_details_for_game(game, supabase, roster),
+    }
+
+def player_game_hash(row):
+    """Content hash of a player_game stat line (stored as stats_hash)."""
+    line = json.dumps([row.get(f) for f in PLAYER_GAME_STAT_FIELDS], separators=(",", ":"))
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()
+
+def fetch_player_game_hashes(supabase, game_ids):
+    """{(player_id, game_id): stats_hash} for rows already stored for game_ids."""
+    hashes = {}
+
+    # A season replay can cover 1000+ games; keep each `in.(...)` URL short
+    for chunk in chunked(game_ids):
+        rows = iter_rows(
+            supabase, "player_game", "player_id, game_id, stats_hash",
+            key=("game_id", "player_id"),
+            where=lambda q, chunk=chunk: q.in_("game_id", chunk),
+        )
+        hashes.update({(r["player_id"], r["game_id"]): r.get("stats_hash") for r in rows})
+    return hashes
+
+@timed("fetch.stored_hashes")
+def drop_unchanged_games(supabase, games):
+    """
+    Remove player_game rows whose stats_hash matches what is stored, and
+    whole games where every row matched. Returns (changed_games, skipped_rows).
+    """
+    stored = fetch_player_game_hashes(
+        supabase, [p["game_id"] for g in games for p in g["player_games"]]
+    )
 
-    for gid in pending:
+    changed_games, skipped = [], 0
+    for g in games:
+        rows = [
+            p for p in g["player_games"]
+            if stored.get((p["player_id"], p["game_id"])) != p["stats_hash"]
+        ]
+        skipped += len(g["player_games"]) - len(rows)
+        if rows or not g["player_games"]:
+            changed_games.append({**g, "player_games": rows})
+    return changed_games, skipped
+
+@timed("write")
+def commit_games(supabase, games, roster=None, force=False):
+    """
+    Write every processed game with one request per table:
+    a single `game` upsert and a single `player_game` upsert.
+    player_game upserts on (player_id, game_id) so games already written by
+    live scoring (or an earlier partial run) are updated, not duplicated.
+
+    Unless force is set, rows whose stats_hash is already stored are
+    skipped, so rerunning a night only writes what actually changed.
+
+    games: list of {"game_id", "game", "player_games"} dicts.
+    If a bulk write is rejected, falls back to writing game by game so one
+    bad game can't block the rest; likewise a new player who can't be
+    inserted only holds back the games they played in. Returns the game_ids whose rows landed
+    (including games that were already fully up to date).
+
+    Every landed game, changed or not, is then folded into player_aggregate
+    (already-counted stat lines are no-ops there), which also picks up
+    games that live scoring wrote during the night.
+    """
+    if not games:
+        return []
+
+    # player_game rows reference player, so new players must land first;
+    # games that need a player who didn't land wait for the next run
+    if roster is not None:
+        roster.flush()
+        games = drop_games_with_players(games, roster.failed)
+        if not games:
+            return []
+
+    all_games = games
+    all_ids = [g["game_id"] for g in games]
+    if not force:
+        games, skipped = drop_unchanged_games(supabase, games)
+        incr("rows.player_game_unchanged", skipped)
+        print(f"Skipping {skipped} unchanged player_games; {len(games)}/{len(all_ids)} games have changes")
+        if not games:
+            _update_aggregates(supabase, all_games)
+            return all_ids
+
+    changed_ids = {g["game_id"] for g in games}
+    up_to_date = [gid for gid in all_ids if gid not in changed_ids]
+    game_rows = [g["game"] for g in games]
+    player_rows = [p for g in games for p in g["player_games"]]
+
+    try:
+        print(f"Upserting {len(game_rows)} games into Supabase...")
+        supabase.table("game").upsert(game_rows).execute()
+
+        print(f"Upserting {len(player_rows)} player_games into Supabase...")
+        if player_rows:
+            supabase.table("player_game").upsert(player_rows, on_conflict=PLAYER_GAME_KEY).execute()
+
+        incr("rows.game", len(game_rows))
+        incr("rows.player_game", len(player_rows))
+        _update_aggregates(supabase, all_games)
+        return all_ids
+
+    except Exception as e:
+        print(f"Bulk commit failed ({e}), retrying game by game...")
+
+    landed = up_to_date
+    for g in games:
         try:
-            # Fetch LIVE box score
-            bs = boxscore.BoxScore(gid)
-            game = bs.get_dict()["game"]
+            supabase.table("game").upsert(g["game"]).execute()
+            if g["player_games"]:
+                supabase.table("player_game").upsert(g["player_games"], on_conflict=PLAYER_GAME_KEY).execute()
+            incr("rows.game")
+            incr("rows.player_game", len(g["player_games"]))
+            landed.append(g["game_id"])
+        except Exception as e:
+            print(f"Error committing {g['game_id']}: {e}")
+
+    landed_ids = set(landed)
+    _update_aggregates(supabase, [g for g in all_games if g["game_id"] in landed_ids])
+    return landed
+
+def drop_games_with_players(games, player_ids):
+    """Games whose player_games reference none of player_ids."""
+    if not player_ids:
+        return games
+    kept = []
+    for g in games:
+        missing = {p["player_id"] for p in g["player_games"]} & player_ids
+        if missing:
+            print(f"Skipping {g['game_id']}: players {sorted(missing)} failed to insert")
+        else:
+            kept.append(g)
+    return kept
+
+def _update_aggregates(supabase, games):
+    """Aggregates are derived data: a failure is logged, and the next run catches up."""
+    try:
+        update_player_aggregates(supabase, games)
+    except Exception as e:
+        print(f"Error updating player aggregates: {e}")
+
+def mark_pending_games_processed(supabase, game_ids):
+    """Flag pending games as processed in one request."""
+    if not game_ids:
+        return
 
+    supabase.table("pending_game") \
+        .update({"processed": True}) \
+        .in_("game_id", list(game_ids)) \
+        .execute()
+
+def process_pending_games(supabase, max_workers=None, force=False, game_date=None):
+    """
+    Fetch, score and commit pending games. Safe to rerun: unchanged rows are
+    skipped by content hash unless force is set. Pass game_date to replay
+    every game of that night, including ones already processed.
+    """
+    pending = get_unprocessed_pending_games(supabase, game_date)
+
+    print(f"Found {len(pending)} pending games to process")
+
+    roster = RosterCache(supabase)
+    processed = []
+
+    for gid, game, fetch_error in fetch_box_scores(pending, max_workers):
+        if fetch_error is not None:
+            print(f"Error fetching box score for {gid}: {fetch_error}")
+            continue
+
+        try:
             # Build your inserts
             gameweek = get_gameweek_for_date(
                 supabase,
                 datetime.strptime(game["gameTimeUTC"][:10], "%Y-%m-%d").date()
             )
 
-            game_details = get_game_details_for_game(game, gameweek)
-            player_stats = get_player_details_for_game(game, supabase)
-
-            print(f"Inserting {game_details['date']} : {game_details['id']} into Supabase...")
-            supabase.table("game").upsert(game_details).execute()
-
-            print(f"Inserting {len(player_stats)} player_games into Supabase...")
-            # Insert players
-            if player_stats:
-                supabase.table("player_game").insert(player_stats).execute()
-
-            # Mark as processed
-            supabase.table("pending_game") \
-                .update({"processed": True}) \
-                .eq("game_id", gid) \
-                .execute()
-
-            print(f"Processed {gid}")
+            processed.append(build_game(gid, game, gameweek, supabase, roster))
+            print(f"Processed {gid} ({len(processed[-1]['player_games'])} player_games)")
 
         except Exception as e:
             print(f"Error processing {gid}: {e}")
 
+    # Single commit for the whole run
+    landed = commit_games(supabase, processed, roster, force=force)
+    mark_pending_games_processed(supabase, landed)
+    roster.flush()
+
+    print(f"Committed {len(landed)}/{len(pending)} pending games")
+    return landed
+
 def get_game_ids_for_date(target_date):
     """
     Fetch all NBA games for a given date using nba_api.
     Returns a list of dicts: { home_team, away_team, home_score, away_score, date }
     """
     try:
-        scoreboard = scoreboardv2.ScoreboardV2(game_date=target_date.strftime("%Y-%m-%d"), league_id="00")
-        data = scoreboard.get_normalized_dict()["Available"]
+        data = get_scoreboard(target_date)["Available"]
         game_ids = [g.get("GAME_ID") for g in data]
 
         # sb = scoreboard.ScoreBoard()
@@ -155,8 +354,7 @@ def get_game_ids_for_date(target_date):
     
 def get_game_for_game_id(game_id):
     try:
-        box = boxscore.BoxScore(game_id=game_id)
-        return box.game.get_dict()
+        return get_live_box_score(game_id)
 
         # bs = live_boxscore.BoxScore(game_id)
         # data = bs.get_dict().get("game", {})
@@ -180,42 +378,30 @@ def get_game_details_for_game(game, gameweek):
 def calculate_score(stats):
     """
     Given a player's stats dict (points, rebounds, assists, etc.),
-    calculate bonus points (bps) and fantasy score.
-    """
+    calculate their fantasy score.
 
-    points = stats.get("points", 0)
-    rebounds = stats.get("rebounds", 0)
-    assists = stats.get("assists", 0)
-    steals = stats.get("steals", 0)
-    blocks = stats.get("blocks", 0)
-    turnovers = stats.get("turnovers", 0)
-    fgm = stats.get("fgm", 0)
-    fga = stats.get("fga", 0)
-    ftm = stats.get("ftm", 0)
-    fta = stats.get("fta", 0)
-    threes = stats.get("3pm", 0)
-
-    # Example fantasy scoring (customize as needed)
-    score = (
-        points * 1
-        + rebounds * 1.2
-        + assists * 1.5
-        + steals * 3
-        + blocks * 3
-        - turnovers * 2
-        + fgm * 1
-        - fga * 0.5
-        + ftm * 1
-        - fta * 0.75
-        + threes * 1
-    )
+    Thin wrapper over scoring.calculate_scores; score many rows at once
+    with that (or score_rows) instead of calling this in a loop.
+    """
+    columns = {stat: [stats.get(stat, 0)] for stat, _ in SCORING_WEIGHTS}
+    return float(calculate_scores(columns)[0])
 
-    return round(score, 1)
+def get_player_details_for_game(game, supabase, roster=None):
+    """
+    Build player_game rows for one game.
 
-def get_player_details_for_game(game, supabase):
+    Pass a RosterCache shared across the run to avoid re-downloading the
+    player table per game; its queued team moves / new players are then
+    written when the caller flushes it. Without one, a fresh cache is used
+    and flushed before returning.
+    """
     
     player_stats = []
 
+    owns_roster = roster is None
+    if owns_roster:
+        roster = RosterCache(supabase)
+
     home_team_id = int(game.get("homeTeam", {}).get("teamId"))
     away_team_id = int(game.get("awayTeam", {}).get("teamId"))
 
@@ -223,41 +409,28 @@ def get_player_details_for_game(game, supabase):
     home_players = game.get("homeTeam", {}).get("players", [])
     away_players = game.get("awayTeam", {}).get("players", [])
 
-    existing_data = supabase.table("player").select("id, team_id").execute()
-    existing_info = {p["id"]: p.get("team_id") for p in existing_data.data} if existing_data.data else {}
-
     def process_team_players(players, team_id):
         for p in players:
             player_id = int(p.get("personId"))
 
-            # -----------------------------
-            # update team if changed
-            # -----------------------------
-            current_team = existing_info.get(player_id)
-
             # -----------------------------
             # Update player's team if changed
             # -----------------------------
+            current_team = roster.team_of(player_id)
+
             if current_team is not None and current_team != team_id:
                 print(f"🔁 Updating team for player {player_id}: {current_team} → {team_id}")
-                supabase.table("player").update({"team_id": team_id}).eq("id", player_id).execute()
-                existing_info[player_id] = team_id
+                roster.move(player_id, team_id)
 
-
-            if player_id not in existing_info:
+            if player_id not in roster:
                 details = get_player_details(player_id)  # Your helper from the other file
                 if not details:
                     print(f"Failed to fetch details for player {player_id}")
                     continue
 
                 details["price"] = 4.0 # hardcoded entry price
-                if details:
-                    supabase.table("player").insert(details).execute()
-                    existing_info[player_id] = team_id
-                    print(f"Inserted new player {player_id} into Supabase")
-                else:
-                    print(f"Failed to fetch details for player {player_id}")
-                    continue
+                roster.add(details, team_id)
+                print(f"Queued new player {player_id} for insert")
 
             stats = p.get("statistics", {})
 
@@ -289,13 +462,17 @@ def get_player_details_for_game(game, supabase):
                 "fta": int(stats.get("freeThrowsAttempted", 0)),
                 "minutes": minutes,
             }
-
-            score = calculate_score(player_dict)
-            player_dict["score"] = score
             player_stats.append(player_dict)
 
     process_team_players(home_players, home_team_id)
     process_team_players(away_players, away_team_id)
+    with span("scoring", log=False):
+        score_rows(player_stats)
+        for row in player_stats:
+            row["stats_hash"] = player_game_hash(row)
+
+    if owns_roster:
+        roster.flush()
 
     return player_stats
 
@@ -303,7 +480,7 @@ def get_player_details_for_game(game, supabase):
 # Main
 # -----------------------------
 
-def main_for_date(target_date, supabase):
+def main_for_date(target_date, supabase, force=False):
     print(f"Fetching games for {target_date}...")
 
     # Determine which gameweek this date belongs to
@@ -316,30 +493,19 @@ def main_for_date(target_date, supabase):
     game_ids = get_game_ids_for_date(target_date)
     print(f"Found game_ids: {game_ids} on {target_date}.")
 
-    game_details = []
-    player_games = []
+    games = []
+    roster = RosterCache(supabase)
 
     for i in game_ids:
         game = get_game_for_game_id(i)
-        game_details.append(get_game_details_for_game(game, gameweek))
-        player_games.append(get_player_details_for_game(game, supabase))
-
-    if game_details:
-        # Insert games into Supabase
-        print(f"Inserting {len(game_details)} games into Supabase...")
-        supabase.table("game").insert(game_details).execute()
-        print("✅ Games inserted successfully.")
-    else:
+        games.append(build_game(i, game, gameweek, supabase, roster))
+
+    if not games:
         print("No games or player_games to insert.")
         return
-    
-    all_player_games = [p for game in player_games for p in game]
-    print(f"Inserting {len(all_player_games)} player_games into Supabase...")
 
-    # Now insert
-    if all_player_games:
-        supabase.table("player_game").insert(all_player_games).execute()
-        print("✅ Player Games inserted successfully.")
+    landed = commit_games(supabase, games, roster, force=force)
+    print(f"✅ Committed {len(landed)}/{len(games)} games for {target_date}.")
 
 
 if __name__ == "__main__":
@@ -357,12 +523,5 @@ if __name__ == "__main__":
         # daily_job_logger.error("❌ Error running job for  %s: %s", day, e)
         print(f"Error: {e}")
 
-    # start_date = datetime.strptime("2025-11-06", "%Y-%m-%d").date()
-    # end_date = datetime.strptime("2025-11-09", "%Y-%m-%d").date()
-
-    # delta = timedelta(days=1)
-    # current_date = start_date
-
-    # while current_date <= end_date:
-    #     main_for_date(current_date, supabase)
-    #     current_date += delta
\ No newline at end of file
+    # For a range of dates use the resumable backfill:
+    #   python -m backend.scripts.backfill 2025-11-06 2025-11-09
@@ -0,0 +1,86 @@
+from bisect import bisect_right
+from datetime import date, datetime
+
+import numpy as np
+
+DEFAULT_GAMEWEEK = 1
+
+_calendar = None
+
+
+class GameweekCalendar:
+    """
+    Sorted gameweek intervals held in memory.
+
+    Boundaries are stored as parallel arrays (start, end, gameweek) sorted by
+    start date, so a single date is a bisect and many dates are one
+    np.searchsorted call.
+    """
+
+    def __init__(self, rows):
+        parsed = sorted(
+            (
+                _to_date(r["start_date"]),
+                _to_date(r["end_date"]),
+                r["gameweek"],
+            )
+            for r in rows
+        )
+        self._start_ordinals = [s.toordinal() for s, _, _ in parsed]
+        self._end_ordinals = [e.toordinal() for _, e, _ in parsed]
+        self.starts = np.array([s for s, _, _ in parsed], dtype="datetime64[D]")
+        self.ends = np.array([e for _, e, _ in parsed], dtype="datetime64[D]")
+        self.gameweeks = np.array([gw for _, _, gw in parsed], dtype=np.int64)
+
+    @classmethod
+    def load(cls, supabase):
+        """Fetch the gameweek table once and build the index."""
+        resp = supabase.table("gameweek").select("gameweek, start_date, end_date").execute()
+        return cls(resp.data or [])
+
+    def __len__(self):
+        return len(self.gameweeks)
+
+    def lookup(self, target_date, default=DEFAULT_GAMEWEEK):
+        """Return the gameweek that target_date falls into, or default."""
+        ordinal = _to_date(target_date).toordinal()
+        i = bisect_right(self._start_ordinals, ordinal) - 1
+        if i < 0 or ordinal > self._end_ordinals[i]:
+            return default
+        return int(self.gameweeks[i])
+
+    def lookup_many(self, dates, default=DEFAULT_GAMEWEEK):
+        """
+        Vectorized lookup for an array of dates (date objects, ISO strings,
+        or datetime64). Returns an int64 array of gameweeks.
+        """
+        targets = np.asarray(dates)
+        if targets.dtype.kind in "OSU":
+            # Trim ISO timestamps ("2025-11-20T00:00:00Z") down to the date part
+            targets = targets.astype("U10")
+        targets = targets.astype("datetime64[D]")
+        result = np.full(targets.shape, default, dtype=np.int64)
+        if not len(self.gameweeks) or not targets.size:
+            return result
+
+        idx = np.searchsorted(self.starts, targets, side="right") - 1
+        safe_idx = np.clip(idx, 0, None)
+        hit = (idx >= 0) & (targets <= self.ends[safe_idx])
+        result[hit] = self.gameweeks[safe_idx[hit]]
+        return result
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def get_calendar(supabase, refresh=False):
+    """Return the process-wide calendar, loading it on first use."""
+    global _calendar
+    if _calendar is None or refresh:
+        _calendar = GameweekCalendar.load(supabase)
+    return _calendar
@@ -1,15 +1,20 @@
+import argparse
 import os
 import csv
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import time
 from math import ceil
 from dotenv import load_dotenv
 from supabase import create_client
-from nba_api.stats.endpoints import playercareerstats
 
 # Reuse your fantasy scoring
-from fetch_box import calculate_score
-from batching import insert_in_batches
+from backend.scripts.scoring import score_rows
+from backend.scripts.batching import insert_in_batches
+from backend.scripts.metrics import instrument_supabase, job, span
+from backend.scripts.nba_cache import get_player_career_stats
+from backend.scripts.rate_limiter import AdaptiveRateLimiter, set_limiter
+from backend.scripts.table_reader import iter_rows
 
 load_dotenv()
 
@@ -22,26 +27,12 @@ os.makedirs(TEST_DATA_DIR, exist_ok=True)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+supabase = instrument_supabase(create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY))
 
 # -----------------------------
 # Helpers
 # -----------------------------
 
-def fetch_player_career_stats(player_id):
-    """
-    Fetch all season-by-season averages for a player using nba_api.
-    Returns a list of dicts with fields matching player_history schema.
-    """
-    try:
-        career = playercareerstats.PlayerCareerStats(player_id=player_id)
-        data = career.get_data_frames()[0]  # returns pandas DataFrame
-        return data.to_dict("records")
-    except Exception as e:
-        print(f"Error fetching career stats for player {player_id}: {e}")
-        return []
-
-
 def transform_to_history_rows(player_id, stats_records):
     """
     Convert nba_api career data to your player_history schema format.
@@ -76,23 +67,6 @@ def transform_to_history_rows(player_id, stats_records):
         gp = int(row.get("GP", 0))
         gs = int(row.get("GS", 0))
 
-        stats = {
-            "points": points,
-            "rebounds": rebounds,
-            "assists": assists,
-            "steals": steals,
-            "blocks": blocks,
-            "turnovers": turnovers,
-            "3pm": threes_made,
-            "3pa": threes_att,
-            "fgm": fgm,
-            "fga": fga,
-            "ftm": ftm,
-            "fta": fta,
-        }
-
-        score = calculate_score(stats)
-
         player_history_rows.append({
             "player_id": player_id,
             "season_id": season_id,
@@ -109,13 +83,14 @@ def transform_to_history_rows(player_id, stats_records):
             "fga": fga,
             "ftm": ftm,
             "fta": fta,
-            "score": score,
+            "score": None,  # filled in below, one vectorized pass per player
             "minutes": minutes,
             "gp": gp,
             "gs": gs
         })
 
-    return player_history_rows
+    with span("scoring", log=False):
+        return score_rows(player_history_rows)
 
 
 def write_to_csv(rows, output_path):
@@ -134,51 +109,145 @@ def write_to_csv(rows, output_path):
 
     print(f"✅ Wrote {len(rows)} rows to {output_path}")
 
+# -----------------------------
+# Checkpointed ingestion
+# -----------------------------
+
+JOURNAL_FILE = os.path.join("log", "player_history_journal.jsonl")
+BATCH_SIZE = 50
+HISTORY_KEY = "player_id,season_id,team_id"   # unique index on player_history
+FETCH_WORKERS = 4
+START_RATE = 1.5  # requests / second; the limiter adapts from here
+
+
+def load_journal(path=JOURNAL_FILE):
+    """Player IDs whose history is already in player_history."""
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                done.add(json.loads(line)["player_id"])
+    return done
+
+
+def append_journal(entries, path=JOURNAL_FILE):
+    """Durably record completed players: one JSON line each, fsynced."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for player_id, rows in entries:
+            f.write(json.dumps({"player_id": player_id, "rows": rows}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def fetch_history_rows(player_id):
+    """Fetch + transform one player's career. Errors propagate (never journaled)."""
+    with span("fetch.career", log=False):
+        career = get_player_career_stats(player_id)
+    with span("transform", log=False):
+        return transform_to_history_rows(player_id, career["SeasonTotalsRegularSeason"])
+
+
+def write_history_batch(batch_rows, completed, journal_path):
+    """
+    Upsert one batch into player_history, then journal the players whose
+    rows all landed. Players with dead-lettered rows are left out of the
+    journal, so the next run fetches and writes them again; the upsert on
+    HISTORY_KEY makes that (and --restart) safe to repeat.
+    """
+    with span("write", rows=len(batch_rows), players=len(completed)):
+        failed = []
+        if batch_rows:
+            print(f"🚀 Upserting {len(batch_rows)} player_history rows...")
+            insert_in_batches(supabase, batch_rows, "player_history", on_conflict=HISTORY_KEY, failed=failed)
+
+        failed_players = {row["player_id"] for row in failed}
+        landed = [(player_id, rows) for player_id, rows in completed if player_id not in failed_players]
+        append_journal(landed, journal_path)
+    print(f"✅ Journaled {len(landed)} players")
+    if failed_players:
+        print(f"⚠️ {len(failed_players)} players had rows rejected; rerun to retry them.")
+
+
+def ingest_player_history(player_ids, batch_size=BATCH_SIZE, workers=FETCH_WORKERS,
+                          rate=START_RATE, journal_path=JOURNAL_FILE, restart=False):
+    """
+    Load career history for player_ids, skipping anyone already journaled.
+
+    Careers are fetched by a bounded thread pool through an adaptive rate
+    limiter. Each finished batch is written on a separate writer thread
+    while the next batch is fetching; a player is journaled only after
+    their rows are in, so an interrupted run resumes cleanly.
+    """
+    done = set() if restart else load_journal(journal_path)
+    todo = [pid for pid in player_ids if pid not in done]
+    total_batches = ceil(len(todo) / batch_size)
+    print(f"{len(todo)} players to fetch ({len(done)} already journaled), {total_batches} batches")
+
+    set_limiter(AdaptiveRateLimiter(rate, burst=workers))
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=1) as write_pool:
+        pending_write = None
+
+        for batch_num in range(total_batches):
+            batch = todo[batch_num * batch_size:(batch_num + 1) * batch_size]
+            print(f"\n=== Fetching batch {batch_num + 1}/{total_batches} ({len(batch)} players) ===")
+
+            batch_rows, completed = [], []
+            futures = {fetch_pool.submit(fetch_history_rows, pid): pid for pid in batch}
+            for future in as_completed(futures):
+                player_id = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    print(f"Error fetching career stats for player {player_id}: {e}")
+                    failed.append(player_id)
+                    continue
+                batch_rows.extend(rows)
+                completed.append((player_id, len(rows)))
+
+            # One write in flight at a time; it overlaps the next batch's fetch
+            if pending_write is not None:
+                pending_write.result()
+            pending_write = write_pool.submit(write_history_batch, batch_rows, completed, journal_path)
+
+        if pending_write is not None:
+            pending_write.result()
+
+    if failed:
+        print(f"⚠️ {len(failed)} players failed; rerun to retry them.")
+    else:
+        print("✅ Player history ingestion complete.")
+
 # -----------------------------
 # Main
 # -----------------------------
 
 def main():
-    # Get all player IDs from Supabase
-    print("Fetching players from Supabase...")
-    resp = supabase.table("player").select("id").execute()
-    players = [p["id"] for p in resp.data]
-    print(f"Found {len(players)} players.")
-
-    return
-
-    print("Fetching player history from NBA_API...")
-    BATCH_SIZE = 50
-    REQUEST_DELAY = 0.6  # Seconds between player requests in a batch
-
-    # === Set which batches to run ===
-    # batch_start = 0  # Uncomment this for a full run
-    # batch_start = 12     # batch index 12 = batch 13 (0-based)
-    total_batches = ceil(len(players) / BATCH_SIZE)
-
-    for batch_num in range(batch_start, total_batches):
-        start = batch_num * BATCH_SIZE
-        end = start + BATCH_SIZE
-        batch = players[start:end]
-        print(f"\n=== Processing batch {batch_num + 1}/{total_batches} ({len(batch)} players) ===")
-        batch_rows = []
-
-        for i, player_id in enumerate(batch, start=1):
-            print(f"  [{i}/{len(batch)}] Fetching history for player {player_id}...")
-            career_stats = fetch_player_career_stats(player_id)
-            rows = transform_to_history_rows(player_id, career_stats)
-            batch_rows.extend(rows)
-            time.sleep(REQUEST_DELAY)
-
-        print(f"✅ Finished batch {batch_num + 1}/{total_batches}")
-
-        # Insert all rows from this batch at once
-        if batch_rows:
-            print(f"🚀 Inserting {len(batch_rows)} rows from batch {batch_num + 1} into Supabase...")
-            supabase.table("player_history").insert(batch_rows).execute()
-            print(f"✅ Batch {batch_num + 1} inserted successfully.")
-        else:
-            print(f"⚠️ No rows to insert for batch {batch_num + 1}")
+    parser = argparse.ArgumentParser(description="Load player career history into player_history.")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="careers fetched at once")
+    parser.add_argument("--rate", type=float, default=START_RATE, help="starting nba_api requests per second")
+    parser.add_argument("--journal", default=JOURNAL_FILE, help="completed-player journal")
+    parser.add_argument("--restart", action="store_true", help="ignore the journal and refetch everyone")
+    parser.add_argument("--profile", action="store_true", help="dump cProfile output to log/profile")
+    args = parser.parse_args()
+
+    with job("init_player_history", profile=args.profile):
+        # Get all player IDs from Supabase
+        print("Fetching players from Supabase...")
+        with span("fetch.players"):
+            players = [p["id"] for p in iter_rows(supabase, "player", "id")]
+        print(f"Found {len(players)} players.")
+
+        print("Fetching player history from NBA_API...")
+        ingest_player_history(players, workers=args.workers, rate=args.rate,
+                              journal_path=args.journal, restart=args.restart)
 
     # Write to CSV for inspection
     # csv_path = os.path.join(TEST_DATA_DIR, "player_history_test.csv")
@@ -1,4 +1,4 @@
-from datetime import date, datetime
+from datetime import datetime, timezone
 import pandas as pd
 import numpy as np
 import os
@@ -6,355 +6,188 @@ import math
 from dotenv import load_dotenv
 from supabase import create_client
 
-from logger_config import price_job_logger
-from fetch_box import calculate_score
-from plot_player_price import plot_price_distribution
+from backend.scripts.bulk_update import bulk_update, fetch_player_prices
+from backend.scripts.logger_config import price_job_logger
+from backend.scripts.metrics import incr, instrument_supabase, job, span, timed
+from backend.scripts.pricing_engine import (
+    MIN_PRICE,
+    PRICING_PARAMS,
+    TOTAL_BUDGET,
+    PricingInputs,
+    price_players,
+)
+from backend.scripts.pricing_inputs import (
+    LAST_SEASON_ID,
+    fetch_player_averages_from_db,
+    fetch_player_birthdates,
+    fetch_player_history_averages,
+)
+from backend.scripts.pricing_state import save_pricing_state
+from backend.scripts.squad_solver import check_price_balance
+from backend.scripts.transfer_engine import publish_prices
+from backend.scripts.plot_player_price import plot_price_distribution
 
 load_dotenv()
 
-NBA_SEASON_START = date(2025, 10, 1)
-
-LAST_SEASON_ID = "2024-25"
-TOTAL_BUDGET = 100
-SQUAD_SIZE = 13
-AVG_BUDGET_PER_PLAYER = 5.87  # ~7.7 avg
-MIN_PRICE = 4.0
-TOP_PLAYER_SCALING_FACTOR = 1.1 # exponent
-PRICE_STEP = 0.5
-
-def round_to_half(x):
-    if pd.isna(x):
-        return 0
-    return round(x * 2) / 2
-
-def fetch_player_birthdates(supabase):
-    """Fetch player IDs and birthdates from Supabase."""
-    response = supabase.table("player").select("id, birthdate").execute()
-    data = response.data
-    if not data:
-        raise ValueError("No player birthdates returned from Supabase.")
-    df = pd.DataFrame(data)
-
-    # Compute age as of start of season
-    def calculate_age(birthdate_str):
-        if not birthdate_str:
-            return None
-        bdate = datetime.strptime(birthdate_str, "%Y-%m-%d").date()
-        return (
-            NBA_SEASON_START.year
-            - bdate.year
-            - ((NBA_SEASON_START.month, NBA_SEASON_START.day) < (bdate.month, bdate.day))
-        )
-
-    df["age"] = df["birthdate"].apply(calculate_age)
-    return df[["id", "age"]].rename(columns={"id": "player_id"})
-
-def fetch_player_averages_from_db(supabase):
-    """Fetch player averages and games played using Supabase function."""
-    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
-    response = supabase.rpc("get_player_averages").execute()
-    data = response.data
-    if not data:
-        raise ValueError("No player average data returned from Supabase.")
-    return pd.DataFrame(data)
-
-def fetch_player_history_averages(supabase, season_id: str = LAST_SEASON_ID):
+@timed("squad_check")
+def check_squad_balance(priced_df: pd.DataFrame, current_df: pd.DataFrame, players_df: pd.DataFrame):
     """
-    Fetch player averages from player_history table for the given season.
-    Assumes Supabase has an RPC or direct select that aggregates per player.
+    Solve the best affordable squad at the new prices (projected points =
+    current season average) and warn if the prices let a trivially
+    dominant squad exist. Returns the squad_solver report, or None.
     """
-    response = (
-        supabase.table("player_history")
-        .select(
-            "player_id, team_id, season_id, points, rebounds, assists, steals, blocks, turnovers, 3pm, fgm, fga, ftm, fta, score, minutes, gp"
-        )
-        .eq("season_id", season_id)
-        .execute()
-    )
-    data = response.data
-    if not data:
-        raise ValueError(f"No player history found for season {season_id}.")
-    df = pd.DataFrame(data)
-
-    # compute fantasy score if missing
-    if "score" not in df.columns or df["score"].isna().any():
-        df["score"] = df.apply(lambda row: calculate_score(row.to_dict()), axis=1)
-
-    # aggregate to per-player averages
-    grouped = (
-        df.groupby("player_id")
-        .agg(
-            avg_fp=("score", "mean"),
-            avg_pts=("points", "mean"),
-            avg_reb=("rebounds", "mean"),
-            avg_ast=("assists", "mean"),
-            avg_stl=("steals", "mean"),
-            avg_blk=("blocks", "mean"),
-            avg_minutes=("minutes", "mean"),
-            games_played=("gp", "max"),
-        )
-        .reset_index()
-    )
-    return grouped
-
-def compute_weighted_fantasy(df: pd.DataFrame, age_col: str = "age") -> pd.DataFrame:
-    """
-    Combine fantasy score, minutes, games played, and age into one weighted metric.
-    """
-    numeric_cols = [
-        "avg_fp",
-        "avg_minutes",
-        "games_played",
-    ]
-    for col in numeric_cols:
-        if col not in df.columns:
-            df[col] = 0
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
-
-    # --- weights ---
-    games_weight = np.minimum(df["games_played"] / 10, 1.0)
-    minutes_weight = df["avg_minutes"] / (df["avg_minutes"].max() or 1)
-    base_weight = df["avg_fp"]
-
-    # --- age curve ---
-    if age_col in df.columns:
-        # players in their prime (22–28) get small boost, decline after 30
-        df["age_factor"] = df[age_col].apply(
-            lambda a: 1.1 if 22 <= a <= 28 else (0.9 if a >= 31 else 1.0)
-        )
-    else:
-        df["age_factor"] = 1.0
-
-    df["weighted_fp"] = base_weight * (
-        0.7 * df["age_factor"] + 0.15 * games_weight + 0.15 * minutes_weight
-    )
+    projected = pd.to_numeric(current_df.set_index("player_id")["avg_fp"], errors="coerce")
+    players = priced_df[["player_id", "price"]].merge(players_df[["player_id", "pos"]], on="player_id", how="left")
+    players["points"] = players["player_id"].map(projected).fillna(0.0)
 
-    # normalize
-    min_fp, max_fp = df["weighted_fp"].min(), df["weighted_fp"].max()
-    df["perf_norm"] = (df["weighted_fp"] - min_fp) / (max_fp - min_fp)
-    return df
+    try:
+        report = check_price_balance(players, TOTAL_BUDGET)
+    except ValueError as e:
+        print(f"⚠️ Squad check skipped: {e}")
+        return None
 
-def calculate_prices(df: pd.DataFrame) -> pd.DataFrame:
+    print(
+        f"🧮 Best affordable squad: {report['points']:.1f} pts for {report['cost']:.1f}/{TOTAL_BUDGET} "
+        f"(top scorers would cost {report['unconstrained_cost']:.1f})"
+    )
+    for warning in report["warnings"]:
+        print(f"⚠️ Price balance: {warning}")
+        price_job_logger.warning(f"Price balance: {warning}")
+    return report
+
+def summarize_price_changes(changed: pd.DataFrame, total: int) -> dict:
+    """Counts and biggest movers for a set of changed prices."""
+    delta = changed["price"] - changed["old_price"]
+    movers = changed.assign(delta=delta).sort_values("delta")
+    return {
+        "total": total,
+        "changed": len(changed),
+        "new": int(changed["old_price"].isna().sum()),
+        "rises": int((delta > 0).sum()),
+        "falls": int((delta < 0).sum()),
+        "biggest_rises": movers[movers["delta"] > 0].tail(5)[["player_id", "old_price", "price"]].to_dict("records")[::-1],
+        "biggest_falls": movers[movers["delta"] < 0].head(5)[["player_id", "old_price", "price"]].to_dict("records"),
+    }
+
+@timed("write.prices")
+def update_player_prices(df: pd.DataFrame, supabase, batch_size=100,):
     """
-    Convert weighted performance score (weighted_score) to fantasy price,
-    handling NaN (rookies) and rounding to nearest 0.5.
+    Publish player prices (and updated_at) to Supabase, sending only the
+    players whose price actually moved. Returns a change summary.
     """
+    now = datetime.now(timezone.utc).isoformat()
 
-    if "weighted_score" not in df.columns:
-        raise KeyError("Expected 'weighted_score' column in DataFrame before pricing.")
-
-    # Fill NaNs (rookies, injured, etc.) using curr_norm or minimum weighted_score
-    min_score = df["weighted_score"].min()
-    df["weighted_score_filled"] = df["weighted_score"].fillna(df["curr_norm"].fillna(min_score))
-
-    # Normalize starting from 0
-    min_filled = df["weighted_score_filled"].min()
-    df["raw_price"] = (df["weighted_score_filled"] - min_filled)  # starts at 0
-
-    # Determine stretch exponent based on MAX_PRICE_GUIDE vs AVG_BUDGET_PER_PLAYER
-    # The bigger the gap, the more stretch
-    exponent = TOP_PLAYER_SCALING_FACTOR
-
-    # Apply nonlinear stretch to boost top performers
-    if df["raw_price"].max() > 0:
-        df["raw_price"] = (df["raw_price"] / df["raw_price"].max()) ** exponent
-
-    # Scale to target mean (without minimum yet)
-    target_mean = AVG_BUDGET_PER_PLAYER - MIN_PRICE
-    current_mean = df["raw_price"].mean()
-    if current_mean > 0:
-        df["raw_price"] = df["raw_price"] * (target_mean / current_mean)
-
-    # Add minimum price
-    df["raw_price"] = df["raw_price"] + MIN_PRICE
-
-    # Round to nearest 0.5
-    df["price"] = df["raw_price"].apply(round_to_half)
-
-    # Fill any remaining NaNs
-    df["price"] = df["price"].fillna(MIN_PRICE)
-
-    # Keep columns useful for debugging
-    debug_cols = [
-        "player_id",
-        "curr_norm",
-        "past_norm",
-        "combined_norm",
-        "age",
-        "age_factor",
-        "weighted_score",
-        "weighted_score_filled",
-        "perf_norm",
-        "raw_price",
-        "price",
-    ]
-    debug_cols = [c for c in debug_cols if c in df.columns]
+    new_prices = df[["player_id", "price"]].copy()
+    new_prices["price"] = new_prices["price"].fillna(4.5)
 
-    return df[debug_cols]
+    current = fetch_player_prices(supabase)[["player_id", "price"]].rename(columns={"price": "old_price"})
+    merged = new_prices.merge(current, on="player_id", how="left")
+    old = merged["old_price"].to_numpy(dtype=float)
+    new = merged["price"].to_numpy(dtype=float)
+    changed = merged[np.isnan(old) | ~np.isclose(old, new)]
 
-    # Keep consistent fields
-    return df.rename(columns={"player_id": "id"})[
-        ["id", "price"]
-    ]
-
-def update_player_prices(df: pd.DataFrame, supabase, batch_size=100,):
-    """Update player prices (and updated_at) in Supabase."""
-    now = datetime.now().isoformat()
-
-    df["price_filled"] = df["price"].fillna(4.5)
+    summary = summarize_price_changes(changed, len(merged))
+    print(
+        f"💱 {summary['changed']}/{summary['total']} prices changed "
+        f"({summary['rises']} up, {summary['falls']} down, {summary['new']} new)"
+    )
+    for label in ("biggest_rises", "biggest_falls"):
+        for m in summary[label]:
+            print(f"   {m['player_id']}: {m['old_price']} → {m['price']}")
 
     updates = [
-        {
-            "id": int(row["player_id"]),
-            "price": float(row["price_filled"]),
-            "updated_at": now,
-        }
-        for _, row in df.iterrows()
+        {"id": int(player_id), "price": float(price), "updated_at": now}
+        for player_id, price in zip(changed["player_id"].to_numpy(), changed["price"].to_numpy())
     ]
 
     for i in range(0, len(updates), batch_size):
         chunk = updates[i : i + batch_size]
         supabase.rpc("update_player_prices", {"price_updates": chunk}).execute()
+        incr("rows.player", len(chunk))
 
         print(f"Batch {i // batch_size + 1} sent with {len(chunk)} items")
 
-def fill_all_missing_prices(supabase, default_price: float = 4.0, batch_size: int = 100):
+    price_job_logger.info(
+        f"Price publish: {summary['changed']}/{summary['total']} changed, "
+        f"{summary['rises']} rises, {summary['falls']} falls"
+    )
+    return summary
+
+@timed("write.fill_missing")
+def fill_all_missing_prices(supabase, default_price: float = 4.0):
     """
     Standalone function to update all players in Supabase with null price.
-    Sets their price to `default_price`.
+    Sets their price to `default_price` in a single UPDATE.
     """
-    now = datetime.now().isoformat()
-
-    # Fetch only players with price = null
-    response = (
-        supabase.table("player")
-        .select("id")
-        .is_("price", None)
-        .execute()
+    now = datetime.now(timezone.utc).isoformat()
+
+    updated = bulk_update(
+        supabase, "player",
+        {"price": default_price, "updated_at": now},
+        where=lambda q: q.is_("price", "null"),
     )
-    missing_players = response.data
 
-    if not missing_players:
+    incr("rows.player", updated)
+    if not updated:
         print("No missing prices to update.")
         return
 
-    # Prepare updates
-    updates = [
-        {"id": p["id"], "price": default_price, "updated_at": now}
-        for p in missing_players
-    ]
-
-    # Update in batches
-    for i in range(0, len(updates), batch_size):
-        chunk = updates[i : i + batch_size]
-        supabase.rpc("update_player_prices", {"price_updates": chunk}).execute()
-        print(f"Batch {i // batch_size + 1} updated {len(chunk)} missing prices.")
+    print(f"✅ Updated {updated} players with default price {default_price}.")
 
-    print(f"✅ Updated {len(updates)} players with default price {default_price}.")
+@timed("write.base_prices")
+def reset_base_prices(supabase):
+    """
+    Clear base_price (null = price) so current_price follows this
+    rebalance rather than the form moves reprice made before it.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    reset = bulk_update(
+        supabase, "player",
+        {"base_price": None, "updated_at": now},
+        where=lambda q: q.not_.is_("base_price", "null"),
+    )
+    incr("rows.player", reset)
+    return reset
 
-def clear_all_prices(supabase, batch_size: int = 100):
+def clear_all_prices(supabase):
     """
-    Set price to NULL for all players in Supabase.
+    Set price to NULL for all players in Supabase, in a single UPDATE.
     """
-    now = datetime.now().isoformat()
+    now = datetime.now(timezone.utc).isoformat()
 
-    # Fetch all player IDs
-    response = supabase.table("player").select("id").execute()
-    all_players = response.data
+    cleared = bulk_update(supabase, "player", {"price": None, "updated_at": now})
 
-    if not all_players:
+    if not cleared:
         print("No players found in the database.")
         return
 
-    # Prepare updates
-    updates = [{"id": p["id"], "price": None, "updated_at": now} for p in all_players]
-
-    # Update in batches
-    for i in range(0, len(updates), batch_size):
-        chunk = updates[i : i + batch_size]
-        supabase.rpc("update_player_prices", {"price_updates": chunk}).execute()
-        print(f"Batch {i // batch_size + 1} cleared {len(chunk)} prices.")
-
-    print(f"✅ Cleared prices for {len(updates)} players.")
+    print(f"✅ Cleared prices for {cleared} players.")
 
+@job("init_player_prices")  # METRICS_PROFILE=1 to profile
 def main():
-    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+    supabase = instrument_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")))
     # clear_all_prices(supabase)
+    started = datetime.now(timezone.utc).isoformat()   # compared with player_aggregate.updated_at
 
     print("📊 Fetching current and past player averages...")
     current_df = fetch_player_averages_from_db(supabase)
     past_df = fetch_player_history_averages(supabase, LAST_SEASON_ID)
 
     print("🎂 Fetching player ages...")
-    age_df = fetch_player_birthdates(supabase)  # already includes `age`
-
-    # --------------------------------------------------------
-    # 1️⃣ Compute normalized fantasy performance per season
-    # --------------------------------------------------------
-    print("⚙️ Computing normalized scores for current season...")
-    current_df = compute_weighted_fantasy(current_df)
-    curr_norm = current_df[["player_id", "perf_norm"]].rename(
-        columns={"perf_norm": "curr_norm"}
-    )
-
-    print("📈 Computing normalized scores for past season...")
-    past_df = compute_weighted_fantasy(past_df)
-    past_norm = past_df[["player_id", "perf_norm"]].rename(
-        columns={"perf_norm": "past_norm"}
-    )
+    age_df = fetch_player_birthdates(supabase)  # already includes `age` and `pos`
 
     # --------------------------------------------------------
-    # 2️⃣ Merge normalized weights
+    # Price everyone in one columnar pass (see pricing_engine):
+    # normalized current (70%) / past (30%) performance, age
+    # adjustment, rookie fill, stretch, scale and round to 0.5
     # --------------------------------------------------------
-    print("🔄 Combining current (70%) and past (30%) normalized scores...")
-    merged = pd.merge(curr_norm, past_norm, on="player_id", how="outer")  # use outer so we get all players
-
-    merged["combined_norm"] = np.where(
-        merged["curr_norm"].notna(),
-        # has current season → weighted 70/30
-        merged["curr_norm"] * 0.7 + merged["past_norm"].fillna(0) * 0.3,
-        # no current season → use past season 70%
-        merged["past_norm"].fillna(0) * 0.9
-    )
-
-    # --------------------------------------------------------
-    # 3️⃣ Add age and apply adjustment (already computed)
-    # --------------------------------------------------------
-    print("🎯 Applying age adjustment to final score...")
-    merged = pd.merge(merged, age_df, on="player_id", how="left")
-
-    def age_weight(age):
-        if pd.isna(age):
-            return 1.0
-        if age < 20:
-            return 1
-        elif age < 24:
-            return 1.1
-        elif age < 28:
-            return 1.05
-        elif age < 31:
-            return 0.95
-        elif age < 35:
-            return 0.90
-        else:
-            return 1.0
-
-    merged["age_factor"] = merged["age"].apply(age_weight)
-    # Apply age factor to the combined_norm BEFORE normalizing
-    merged["weighted_score"] = merged["combined_norm"] * merged["age_factor"]
-
-    # --------------------------------------------------------
-    # 4️⃣ Handle rookies / NaNs before price calculation
-    # --------------------------------------------------------
-    min_score = merged["weighted_score"].min()
-    merged["weighted_score"] = merged["weighted_score"].fillna(merged["curr_norm"].fillna(min_score))
-
-    # --------------------------------------------------------
-    # 4️⃣ Calculate prices from final score
-    # --------------------------------------------------------
-    merged = merged.rename(columns={"final_score": "perf_norm"})
     print("💰 Calculating prices...")
-    priced_df = calculate_prices(merged)
+    inputs = PricingInputs.from_frames(current_df, past_df, age_df)
+    with span("pricing"):
+        result = price_players(inputs, PRICING_PARAMS)
+        priced_df = result.to_frame()
+
+    check_squad_balance(priced_df, current_df, age_df)
 
     # plot_price_distribution(priced_df)
 
@@ -373,6 +206,14 @@ def main():
 
     fill_all_missing_prices(supabase, default_price=MIN_PRICE)
 
+    # current_price = the new price plus each player's transfer demand offset
+    reset_base_prices(supabase)
+    published = publish_prices(supabase)
+    print(f"💱 Published {len(published)} current prices.")
+
+    # Incremental repricing (reprice.py) prices on this run's scale from now on
+    save_pricing_state(supabase, result.bounds, aggregated_through=started)
+
     print(
         f"✅ Done! Avg price: {priced_df['price'].mean():.2f}, "
         f"Range: {priced_df['price'].min()}–{priced_df['price'].max()}"
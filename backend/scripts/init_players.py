@@ -1,5 +1,4 @@
 import csv
-import time
 from dotenv import load_dotenv
 from nba_api.stats.static import players
 from nba_api.stats.endpoints import commonplayerinfo
@@ -7,6 +6,9 @@ from supabase import create_client
 from nba_api.stats.library.http import NBAStatsHTTP
 import os
 
+from backend.scripts.nba_cache import get_common_player_info
+from backend.scripts.table_reader import iter_rows
+
 load_dotenv()
 
 # Fix for GitHub Actions / cloud IP blocks
@@ -38,8 +40,7 @@ def get_all_active_players(limit=None):
 def get_player_details(player_id):
     """Fetch detailed player info using nba_api"""
     try:
-        info = commonplayerinfo.CommonPlayerInfo(player_id=player_id)
-        data = info.get_normalized_dict()["CommonPlayerInfo"][0]
+        data = get_common_player_info(player_id)["CommonPlayerInfo"][0]
 
         # Get position and trim to first part if it has a dash
         position = data.get("POSITION") or "Unknown"
@@ -98,8 +99,7 @@ def main():
     supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
 
     # Fetch from supabase
-    existing_data = supabase.table("player").select("id").execute()
-    existing_ids = {p["id"] for p in existing_data.data} if existing_data.data else set()
+    existing_ids = {p["id"] for p in iter_rows(supabase, "player", "id")}
     print(f"Found {len(existing_ids)} existing players in Supabase")
 
     # Get from nba_api
@@ -120,7 +120,6 @@ def main():
         if details:
             player_records.append(details)
         print(f"[{i}/{len(new_players)}] Fetched: {details['id'] if details else 'Error'}")
-        time.sleep(0.6)
 
     if player_records:
         print(f"Inserting {len(player_records)} new players into Supabase.")
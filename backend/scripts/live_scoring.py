@@ -0,0 +1,134 @@
+import time
+from datetime import datetime
+
+from backend.scripts.fetch_box import (
+    PLAYER_GAME_KEY,
+    build_game,
+    fetch_box_scores,
+    fetch_player_game_hashes,
+    get_gameweek_for_date,
+)
+from backend.scripts.nba_cache import get_live_scoreboard
+from backend.scripts.roster_cache import RosterCache
+from backend.scripts.squad_scoring import load_lineups, score_gameweek
+
+POLL_INTERVAL = 60  # seconds between polls; live box scores are cached for 30s
+
+GAME_STATUS_SCHEDULED = 1
+GAME_STATUS_LIVE = 2
+GAME_STATUS_FINAL = 3
+
+class LiveScorer:
+    """
+    Polls in-progress games and upserts only the player_game rows whose
+    stat line changed since the previous poll. A game stops being polled
+    once its final box score has been written. With score_squads, squad
+    points and ranks for the touched gameweeks are refreshed after each
+    poll (lineups and rank boards stay in memory for the whole run).
+    """
+
+    def __init__(self, supabase, score_squads=True):
+        self.supabase = supabase
+        self.roster = RosterCache(supabase)
+        self.hashes = {}      # (player_id, game_id) -> stats_hash
+        self.seeded = set()   # games whose stored hashes have been loaded
+        self.finished = set()
+        self.score_squads = score_squads
+        self.lineups = {}     # gameweek -> locked lineups
+        self.touched = set()  # gameweeks with player_game changes since the last rescore
+
+    def apply(self, game_id, game):
+        """Write the changed rows for one box score. Returns rows written."""
+        gameweek = get_gameweek_for_date(
+            self.supabase,
+            datetime.strptime(game["gameTimeUTC"][:10], "%Y-%m-%d").date(),
+        )
+        built = build_game(game_id, game, gameweek, self.supabase, self.roster)
+
+        # A restarted run picks up where the last one left off
+        if game_id not in self.seeded:
+            self.hashes.update(fetch_player_game_hashes(self.supabase, [game["gameId"]]))
+            self.seeded.add(game_id)
+
+        # New players land before their stats (FK). Rows of players whose
+        # insert failed would fail the whole upsert, so they are left for
+        # the morning run, which retries the insert with a fresh roster.
+        self.roster.flush_new_players()
+        rows = [row for row in built["player_games"] if row["player_id"] not in self.roster.failed]
+
+        changed = []
+        for row in rows:
+            key = (row["player_id"], row["game_id"])
+            if self.hashes.get(key) != row["stats_hash"]:
+                changed.append((key, row["stats_hash"], row))
+
+        if changed:
+            # game row first (live score + FK target), then stats
+            self.supabase.table("game").upsert(built["game"]).execute()
+            self.supabase.table("player_game") \
+                .upsert([row for _, _, row in changed], on_conflict=PLAYER_GAME_KEY) \
+                .execute()
+            for key, digest, _ in changed:
+                self.hashes[key] = digest
+            self.touched.add(gameweek)
+
+        if game.get("gameStatus") == GAME_STATUS_FINAL:
+            self.finished.add(game_id)
+
+        return len(changed)
+
+    def poll(self):
+        """
+        One polling round over today's games. Returns True while any game
+        is still scheduled or in progress.
+        """
+        games = get_live_scoreboard(ttl=POLL_INTERVAL // 2)["games"]
+        to_poll = [
+            g["gameId"] for g in games
+            if g["gameId"] not in self.finished and g.get("gameStatus", GAME_STATUS_SCHEDULED) >= GAME_STATUS_LIVE
+        ]
+
+        for game_id, game, error in fetch_box_scores(to_poll):
+            if error is not None:
+                print(f"Error fetching live box score for {game_id}: {error}")
+                continue
+            try:
+                written = self.apply(game_id, game)
+                status = "final" if game_id in self.finished else "live"
+                print(f"{game_id} ({status}): {written} player_game rows changed")
+            except Exception as e:
+                print(f"Error applying live box score for {game_id}: {e}")
+
+        if self.score_squads and self.touched:
+            self.rescore()
+
+        return any(g["gameId"] not in self.finished for g in games)
+
+
+    def rescore(self):
+        """Refresh squad points and ranks for every touched gameweek."""
+        for gameweek in sorted(self.touched):
+            try:
+                lineups = self.lineups.get(gameweek)
+                if lineups is None or lineups.empty:
+                    lineups = self.lineups[gameweek] = load_lineups(self.supabase, gameweek)
+                # No snapshot yet: let score_gameweek decide whether to take one
+                score_gameweek(self.supabase, gameweek, None if lineups.empty else lineups)
+            except Exception as e:
+                print(f"Error scoring squads for gameweek {gameweek}: {e}")
+        self.touched.clear()
+
+
+def run_live_scoring(supabase, interval=POLL_INTERVAL, max_minutes=None):
+    """Poll until every game today is final (or max_minutes elapse)."""
+    scorer = LiveScorer(supabase)
+    deadline = time.monotonic() + max_minutes * 60 if max_minutes else None
+
+    while scorer.poll():
+        if deadline is not None and time.monotonic() + interval > deadline:
+            print("Reached max run time, stopping live scoring.")
+            break
+        time.sleep(interval)
+
+    scorer.roster.flush()
+    print(f"Live scoring stopped; {len(scorer.finished)} games final.")
@@ -0,0 +1,204 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# -----------------------------
+# Config
+# -----------------------------
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join("log", "metrics.jsonl"))
+PROFILE_DIR = os.path.join("log", "profile")
+# METRICS_PROFILE=1 turns on cProfile for every job (same as job(..., profile=True))
+PROFILE = os.getenv("METRICS_PROFILE", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters = Counter()
+_spans = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+_job_name = None
+
+
+# -----------------------------
+# Sink
+# -----------------------------
+
+def emit(event, path=None):
+    """Append one JSON event to the metrics file."""
+    path = path or METRICS_FILE
+    event = {"ts": datetime.now().isoformat(), "job": _job_name, **event}
+    line = json.dumps(event, default=str) + "\n"
+    with _lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# -----------------------------
+# Counters
+# -----------------------------
+
+def incr(name, n=1):
+    """Add n to a named counter (e.g. "nba_api.calls", "rows.player_game")."""
+    with _lock:
+        _counters[name] += n
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+
+@contextmanager
+def span(name, log=True, **fields):
+    """
+    Time a block. Nested spans get a "parent/child" path. Every span is
+    aggregated into the job summary; with log=True it is also written to
+    the sink on its own (keep log=False for per-row / per-game hot paths).
+
+    Yields a dict: put extra fields in it (rows=..., games=...) to log them.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    path = "/".join(stack + [name])
+    stack.append(name)
+
+    extra = dict(fields)
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield extra
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        stack.pop()
+        with _lock:
+            agg = _spans[path]
+            agg["count"] += 1
+            agg["total_ms"] += ms
+            agg["max_ms"] = max(agg["max_ms"], ms)
+        if log:
+            emit({"type": "span", "span": path, "ms": round(ms, 2), "ok": ok, **extra})
+
+
+def timed(name=None, log=True):
+    """Decorator form of span(); the name defaults to the function name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__, log=log):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# -----------------------------
+# Supabase HTTP accounting
+# -----------------------------
+
+def instrument_supabase(supabase):
+    """
+    Count PostgREST requests and bytes moved via httpx event hooks.
+    Silently does nothing for clients without an httpx session.
+    """
+    try:
+        hooks = supabase.postgrest.session.event_hooks
+    except AttributeError:
+        return supabase
+
+    def on_request(request):
+        incr("supabase.requests")
+        incr("supabase.bytes_sent", len(request.content or b""))
+
+    def on_response(response):
+        response.read()
+        incr("supabase.bytes_received", len(response.content))
+        if response.status_code >= 400:
+            incr("supabase.errors")
+
+    hooks["request"] = hooks.get("request", []) + [on_request]
+    hooks["response"] = hooks.get("response", []) + [on_response]
+    return supabase
+
+
+# -----------------------------
+# Jobs
+# -----------------------------
+
+def _summary():
+    with _lock:
+        spans = {
+            path: {"count": s["count"], "total_ms": round(s["total_ms"], 2), "max_ms": round(s["max_ms"], 2)}
+            for path, s in sorted(_spans.items())
+        }
+        return spans, dict(_counters)
+
+
+def _dump_profile(profiler, name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(PROFILE_DIR, f"{name}_{stamp}.prof")
+    profiler.dump_stats(path)
+
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(30)
+    with open(path[:-len(".prof")] + ".txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+    return path
+
+
+@contextmanager
+def job(name, profile=None):
+    """
+    Wrap a whole job run: resets counters and span totals, and on exit
+    writes one "job" event with the duration, every counter and the
+    aggregated span timings. profile=True (or METRICS_PROFILE=1) also dumps
+    cProfile output to log/profile/<job>_<timestamp>.prof (+ .txt top 30).
+    """
+    global _job_name
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+    _job_name = name
+
+    profiler = cProfile.Profile() if (PROFILE if profile is None else profile) else None
+    if profiler:
+        profiler.enable()
+
+    started = time.perf_counter()
+    ok = True
+    try:
+        with span(name, log=False):
+            yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        seconds = time.perf_counter() - started
+        spans, totals = _summary()
+        emit({"type": "job", "seconds": round(seconds, 3), "ok": ok, "counters": totals, "spans": spans})
+
+        print(f"⏱️ {name} took {seconds:.1f}s")
+        for path, s in spans.items():
+            if path != name:
+                print(f"   {path}: {s['total_ms'] / 1000:.2f}s over {s['count']} calls")
+        if totals:
+            print("   " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+        if profiler:
+            print(f"🔬 Profile written to {_dump_profile(profiler, name)}")
+        _job_name = None
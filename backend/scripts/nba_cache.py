@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from nba_api.live.nba.endpoints import boxscore, scoreboard
+from nba_api.stats.endpoints import commonplayerinfo, playercareerstats, scoreboardv2
+
+from backend.scripts.metrics import incr
+from backend.scripts.rate_limiter import call_with_retry
+
+# -----------------------------
+# Config
+# -----------------------------
+# NBA_CACHE_MODE:
+#   "on"     - serve fresh cache hits, fetch + store misses (default)
+#   "off"    - always hit the network, never read or write the cache
+#   "replay" - serve only from cache (expired entries included), never hit
+#              the network; a miss raises CacheMiss. For offline runs.
+CACHE_DIR = os.getenv("NBA_CACHE_DIR", os.path.join("cache", "nba"))
+CACHE_MODE = os.getenv("NBA_CACHE_MODE", "on").lower()
+
+FOREVER = None
+LIVE_GAME_TTL = 30          # box score of a game still in progress
+SCOREBOARD_TTL = 5 * 60     # today's / recent scoreboards
+PLAYER_INFO_TTL = 24 * 3600  # team, position can change
+
+GAME_STATUS_FINAL = 3
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a response was never recorded."""
+
+
+def _fetch_upstream(fetch):
+    # Every real request shares the process-wide limiter and retry policy
+    return call_with_retry(fetch)
+
+
+# -----------------------------
+# Cache core
+# -----------------------------
+
+def cache_key(endpoint, params):
+    """Content address for a request: sha256 of endpoint + sorted params."""
+    payload = json.dumps({"endpoint": endpoint, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(endpoint, key):
+    return os.path.join(CACHE_DIR, endpoint, f"{key}.json")
+
+
+def _read_entry(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_entry(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)  # atomic, safe with concurrent writers
+
+
+def cached_request(endpoint, params, fetch, ttl=FOREVER):
+    """
+    Return the JSON payload for (endpoint, params), calling fetch() only on
+    a cache miss or expired entry.
+
+    ttl: seconds the entry stays fresh, FOREVER (None) for immutable data,
+    or a callable(payload) -> ttl when freshness depends on the content
+    (e.g. a box score is immutable only once the game is final).
+    """
+    if CACHE_MODE == "off":
+        return _fetch_upstream(fetch)
+
+    key = cache_key(endpoint, params)
+    path = _cache_path(endpoint, key)
+    entry = _read_entry(path)
+
+    if CACHE_MODE == "replay":
+        if entry is None:
+            raise CacheMiss(f"No recorded response for {endpoint} {params}")
+        incr("nba_cache.hits")
+        return entry["data"]
+
+    if entry is not None and (entry["expires_at"] is None or entry["expires_at"] > time.time()):
+        incr("nba_cache.hits")
+        return entry["data"]
+
+    incr("nba_cache.misses")
+    data = _fetch_upstream(fetch)
+    seconds = ttl(data) if callable(ttl) else ttl
+    if seconds == 0:
+        return data
+
+    _write_entry(path, {
+        "endpoint": endpoint,
+        "params": params,
+        "fetched_at": time.time(),
+        "expires_at": None if seconds is FOREVER else time.time() + seconds,
+        "data": data,
+    })
+    return data
+
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+
+def get_live_box_score(game_id):
+    """LIVE box score `game` dict. Cached forever once the game is final."""
+    def ttl(game):
+        return FOREVER if game.get("gameStatus") == GAME_STATUS_FINAL else LIVE_GAME_TTL
+
+    return cached_request(
+        "live_boxscore",
+        {"game_id": str(game_id)},
+        lambda: boxscore.BoxScore(game_id=game_id).get_dict()["game"],
+        ttl,
+    )
+
+
+def get_live_scoreboard(ttl=SCOREBOARD_TTL):
+    """Today's LIVE scoreboard as {"date": "YYYY-MM-DD", "games": [...]}."""
+    def fetch():
+        sb = scoreboard.ScoreBoard()
+        return {"date": sb.score_board_date, "games": sb.get_dict()["scoreboard"]["games"]}
+
+    # Keyed by the local day so yesterday's board is never served for today
+    return cached_request("live_scoreboard", {"day": date.today().isoformat()}, fetch, ttl)
+
+
+def get_scoreboard(game_date):
+    """
+    ScoreboardV2 normalized dict for game_date. Boards more than two days
+    old are settled and cached forever; recent ones expire quickly.
+    """
+    day = game_date.strftime("%Y-%m-%d")
+    settled = game_date < date.today() - timedelta(days=2)
+
+    return cached_request(
+        "scoreboardv2",
+        {"game_date": day, "league_id": "00"},
+        lambda: scoreboardv2.ScoreboardV2(game_date=day, league_id="00").get_normalized_dict(),
+        FOREVER if settled else SCOREBOARD_TTL,
+    )
+
+
+def get_common_player_info(player_id):
+    """CommonPlayerInfo normalized dict for player_id."""
+    return cached_request(
+        "commonplayerinfo",
+        {"player_id": int(player_id)},
+        lambda: commonplayerinfo.CommonPlayerInfo(player_id=player_id).get_normalized_dict(),
+        PLAYER_INFO_TTL,
+    )
+
+
+def get_player_career_stats(player_id):
+    """PlayerCareerStats normalized dict for player_id. Never expires."""
+    return cached_request(
+        "playercareerstats",
+        {"player_id": int(player_id)},
+        lambda: playercareerstats.PlayerCareerStats(player_id=player_id).get_normalized_dict(),
+        FOREVER,
+    )
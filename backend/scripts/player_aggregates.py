@@ -0,0 +1,265 @@
+"""
+Running per-player aggregates, maintained at ingest.
+
+get_player_averages re-aggregates all of player_game on every call, so its
+cost grows with the season. Instead, every committed game updates the
+player_aggregate row of each player who appeared in it: sums and counts
+move by the difference between the new stat line and the one already
+counted, the last-5/last-10 windows take the game if it is recent enough,
+and the game's gameweek total moves by the same difference. Readers select
+the avg_* / last* columns and never touch player_game.
+
+    create table player_aggregate (
+      player_id bigint primary key references player(id) on delete cascade,
+      games_played int not null default 0,
+      sum_fp numeric, sum_pts numeric, sum_reb numeric, sum_ast numeric,
+      sum_stl numeric, sum_blk numeric, sum_minutes numeric,
+      avg_fp numeric, avg_pts numeric, avg_reb numeric, avg_ast numeric,
+      avg_stl numeric, avg_blk numeric, avg_minutes numeric,
+      last5_fp numeric, last10_fp numeric, last5_minutes numeric, last10_minutes numeric,
+      gameweek_fp jsonb,   -- {"<gameweek>": fantasy points that gameweek}
+      recent jsonb,        -- [game_id, entry] of the last 10 games, newest first
+      counted jsonb,       -- {"<game_id>": entry} of every game already counted
+      updated_at timestamptz
+    );
+
+An entry is [date, gameweek, fp, pts, reb, ast, stl, blk, minutes].
+`counted` is what makes reruns and live-scored games safe: a game is only
+ever added once, and a corrected stat line moves the sums by its delta.
+
+    python -m backend.scripts.player_aggregates --rebuild
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from backend.scripts.batching import upsert_in_batches
+from backend.scripts.metrics import timed
+from backend.scripts.table_reader import chunked, iter_rows, read_dataframe
+
+AGGREGATE_TABLE = "player_aggregate"
+UPSERT_BATCH_SIZE = 500
+
+# aggregate name -> player_game column, in entry order after [date, gameweek]
+STATS = {
+    "fp": "score",
+    "pts": "points",
+    "reb": "rebounds",
+    "ast": "assists",
+    "stl": "steals",
+    "blk": "blocks",
+    "minutes": "minutes",
+}
+WINDOWS = (5, 10)
+RECENT_GAMES = max(WINDOWS)
+
+AVERAGE_COLUMNS = "player_id, games_played, " + ", ".join(f"avg_{s}" for s in STATS)
+
+
+# -----------------------------
+# Entries
+# -----------------------------
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value   # NaN -> 0
+
+
+def make_entry(row, game_date, gameweek):
+    """The counted form of one player_game row."""
+    return [str(game_date)[:10], int(gameweek)] + [_number(row.get(col)) for col in STATS.values()]
+
+
+def _empty_aggregate(player_id):
+    return {
+        "player_id": player_id,
+        "games_played": 0,
+        **{f"sum_{s}": 0.0 for s in STATS},
+        "gameweek_fp": {},
+        "recent": [],
+        "counted": {},
+    }
+
+
+# -----------------------------
+# Update
+# -----------------------------
+
+def apply_entries(agg, entries):
+    """
+    Fold {game_id: entry} into one aggregate dict in place. Returns True
+    if anything changed. Cost is proportional to the new entries, not to
+    the games already counted.
+    """
+    counted, weeks = agg["counted"], agg["gameweek_fp"]
+    recent = [list(r) for r in agg["recent"]]   # [game_id, entry], newest first
+    changed = False
+
+    for game_id, entry in entries.items():
+        game_id = str(game_id)
+        old = counted.get(game_id)
+        if old == entry:
+            continue
+        changed = True
+
+        if old is None:
+            agg["games_played"] += 1
+        else:
+            # A corrected stat line: take the counted one back out first
+            for name, before in zip(STATS, old[2:]):
+                agg[f"sum_{name}"] -= before
+            weeks[str(old[1])] = round(weeks.get(str(old[1]), 0.0) - old[2], 4)
+
+        for name, after in zip(STATS, entry[2:]):
+            agg[f"sum_{name}"] += after
+        weeks[str(entry[1])] = round(weeks.get(str(entry[1]), 0.0) + entry[2], 4)
+        counted[game_id] = entry
+
+        # Keep the game in the window only if it is among the newest
+        recent = [r for r in recent if r[0] != game_id] + [[game_id, entry]]
+        recent.sort(key=lambda r: (r[1][0], r[0]), reverse=True)
+        del recent[RECENT_GAMES:]
+
+    if changed:
+        agg["recent"] = recent
+        _finish(agg)
+    return changed
+
+
+def _finish(agg):
+    """Averages and windows from the running sums."""
+    games = agg["games_played"]
+    for name in STATS:
+        agg[f"sum_{name}"] = round(agg[f"sum_{name}"], 4)
+        agg[f"avg_{name}"] = round(agg[f"sum_{name}"] / games, 4) if games else None
+
+    fp_at, minutes_at = 2, 2 + list(STATS).index("minutes")
+    for n in WINDOWS:
+        window = [e for _, e in agg["recent"][:n]]
+        agg[f"last{n}_fp"] = round(sum(e[fp_at] for e in window) / len(window), 4) if window else None
+        agg[f"last{n}_minutes"] = round(sum(e[minutes_at] for e in window) / len(window), 4) if window else None
+
+
+def load_aggregates(supabase, player_ids):
+    """{player_id: aggregate row} for the given players (missing players are absent)."""
+    found = {}
+    for chunk in chunked(player_ids):
+        rows = iter_rows(
+            supabase, AGGREGATE_TABLE, "*", key="player_id",
+            where=lambda q, chunk=chunk: q.in_("player_id", chunk),
+        )
+        found.update({r["player_id"]: r for r in rows})
+    return found
+
+
+def write_aggregates(supabase, aggregates):
+    now = datetime.now(timezone.utc).isoformat()   # reprice's watermark compares against this
+    rows = [{**agg, "updated_at": now} for agg in aggregates]
+    return upsert_in_batches(supabase, rows, AGGREGATE_TABLE, "player_id", batch_size=UPSERT_BATCH_SIZE)
+
+
+@timed("aggregates")
+def update_player_aggregates(supabase, games):
+    """
+    Fold committed games ({"game", "player_games"} dicts, as built by
+    fetch_box.build_game) into player_aggregate. Only players who appear
+    in them are read and written, and only if their numbers changed.
+    Returns the number of players updated.
+    """
+    entries = {}
+    for g in games:
+        game = g["game"]
+        for row in g["player_games"]:
+            entries.setdefault(row["player_id"], {})[str(row["game_id"])] = make_entry(
+                row, game["date"], game["gameweek"]
+            )
+    if not entries:
+        return 0
+
+    stored = load_aggregates(supabase, entries)
+    changed = []
+    for player_id, player_entries in entries.items():
+        agg = stored.get(player_id) or _empty_aggregate(player_id)
+        for key in ("gameweek_fp", "counted"):
+            agg[key] = dict(agg.get(key) or {})
+        agg["recent"] = list(agg.get("recent") or [])
+        if apply_entries(agg, player_entries):
+            changed.append(agg)
+
+    written = write_aggregates(supabase, changed) if changed else 0
+    print(f"📈 Updated aggregates for {written}/{len(entries)} players")
+    return written
+
+
+# -----------------------------
+# Readers
+# -----------------------------
+
+def fetch_player_averages(supabase):
+    """
+    Season averages per player (the get_player_averages shape) from
+    player_aggregate. Empty DataFrame if nothing has been aggregated yet.
+    """
+    return read_dataframe(
+        supabase, AGGREGATE_TABLE, AVERAGE_COLUMNS, key="player_id",
+        where=lambda q: q.gt("games_played", 0),
+    )
+
+
+# -----------------------------
+# Rebuild
+# -----------------------------
+
+def rebuild_player_aggregates(supabase):
+    """Recompute every aggregate from player_game (first run / repair)."""
+    print("📊 Reading player_game and game...")
+    player_games = read_dataframe(
+        supabase, "player_game", "player_id, game_id, " + ", ".join(STATS.values()),
+        key=("player_id", "game_id"),
+    )
+    games = read_dataframe(supabase, "game", "id, date, gameweek")
+    if player_games.empty:
+        return 0
+
+    games["id"] = games["id"].astype(str).str.lstrip("0")
+    player_games["game_key"] = player_games["game_id"].astype(str).str.lstrip("0")
+    merged = player_games.merge(games, left_on="game_key", right_on="id", how="left")
+
+    built = []
+    for player_id, rows in merged.groupby("player_id"):
+        agg = _empty_aggregate(int(player_id))
+        apply_entries(agg, {
+            str(r["game_id"]): make_entry(r, r["date"], r["gameweek"] if pd.notna(r["gameweek"]) else 0)
+            for r in rows.to_dict("records")
+        })
+        built.append(agg)
+
+    return write_aggregates(supabase, built)
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from backend.scripts.metrics import instrument_supabase, job
+
+    parser = argparse.ArgumentParser(description="Maintain the player_aggregate table.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every player's aggregate from player_game")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = instrument_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")))
+
+    if args.rebuild:
+        with job("rebuild_player_aggregates"):
+            print(f"✅ Rebuilt aggregates for {rebuild_player_aggregates(supabase)} players.")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
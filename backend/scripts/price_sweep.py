@@ -0,0 +1,214 @@
+"""
+What-if pricing: evaluate a grid of PricingParams against one snapshot of
+the inputs, in parallel, without writing anything to Supabase.
+
+    # load inputs from Supabase once, keep a snapshot, sweep
+    python -m backend.scripts.price_sweep --save-inputs log/pricing_inputs.npz \\
+        --scaling 1.0 1.1 1.2 --avg-budget 5.6 5.87 6.0 --current-weight 0.6 0.7 0.8
+
+    # rerun offline from the snapshot
+    python -m backend.scripts.price_sweep --inputs log/pricing_inputs.npz --age-curve default flat
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+
+import numpy as np
+import pandas as pd
+
+from backend.scripts.pricing_engine import (
+    PRICING_PARAMS,
+    SQUAD_SIZE,
+    TOTAL_BUDGET,
+    PricingInputs,
+    PricingParams,
+    SeasonStats,
+    price_players,
+)
+
+# Named price age curves: (age_bins, age_weights)
+AGE_CURVES = {
+    "default": (PricingParams.age_bins, PricingParams.age_weights),
+    "flat": ((), (1.0,)),
+    "steep": ((20, 24, 28, 31, 35), (1.0, 1.15, 1.1, 0.9, 0.8, 1.0)),
+}
+
+_inputs = None  # per-worker copy, set once by the pool initializer
+
+
+# -----------------------------
+# Inputs snapshot
+# -----------------------------
+
+def load_inputs_from_supabase(supabase):
+    from backend.scripts.pricing_inputs import (
+        LAST_SEASON_ID,
+        fetch_player_averages_from_db,
+        fetch_player_birthdates,
+        fetch_player_history_averages,
+    )
+
+    print("📊 Fetching current and past player averages...")
+    current_df = fetch_player_averages_from_db(supabase)
+    past_df = fetch_player_history_averages(supabase, LAST_SEASON_ID)
+    print("🎂 Fetching player ages...")
+    age_df = fetch_player_birthdates(supabase)
+    return PricingInputs.from_frames(current_df, past_df, age_df)
+
+
+def save_inputs(inputs, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {"player_id": inputs.player_id, "age": inputs.age}
+    for season in ("current", "past"):
+        for name, values in asdict(getattr(inputs, season)).items():
+            arrays[f"{season}_{name}"] = values
+    np.savez_compressed(path, **arrays)
+    print(f"📁 Saved pricing inputs → {path}")
+
+
+def load_inputs(path):
+    data = np.load(path)
+
+    def season(prefix):
+        return SeasonStats(**{
+            name: data[f"{prefix}_{name}"] for name in ("player_id", "avg_fp", "avg_minutes", "games_played")
+        })
+
+    return PricingInputs(current=season("current"), past=season("past"),
+                         player_id=data["player_id"], age=data["age"])
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+
+def price_stats(prices):
+    """describe() + value_counts() of a price array, plus budget checks."""
+    series = pd.Series(prices, name="price")
+    top_squad = np.sort(prices)[::-1][:SQUAD_SIZE].sum()
+    return {
+        "describe": {k: round(float(v), 4) for k, v in series.describe().items()},
+        "value_counts": {float(k): int(v) for k, v in series.value_counts().sort_index().items()},
+        "at_min_price": int((prices == prices.min()).sum()) if len(prices) else 0,
+        "top_squad_cost": float(top_squad),
+        "top_squad_over_budget": float(top_squad - TOTAL_BUDGET),
+    }
+
+
+def _init_worker(inputs):
+    global _inputs
+    _inputs = inputs
+
+
+def evaluate(params):
+    """Price the worker's inputs with params; returns (params, stats)."""
+    result = price_players(_inputs, params)
+    return params, price_stats(result.price)
+
+
+def build_grid(base, scaling=None, avg_budget=None, current_weight=None, age_curve=None):
+    """Cartesian product of the given values; unspecified ones stay at base."""
+    axes = {
+        "top_player_scaling_factor": scaling or [base.top_player_scaling_factor],
+        "avg_budget_per_player": avg_budget or [base.avg_budget_per_player],
+        "current_weight": current_weight or [base.current_weight],
+        "age_curve": age_curve or ["default"],
+    }
+
+    grid = []
+    for scale, budget, weight, curve in itertools.product(*axes.values()):
+        bins, weights = AGE_CURVES[curve]
+        grid.append(replace(
+            base,
+            top_player_scaling_factor=scale,
+            avg_budget_per_player=budget,
+            current_weight=weight,
+            past_weight=round(1 - weight, 10),
+            age_bins=bins,
+            age_weights=weights,
+        ))
+    return grid
+
+
+def sweep(inputs, grid, workers=None):
+    """Evaluate every param set across a process pool. Inputs are sent once per worker."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(grid) == 1:
+        _init_worker(inputs)
+        return [evaluate(p) for p in grid]
+
+    chunksize = max(1, len(grid) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(inputs,)) as pool:
+        return list(pool.map(evaluate, grid, chunksize=chunksize))
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+
+def curve_name(params):
+    for name, (bins, weights) in AGE_CURVES.items():
+        if tuple(params.age_bins) == tuple(bins) and tuple(params.age_weights) == tuple(weights):
+            return name
+    return "custom"
+
+
+def print_results(results, details=False):
+    print(f"{'scale':>6} {'avg':>6} {'curr':>5} {'age':>8} | {'mean':>6} {'std':>5} {'min':>5} "
+          f"{'50%':>5} {'max':>5} {'@min':>5} {'top13':>6}")
+    for params, stats in results:
+        d = stats["describe"]
+        print(f"{params.top_player_scaling_factor:>6} {params.avg_budget_per_player:>6} "
+              f"{params.current_weight:>5} {curve_name(params):>8} | {d['mean']:>6.2f} {d['std']:>5.2f} "
+              f"{d['min']:>5} {d['50%']:>5} {d['max']:>5} {stats['at_min_price']:>5} {stats['top_squad_cost']:>6}")
+        if details:
+            print("📊 Price Summary Statistics:")
+            print(pd.Series(d, name="price"))
+            print(pd.Series(stats["value_counts"], name="count"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep pricing parameters without touching the database.")
+    parser.add_argument("--inputs", help="load a saved inputs snapshot (.npz) instead of Supabase")
+    parser.add_argument("--save-inputs", help="save the inputs loaded from Supabase to this .npz")
+    parser.add_argument("--scaling", type=float, nargs="+", help="TOP_PLAYER_SCALING_FACTOR values")
+    parser.add_argument("--avg-budget", type=float, nargs="+", help="AVG_BUDGET_PER_PLAYER values")
+    parser.add_argument("--current-weight", type=float, nargs="+", help="current season share of the blend")
+    parser.add_argument("--age-curve", nargs="+", choices=list(AGE_CURVES), help="price age curves")
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--details", action="store_true", help="print describe() and value_counts() per set")
+    parser.add_argument("--json", help="write every result to this file")
+    args = parser.parse_args()
+
+    if args.inputs:
+        inputs = load_inputs(args.inputs)
+        base = PricingParams()
+    else:
+        from dotenv import load_dotenv
+        from supabase import create_client
+
+        load_dotenv()
+        supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+        inputs = load_inputs_from_supabase(supabase)
+        base = PRICING_PARAMS
+        if args.save_inputs:
+            save_inputs(inputs, args.save_inputs)
+
+    grid = build_grid(base, args.scaling, args.avg_budget, args.current_weight, args.age_curve)
+    print(f"Evaluating {len(grid)} parameter sets over {len(inputs.current.player_id)} current / "
+          f"{len(inputs.past.player_id)} past players...")
+    results = sweep(inputs, grid, args.workers)
+    print_results(results, args.details)
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([{"params": asdict(p), "stats": s} for p, s in results], f, indent=2)
+        print(f"📁 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
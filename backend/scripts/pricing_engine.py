@@ -0,0 +1,339 @@
+"""
+Columnar player pricing.
+
+Pure NumPy/pandas: typed arrays in, typed arrays out, no per-row Python and
+no I/O, so a whole league (or a synthetic one of 100k players) prices in
+milliseconds. init_player_prices fetches the inputs and publishes the
+result; price_sweep calls price_players() with many PricingParams.
+"""
+from dataclasses import asdict, dataclass, fields
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# The game's price rules, shared by every job that prices, moves or checks prices
+MIN_PRICE = 4.0
+PRICE_STEP = 0.5       # prices are multiples of this
+TOTAL_BUDGET = 100     # a squad's budget
+SQUAD_SIZE = 13
+
+
+@dataclass(frozen=True)
+class PricingParams:
+    min_price: float = MIN_PRICE
+    avg_budget_per_player: float = 5.87
+    top_player_scaling_factor: float = 1.1   # exponent stretching top performers
+
+    # current / past season blend
+    current_weight: float = 0.7
+    past_weight: float = 0.3
+    past_only_weight: float = 0.9            # players with no current season
+
+    # weighted fantasy score
+    fp_weight: float = 0.7
+    games_weight: float = 0.15
+    minutes_weight: float = 0.15
+    full_games: float = 10                   # games played for full games weight
+
+    # performance age curve (only used when ages are passed to weighted_fantasy)
+    prime_ages: tuple = (22, 28)
+    prime_factor: float = 1.1
+    decline_age: float = 31
+    decline_factor: float = 0.9
+
+    # price age curve: age < age_bins[i] gets age_weights[i], older gets age_weights[-1]
+    age_bins: tuple = (20, 24, 28, 31, 35)
+    age_weights: tuple = (1.0, 1.1, 1.05, 0.95, 0.90, 1.0)
+    unknown_age_weight: float = 1.0
+
+
+PRICING_PARAMS = PricingParams()   # the live game's settings
+
+
+# -----------------------------
+# Inputs / outputs
+# -----------------------------
+
+def _numeric(frame, column, dtype="float64"):
+    if column not in frame.columns:
+        return np.zeros(len(frame), dtype=dtype)
+    return pd.to_numeric(frame[column], errors="coerce").fillna(0).to_numpy(dtype=dtype)
+
+
+@dataclass
+class SeasonStats:
+    """Per-player season averages, one entry per player."""
+    player_id: np.ndarray     # int64
+    avg_fp: np.ndarray        # float64
+    avg_minutes: np.ndarray   # float64
+    games_played: np.ndarray  # float64
+
+    @classmethod
+    def from_frame(cls, frame):
+        """From a get_player_averages / player_history averages DataFrame."""
+        return cls(
+            player_id=frame["player_id"].to_numpy(dtype="int64"),
+            avg_fp=_numeric(frame, "avg_fp"),
+            avg_minutes=_numeric(frame, "avg_minutes"),
+            games_played=_numeric(frame, "games_played"),
+        )
+
+
+@dataclass
+class PricingInputs:
+    current: SeasonStats
+    past: SeasonStats
+    player_id: np.ndarray     # int64, players with a known birthdate row
+    age: np.ndarray           # float64, NaN when unknown
+
+    @classmethod
+    def from_frames(cls, current_df, past_df, age_df):
+        return cls(
+            current=SeasonStats.from_frame(current_df),
+            past=SeasonStats.from_frame(past_df),
+            player_id=age_df["player_id"].to_numpy(dtype="int64"),
+            age=pd.to_numeric(age_df["age"], errors="coerce").to_numpy(dtype="float64"),
+        )
+
+
+@dataclass(frozen=True)
+class SeasonBounds:
+    """Normalization bounds of one season's weighted fantasy score."""
+    max_minutes: float
+    low: float
+    high: float
+
+
+@dataclass(frozen=True)
+class PricingBounds:
+    """
+    Every league-wide statistic price_players depends on. Pricing a subset
+    of players with the bounds of the last full run puts them on the same
+    scale without touching anyone else.
+    """
+    current: SeasonBounds
+    past: SeasonBounds
+    score_min: float     # min weighted score (also the fill for players without one)
+    score_top: float     # max of weighted score - score_min, the stretch divisor
+    mean_scale: float    # target mean / mean of the stretched scores
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            current=SeasonBounds(**data["current"]),
+            past=SeasonBounds(**data["past"]),
+            score_min=data["score_min"],
+            score_top=data["score_top"],
+            mean_scale=data["mean_scale"],
+        )
+
+
+@dataclass
+class PricingResult:
+    player_id: np.ndarray
+    curr_norm: np.ndarray
+    past_norm: np.ndarray
+    combined_norm: np.ndarray
+    age: np.ndarray
+    age_factor: np.ndarray
+    weighted_score: np.ndarray
+    weighted_score_filled: np.ndarray
+    raw_price: np.ndarray
+    price: np.ndarray
+    bounds: PricingBounds = None   # fitted on this run, or the frozen ones passed in
+
+    def to_frame(self):
+        return pd.DataFrame({f.name: getattr(self, f.name) for f in fields(self) if f.name != "bounds"})
+
+
+# -----------------------------
+# Reductions (NaN-skipping, like the pandas ones they replace)
+# -----------------------------
+
+def _nanmin(x):
+    return np.nanmin(x) if np.any(~np.isnan(x)) else np.nan
+
+
+def _nanmax(x):
+    return np.nanmax(x) if np.any(~np.isnan(x)) else np.nan
+
+
+def _nanmean(x):
+    return np.nanmean(x) if np.any(~np.isnan(x)) else np.nan
+
+
+def _fillna(x, fill):
+    return np.where(np.isnan(x), fill, x)
+
+
+# -----------------------------
+# Steps
+# -----------------------------
+
+def ages_on(birthdates, on: date):
+    """Whole years of age on `on` for ISO birthdate strings; NaN if missing."""
+    born = pd.to_datetime(pd.Series(birthdates, dtype="object").str[:10], format="%Y-%m-%d", errors="coerce")
+    years = on.year - born.dt.year
+    before_birthday = (on.month < born.dt.month) | ((on.month == born.dt.month) & (on.day < born.dt.day))
+    return (years - before_birthday.astype("float64")).to_numpy(dtype="float64")
+
+
+def prime_age_factor(ages, params=PricingParams()):
+    """Performance age curve: boost in prime, discount past decline_age, else 1."""
+    ages = np.asarray(ages, dtype="float64")
+    low, high = params.prime_ages
+    return np.where(
+        (ages >= low) & (ages <= high), params.prime_factor,
+        np.where(ages >= params.decline_age, params.decline_factor, 1.0),
+    )
+
+
+def age_weight(ages, params=PricingParams()):
+    """Price age curve over age_bins; unknown ages get unknown_age_weight."""
+    ages = np.asarray(ages, dtype="float64")
+    bucket = np.searchsorted(np.asarray(params.age_bins, dtype="float64"), np.nan_to_num(ages), side="right")
+    weights = np.asarray(params.age_weights, dtype="float64")[bucket]
+    return np.where(np.isnan(ages), params.unknown_age_weight, weights)
+
+
+def _weighted(avg_fp, avg_minutes, games_played, age_factor, params, max_minutes):
+    games_weight = np.minimum(games_played / params.full_games, 1.0)
+    minutes_weight = avg_minutes / (max_minutes or 1)
+    return avg_fp * (
+        params.fp_weight * age_factor + params.games_weight * games_weight + params.minutes_weight * minutes_weight
+    )
+
+
+def season_bounds(avg_fp, avg_minutes, games_played, age_factor=1.0, params=PricingParams()):
+    """Fit the SeasonBounds weighted_fantasy normalizes with."""
+    max_minutes = _nanmax(avg_minutes)
+    weighted = _weighted(avg_fp, avg_minutes, games_played, age_factor, params, max_minutes)
+    return SeasonBounds(max_minutes=float(max_minutes), low=float(_nanmin(weighted)), high=float(_nanmax(weighted)))
+
+
+def weighted_fantasy(avg_fp, avg_minutes, games_played, age_factor=1.0, params=PricingParams(), bounds=None):
+    """
+    Weighted fantasy score and its min-max normalization (perf_norm),
+    against these players' own bounds or the given SeasonBounds.
+    Returns (weighted_fp, perf_norm).
+    """
+    max_minutes = bounds.max_minutes if bounds else _nanmax(avg_minutes)
+    weighted = _weighted(avg_fp, avg_minutes, games_played, age_factor, params, max_minutes)
+    low, high = (bounds.low, bounds.high) if bounds else (_nanmin(weighted), _nanmax(weighted))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return weighted, (weighted - low) / (high - low)
+
+
+def _align(ids, keys, values):
+    """values (indexed by unique keys) looked up at ids; NaN where missing."""
+    out = np.full(len(ids), np.nan)
+    if not len(keys):
+        return out
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    pos = np.clip(np.searchsorted(sorted_keys, ids), 0, len(keys) - 1)
+    found = sorted_keys[pos] == ids
+    out[found] = values[order][pos[found]]
+    return out
+
+
+def round_half(values):
+    """Round to the nearest 0.5 (ties to even, like round()); NaN -> 0."""
+    values = np.asarray(values, dtype="float64")
+    return np.where(np.isnan(values), 0.0, np.rint(values * 2) / 2)
+
+
+def _score_bounds(weighted_score, curr_norm, params):
+    """(filled, score_min, score_top, mean_scale) fitted on these scores."""
+    filled = _fillna(weighted_score, _fillna(curr_norm, _nanmin(weighted_score)))
+    score_min = _nanmin(filled)
+    raw = filled - score_min
+
+    top = _nanmax(raw)
+    if top > 0:
+        raw = (raw / top) ** params.top_player_scaling_factor
+
+    current_mean = _nanmean(raw)
+    scale = (params.avg_budget_per_player - params.min_price) / current_mean if current_mean > 0 else 1.0
+    return filled, score_min, top, scale
+
+
+def scores_to_prices(weighted_score, curr_norm, params=PricingParams(), bounds=None):
+    """
+    Weighted score -> price: fill gaps, shift to 0, stretch top performers,
+    scale to the target mean, add the minimum and round to 0.5. With
+    bounds (a PricingBounds), shift/stretch/scale reuse the stored ones.
+    Returns (weighted_score_filled, raw_price, price).
+    """
+    if bounds is None:
+        filled, score_min, top, scale = _score_bounds(weighted_score, curr_norm, params)
+        raw = filled - score_min
+    else:
+        score_min, top, scale = bounds.score_min, bounds.score_top, bounds.mean_scale
+        filled = _fillna(weighted_score, _fillna(curr_norm, score_min))
+        raw = np.maximum(filled - score_min, 0.0)   # below the stored floor prices at the minimum
+
+    if top > 0:
+        raw = (raw / top) ** params.top_player_scaling_factor
+    if scale != 1.0:
+        raw = raw * scale
+
+    raw = raw + params.min_price
+    return filled, raw, round_half(raw)
+
+
+def price_players(inputs: PricingInputs, params=PricingParams(), bounds=None) -> PricingResult:
+    """
+    The whole pricing model as one pure function of its inputs. Without
+    bounds every statistic is fitted on `inputs` (a full league run; the
+    fitted PricingBounds come back on the result). With bounds, `inputs`
+    can be any subset of players and is priced on the stored scale.
+    """
+    current, past = inputs.current, inputs.past
+    curr_bounds = bounds.current if bounds else season_bounds(
+        current.avg_fp, current.avg_minutes, current.games_played, params=params)
+    past_bounds = bounds.past if bounds else season_bounds(
+        past.avg_fp, past.avg_minutes, past.games_played, params=params)
+    _, curr_perf = weighted_fantasy(current.avg_fp, current.avg_minutes, current.games_played,
+                                    params=params, bounds=curr_bounds)
+    _, past_perf = weighted_fantasy(past.avg_fp, past.avg_minutes, past.games_played,
+                                    params=params, bounds=past_bounds)
+
+    # Every player with either season, in player_id order (as an outer merge)
+    player_id = np.union1d(current.player_id, past.player_id)
+    curr_norm = _align(player_id, current.player_id, curr_perf)
+    past_norm = _align(player_id, past.player_id, past_perf)
+
+    past_filled = _fillna(past_norm, 0)
+    combined = np.where(
+        ~np.isnan(curr_norm),
+        curr_norm * params.current_weight + past_filled * params.past_weight,
+        past_filled * params.past_only_weight,
+    )
+
+    age = _align(player_id, inputs.player_id, inputs.age)
+    factor = age_weight(age, params)
+    weighted = combined * factor
+    weighted = _fillna(weighted, _fillna(curr_norm, bounds.score_min if bounds else _nanmin(weighted)))
+
+    if bounds is None:
+        _, score_min, top, scale = _score_bounds(weighted, curr_norm, params)
+        bounds = PricingBounds(curr_bounds, past_bounds, float(score_min), float(top), float(scale))
+    filled, raw, price = scores_to_prices(weighted, curr_norm, params, bounds)
+    return PricingResult(
+        player_id=player_id,
+        curr_norm=curr_norm,
+        past_norm=past_norm,
+        combined_norm=combined,
+        age=age,
+        age_factor=factor,
+        weighted_score=weighted,
+        weighted_score_filled=filled,
+        raw_price=raw,
+        price=price,
+        bounds=bounds,
+    )
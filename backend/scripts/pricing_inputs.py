@@ -0,0 +1,98 @@
+"""
+Reads pricing_engine's inputs from Supabase: current season averages,
+last season's averages and player ages. Shared by init_player_prices (full
+rebalance), reprice (incremental) and price_sweep.
+"""
+from datetime import date
+
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from backend.scripts.metrics import timed
+from backend.scripts.player_aggregates import fetch_player_averages
+from backend.scripts.pricing_engine import ages_on
+from backend.scripts.scoring import calculate_scores
+from backend.scripts.table_reader import read_dataframe
+
+NBA_SEASON_START = date(2025, 10, 1)
+LAST_SEASON_ID = "2024-25"
+
+
+@timed("fetch.ages")
+def fetch_player_birthdates(supabase, player_ids=None):
+    """Fetch player IDs, birthdates (as age) and positions from Supabase (optionally only player_ids)."""
+    where = (lambda q: q.in_("id", list(player_ids))) if player_ids is not None else None
+    df = read_dataframe(supabase, "player", "id, birthdate, pos", where=where)
+    if df.empty:
+        raise ValueError("No player birthdates returned from Supabase.")
+
+    # Compute age as of start of season
+    df["age"] = ages_on(df["birthdate"], NBA_SEASON_START)
+    return df[["id", "age", "pos"]].rename(columns={"id": "player_id"})
+
+
+@timed("fetch.current_averages")
+def fetch_player_averages_from_db(supabase):
+    """
+    Fetch player averages and games played from player_aggregate (kept up
+    to date at ingest). Falls back to the get_player_averages RPC, which
+    re-aggregates player_game, if no aggregates exist yet.
+    """
+    try:
+        df = fetch_player_averages(supabase)
+    except APIError as e:
+        print(f"player_aggregate unavailable ({e.message}), using get_player_averages...")
+        df = pd.DataFrame()
+    if not df.empty:
+        return df
+
+    response = supabase.rpc("get_player_averages").execute()
+    data = response.data
+    if not data:
+        raise ValueError("No player average data returned from Supabase.")
+    return pd.DataFrame(data)
+
+
+@timed("fetch.history_averages")
+def fetch_player_history_averages(supabase, season_id: str = LAST_SEASON_ID, player_ids=None):
+    """
+    Fetch player averages from player_history table for the given season.
+    Assumes Supabase has an RPC or direct select that aggregates per player.
+    With player_ids, only those players are read, and none is not an error.
+    """
+    def where(q):
+        q = q.eq("season_id", season_id)
+        return q.in_("player_id", list(player_ids)) if player_ids is not None else q
+
+    df = read_dataframe(
+        supabase,
+        "player_history",
+        "player_id, team_id, season_id, points, rebounds, assists, steals, blocks, turnovers, 3pm, fgm, fga, ftm, fta, score, minutes, gp",
+        key=("player_id", "team_id"),  # unique within a season
+        where=where,
+    )
+    if df.empty:
+        if player_ids is not None:
+            return pd.DataFrame(columns=["player_id", "avg_fp", "avg_minutes", "games_played"])
+        raise ValueError(f"No player history found for season {season_id}.")
+
+    # compute fantasy score if missing
+    if "score" not in df.columns or df["score"].isna().any():
+        df["score"] = calculate_scores(df)
+
+    # aggregate to per-player averages
+    grouped = (
+        df.groupby("player_id")
+        .agg(
+            avg_fp=("score", "mean"),
+            avg_pts=("points", "mean"),
+            avg_reb=("rebounds", "mean"),
+            avg_ast=("assists", "mean"),
+            avg_stl=("steals", "mean"),
+            avg_blk=("blocks", "mean"),
+            avg_minutes=("minutes", "mean"),
+            games_played=("gp", "max"),
+        )
+        .reset_index()
+    )
+    return grouped
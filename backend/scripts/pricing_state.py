@@ -0,0 +1,34 @@
+"""
+What incremental repricing needs from the last full pricing run: the
+league-wide PricingBounds, and how far player_aggregate had been read.
+
+    create table pricing_state (
+      id int primary key default 1 check (id = 1),
+      bounds jsonb not null,
+      aggregated_through timestamptz,
+      updated_at timestamptz
+    );
+"""
+from datetime import datetime, timezone
+
+from backend.scripts.pricing_engine import PricingBounds
+
+STATE_TABLE = "pricing_state"
+
+
+def load_pricing_state(supabase):
+    """(PricingBounds, aggregated_through) or None if no full run has been stored."""
+    rows = supabase.table(STATE_TABLE).select("bounds, aggregated_through").eq("id", 1).execute().data
+    if not rows or not rows[0].get("bounds"):
+        return None
+    return PricingBounds.from_dict(rows[0]["bounds"]), rows[0].get("aggregated_through")
+
+
+def save_pricing_state(supabase, bounds=None, aggregated_through=None):
+    """Store new bounds and/or move the watermark (None leaves a field as it is)."""
+    row = {"id": 1, "updated_at": datetime.now(timezone.utc).isoformat()}
+    if bounds is not None:
+        row["bounds"] = bounds.to_dict()
+    if aggregated_through is not None:
+        row["aggregated_through"] = aggregated_through
+    supabase.table(STATE_TABLE).upsert(row).execute()
@@ -0,0 +1,179 @@
+"""
+Leaderboard ranks, maintained instead of recomputed.
+
+A RankBoard keeps every squad's points in an order-statistic list, so a
+rank is a bisect and a points change is a remove + insert, both O(log n).
+When totals move, only squads whose points lie between a mover's old and
+new totals can change rank; those are the only ones re-ranked and
+compared with what was last published, so a night of deltas costs
+O(changed squads * log n + ranks that actually moved), not a full sort.
+
+Ranks are competition ranks (1, 2, 2, 4) by points, highest first.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+INF = float("inf")
+BUCKET_SIZE = 512   # split a bucket beyond 2x this
+
+
+class SortedBuckets:
+    """
+    A sorted multiset of comparable keys held as a list of small sorted
+    buckets, with a Fenwick tree over bucket sizes for positional queries.
+    """
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + BUCKET_SIZE] for i in range(0, len(keys), BUCKET_SIZE)] or [[]]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [b[-1] if b else None for b in self._buckets]
+        self._tree = [0] * (len(self._buckets) + 1)
+        for i, b in enumerate(self._buckets):
+            self._add_size(i, len(b))
+
+    def _add_size(self, i, n):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += n
+            i += i & -i
+
+    def _before(self, i):
+        """Keys in buckets [0, i)."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _bucket_for(self, key):
+        if len(self._buckets) == 1:
+            return 0
+        return min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+
+    def __len__(self):
+        return self._before(len(self._buckets))
+
+    def add(self, key):
+        i = self._bucket_for(key)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._add_size(i, 1)
+        if len(bucket) > 2 * BUCKET_SIZE:
+            self._buckets[i:i + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+            self._rebuild()
+
+    def remove(self, key):
+        i = self._bucket_for(key)
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        self._add_size(i, -1)
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        elif len(self._buckets) > 1:
+            del self._buckets[i]
+            self._rebuild()
+        else:
+            self._maxes[i] = None
+
+    def bisect_left(self, key):
+        i = self._bucket_for(key)
+        return self._before(i) + bisect_left(self._buckets[i], key)
+
+    def irange(self, low, high):
+        """Keys k with low < k <= high, in order."""
+        i = min(bisect_right(self._maxes, low), len(self._buckets) - 1) if len(self._buckets) > 1 else 0
+        j = bisect_right(self._buckets[i], low)
+        while i < len(self._buckets):
+            bucket = self._buckets[i]
+            while j < len(bucket):
+                if bucket[j] > high:
+                    return
+                yield bucket[j]
+                j += 1
+            i, j = i + 1, 0
+
+
+class RankBoard:
+    """Competition ranks of squads by points, updated incrementally."""
+
+    def __init__(self, points=None, published=None):
+        self.points = {s: float(p) for s, p in (points or {}).items()}
+        self.published = dict(published or {})   # squad_id -> rank last written
+        self._keys = SortedBuckets((-p, s) for s, p in self.points.items())
+        self._dirty = set(self.points)   # checked against published on the first moved()
+        self._spans = []   # (low, high) point ranges whose ranks may have moved
+
+    def __len__(self):
+        return len(self.points)
+
+    def rank_of_points(self, points):
+        """1 + number of squads with strictly more points."""
+        return self._keys.bisect_left((-points,)) + 1
+
+    def rank(self, squad_id):
+        return self.rank_of_points(self.points[squad_id])
+
+    def set_points(self, squad_id, points):
+        points = float(points)
+        old = self.points.get(squad_id)
+        if old == points:
+            return
+        if old is not None:
+            self._keys.remove((-old, squad_id))
+        self._keys.add((-points, squad_id))
+        self.points[squad_id] = points
+
+        # Squads scoring in [low, high) gain or lose this one above them;
+        # a new squad pushes down everyone below it
+        self._dirty.add(squad_id)
+        self._spans.append((min(old, points), max(old, points)) if old is not None else (-INF, points))
+
+    def apply(self, points_by_squad):
+        for squad_id, points in points_by_squad.items():
+            self.set_points(squad_id, points)
+
+    def apply_deltas(self, deltas):
+        for squad_id, delta in deltas.items():
+            if delta or squad_id not in self.points:   # a new squad is ranked even at 0
+                self.set_points(squad_id, self.points.get(squad_id, 0.0) + delta)
+
+    def _merged_spans(self):
+        merged = []
+        for low, high in sorted(self._spans):
+            if merged and low <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        return merged
+
+    def moved(self):
+        """
+        {squad_id: rank} for every squad whose rank differs from the
+        published one since the last mark_published().
+        """
+        candidates = set(self._dirty)
+        for low, high in self._merged_spans():
+            # keys are (-points, squad_id): points in [low, high) <=> -high < -points <= -low
+            candidates.update(s for _, s in self._keys.irange((-high, INF), (-low, INF)))
+
+        ranks = {}
+        for squad_id in candidates:
+            rank = self.rank(squad_id)
+            if self.published.get(squad_id) != rank:
+                ranks[squad_id] = rank
+        return ranks
+
+    def mark_published(self, ranks):
+        self.published.update(ranks)
+        self._dirty.clear()
+        self._spans.clear()
+
+    def ranks(self):
+        """Every squad's rank (a full pass; for checks)."""
+        return {s: self.rank(s) for s in self.points}
@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+from backend.scripts.metrics import incr
+
+# Process-wide defaults for nba_api traffic (stats.nba.com + live CDN)
+NBA_API_RATE = float(os.getenv("NBA_API_RATE", "1.5"))        # starting req/s
+NBA_API_MAX_RATE = float(os.getenv("NBA_API_MAX_RATE", "6"))  # ceiling the limiter may climb to
+MAX_ATTEMPTS = 5
+BASE_DELAY = 1.0   # seconds, doubled per retry
+MAX_DELAY = 30.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: on average `rate` calls per second, with
+    bursts of up to `burst` calls. acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """Feedback hook: the last upstream call succeeded."""
+
+    def on_error(self):
+        """Feedback hook: the last upstream call failed or was throttled."""
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket that tunes its own rate (AIMD): each success nudges the
+    rate up by `increase` until max_rate, each error cuts it by `backoff`
+    down to min_rate. Settles just under whatever the upstream tolerates.
+    """
+
+    def __init__(self, rate, min_rate=0.2, max_rate=None, burst=1, increase=0.05, backoff=0.5):
+        super().__init__(rate, burst)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate * 4)
+        self.increase = float(increase)
+        self.backoff = float(backoff)
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_error(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+
+
+# -----------------------------
+# Process-wide limiter + retries
+# -----------------------------
+
+def get_limiter():
+    """The limiter every nba_api call goes through, created on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveRateLimiter(NBA_API_RATE, max_rate=NBA_API_MAX_RATE)
+        return _limiter
+
+
+def set_limiter(limiter):
+    """Replace the process-wide limiter (e.g. a job that wants more burst)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+
+
+def is_retryable(exc):
+    """Timeouts, dropped connections, 429/5xx, and the HTML block pages
+    stats.nba.com serves instead of JSON when it throttles us."""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, requests.HTTPError):
+        status = getattr(exc.response, "status_code", None)
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, json.JSONDecodeError)
+
+
+def call_with_retry(fn, limiter=None, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """
+    Call fn() under the limiter, retrying retryable errors with exponential
+    backoff and full jitter. Retryable errors also slow the limiter down;
+    successes let it speed back up. Anything else is raised immediately.
+    """
+    limiter = limiter or get_limiter()
+
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        incr("nba_api.calls")
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_retryable(e):
+                incr("nba_api.errors")
+                raise
+            limiter.on_error()
+            if attempt == max_attempts - 1:
+                incr("nba_api.errors")
+                raise
+            incr("nba_api.retries")
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"⏳ Upstream error ({type(e).__name__}), retry {attempt + 1}/{max_attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        limiter.on_success()
+        return result
@@ -0,0 +1,144 @@
+"""
+Incremental repricing, run after process_pending_games.
+
+Only players whose player_aggregate row changed since the last run are
+priced, on the scale of the last full init_player_prices run (its
+PricingBounds, kept in pricing_state), so nobody else's price moves.
+base_price, the form part of the market price, then moves toward the new
+price by at most MAX_DAILY_MOVE. A night is a handful of reads and a few
+grouped writes, not a league-wide recompute; init_player_prices is still
+the full rebalance.
+
+current_price has one writer, transfer_engine, which publishes
+base_price + the player's demand offset, so form and transfer moves add
+up instead of undoing each other:
+
+    alter table player add column base_price numeric;   -- null = price
+
+    python -m backend.scripts.reprice
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from backend.scripts.bulk_update import bulk_update, fetch_player_prices
+from backend.scripts.metrics import incr, timed
+from backend.scripts.player_aggregates import AGGREGATE_TABLE, AVERAGE_COLUMNS
+from backend.scripts.pricing_engine import PRICE_STEP, PRICING_PARAMS, PricingInputs, price_players
+from backend.scripts.pricing_inputs import LAST_SEASON_ID, fetch_player_birthdates, fetch_player_history_averages
+from backend.scripts.pricing_state import load_pricing_state, save_pricing_state
+from backend.scripts.table_reader import chunked, read_dataframe
+
+MAX_DAILY_MOVE = 0.5   # most base_price can move in one run (a multiple of PRICE_STEP)
+
+
+def _concat(frames, columns):
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def fetch_changed_averages(supabase, since=None):
+    """Season averages of players whose aggregate was updated after `since` (all if None)."""
+    where = (lambda q: q.gt("updated_at", since)) if since else None
+    return read_dataframe(supabase, AGGREGATE_TABLE, AVERAGE_COLUMNS + ", updated_at", key="player_id", where=where)
+
+
+def fetch_prices(supabase, player_ids):
+    """price and base_price (null base_price = price) of player_ids."""
+    prices = fetch_player_prices(supabase, player_ids)[["player_id", "price", "base_price"]]
+    return prices.assign(base_price=prices["base_price"].fillna(prices["price"]))
+
+
+def capped_move(current, target, cap=MAX_DAILY_MOVE):
+    """Move current toward target by at most cap; players without a price yet jump straight there."""
+    current = np.asarray(current, dtype="float64")
+    target = np.asarray(target, dtype="float64")
+    moved = np.clip(target, current - cap, current + cap)
+    return np.where(np.isnan(current), target, moved)
+
+
+def publish_prices(supabase, changes):
+    """
+    Write (player_id, price, base_price) rows. Players sharing the same
+    pair are updated together with one `id in (...)` request.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    ids_by_pair = defaultdict(list)
+    for player_id, price, base in changes:
+        ids_by_pair[(price, base)].append(player_id)
+
+    updated = 0
+    for (price, base), ids in ids_by_pair.items():
+        for chunk in chunked(ids):
+            updated += bulk_update(
+                supabase, "player", {"price": price, "base_price": base, "updated_at": now},
+                where=lambda q, chunk=chunk: q.in_("id", chunk),
+            )
+    incr("rows.player", updated)
+    return updated
+
+
+@timed("reprice")
+def reprice_changed_players(supabase, params=PRICING_PARAMS, max_move=MAX_DAILY_MOVE):
+    """
+    Price the players with new games since the last run and move their
+    base_price. Returns the number of players whose prices changed.
+    """
+    state = load_pricing_state(supabase)
+    if state is None:
+        print("⚠️ No pricing state yet; run init_player_prices once before incremental repricing.")
+        return 0
+    bounds, since = state
+
+    current_df = fetch_changed_averages(supabase, since)
+    if current_df.empty:
+        print("💤 No players with new games since the last repricing.")
+        return 0
+    ids = current_df["player_id"].tolist()
+
+    past_df = _concat(
+        [fetch_player_history_averages(supabase, LAST_SEASON_ID, player_ids=chunk) for chunk in chunked(ids)],
+        ["player_id", "avg_fp", "avg_minutes", "games_played"],
+    )
+    age_df = _concat(
+        [fetch_player_birthdates(supabase, player_ids=chunk) for chunk in chunked(ids)],
+        ["player_id", "age", "pos"],
+    )
+
+    result = price_players(PricingInputs.from_frames(current_df, past_df, age_df), params, bounds)
+    priced = pd.DataFrame({"player_id": result.player_id, "new_price": result.price})
+    priced = priced[priced["player_id"].isin(ids)].merge(fetch_prices(supabase, ids), on="player_id", how="left")
+
+    step_cap = np.floor(max_move / PRICE_STEP) * PRICE_STEP
+    priced["new_base"] = capped_move(priced["base_price"], priced["new_price"], step_cap)
+    old = priced[["price", "base_price"]].to_numpy(dtype="float64")
+    new = priced[["new_price", "new_base"]].to_numpy(dtype="float64")
+    moved = priced[~np.isclose(old, new).all(axis=1)]
+
+    updated = publish_prices(supabase, [
+        (int(r.player_id), float(r.new_price), float(r.new_base)) for r in moved.itertuples()
+    ])
+    save_pricing_state(supabase, aggregated_through=str(current_df["updated_at"].max()))
+
+    rises = int((moved["new_base"] > moved["base_price"]).sum())
+    falls = int((moved["new_base"] < moved["base_price"]).sum())
+    print(f"💱 Repriced {len(priced)} players: {updated} updated ({rises} up, {falls} down, cap ±{step_cap})")
+    return updated
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from backend.scripts.metrics import instrument_supabase, job
+
+    load_dotenv()
+    supabase = instrument_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")))
+    with job("reprice"):
+        reprice_changed_players(supabase)
+
+
+if __name__ == "__main__":
+    main()
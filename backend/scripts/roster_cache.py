@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from backend.scripts.table_reader import iter_rows
+
+
+class RosterCache:
+    """
+    player id -> team_id map shared by every game in a run.
+
+    The player table is downloaded once on first use. Team moves and new
+    players are applied in memory straight away and queued for write-back,
+    so the database sees them in bulk when flush() is called.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._teams = None
+        self._team_moves = {}
+        self._new_players = {}
+        self.failed = set()   # new player ids whose insert was rejected
+
+    def _load(self):
+        if self._teams is None:
+            self._teams = {
+                p["id"]: p.get("team_id")
+                for p in iter_rows(self.supabase, "player", "id, team_id")
+            }
+        return self._teams
+
+    def __contains__(self, player_id):
+        return player_id in self._load()
+
+    def team_of(self, player_id):
+        return self._load().get(player_id)
+
+    def move(self, player_id, team_id):
+        """Record that an existing player now plays for team_id."""
+        self._load()[player_id] = team_id
+        if player_id in self._new_players:
+            self._new_players[player_id]["team_id"] = team_id
+        else:
+            self._team_moves[player_id] = team_id
+
+    def add(self, details, team_id):
+        """Queue a brand-new player row (from get_player_details) for insert."""
+        player_id = int(details["id"])
+        self._new_players[player_id] = details
+        self._load()[player_id] = team_id
+
+    @property
+    def has_pending(self):
+        return bool(self._team_moves or self._new_players)
+
+    def flush_new_players(self):
+        """Write queued new players in one upsert. Returns the number written."""
+        if not self._new_players:
+            return 0
+
+        rows = list(self._new_players.values())
+        self._new_players.clear()
+        try:
+            self.supabase.table("player").upsert(rows).execute()
+        except Exception as e:
+            print(f"Bulk player insert failed ({e}), retrying player by player...")
+            rows = [row for row in rows if self._insert_one(row)]
+
+        print(f"Inserted {len(rows)} new players into Supabase")
+        return len(rows)
+
+    def _insert_one(self, row):
+        """Insert one new player; a rejected row is remembered in `failed`, not raised."""
+        player_id = int(row["id"])
+        try:
+            self.supabase.table("player").upsert(row).execute()
+            return True
+        except Exception as e:
+            print(f"Error inserting player {player_id}: {e}")
+            # Stays in _teams, so later games in this run don't refetch its
+            # details; the next run's roster (reloaded from player) retries it
+            self.failed.add(player_id)
+            return False
+
+    def flush_team_moves(self):
+        """
+        Write queued team changes, one UPDATE per destination team
+        (at most one per NBA team). Returns the number of players moved.
+        """
+        if not self._team_moves:
+            return 0
+
+        by_team = defaultdict(list)
+        for player_id, team_id in self._team_moves.items():
+            by_team[team_id].append(player_id)
+
+        moved = 0
+        for team_id, player_ids in by_team.items():
+            try:
+                self.supabase.table("player").update({"team_id": team_id}).in_("id", player_ids).execute()
+            except Exception as e:
+                # Stays queued for the next flush; player_game rows don't depend on it
+                print(f"Error moving {len(player_ids)} players to team {team_id}: {e}")
+                continue
+            for player_id in player_ids:
+                del self._team_moves[player_id]
+            moved += len(player_ids)
+
+        print(f"🔁 Updated teams for {moved} players")
+        return moved
+
+    def flush(self):
+        """Write every queued change. New players go first so FKs resolve."""
+        self.flush_new_players()
+        self.flush_team_moves()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Fantasy points per stat, in the order the score is summed.
+# Keep in sync with scoringRules in web-app/app/components/help/ScoringSection.tsx
+SCORING_WEIGHTS = [
+    ("points", 1),
+    ("rebounds", 1.2),
+    ("assists", 1.5),
+    ("steals", 3),
+    ("blocks", 3),
+    ("turnovers", -2),
+    ("fgm", 1),
+    ("fga", -0.5),
+    ("ftm", 1),
+    ("fta", -0.75),
+    ("3pm", 1),
+]
+
+_SPLITTER = 134217729.0  # 2**27 + 1, Veltkamp split constant
+
+
+def calculate_scores(stats):
+    """
+    Vectorized fantasy score for many stat lines at once.
+
+    stats: DataFrame or mapping of stat name -> array-like (missing stats
+    count as 0). Returns a Series aligned to the DataFrame's index, or a
+    float64 ndarray for other inputs. Gives exactly the same values as the
+    row-by-row calculate_score, including rounding.
+    """
+    is_frame = isinstance(stats, pd.DataFrame)
+
+    score = 0
+    for stat, weight in SCORING_WEIGHTS:
+        column = stats[stat] if stat in stats else 0
+        if is_frame and not np.isscalar(column):
+            column = column.to_numpy()
+        column = np.asarray(column)
+
+        # Same operation order as the scalar formula so floats match bit for bit
+        if weight < 0:
+            score = score - column * -weight
+        else:
+            score = score + column * weight
+
+    score = round_like_python(np.asarray(score, dtype=np.float64), 1)
+
+    if is_frame:
+        return pd.Series(np.broadcast_to(score, (len(stats),)), index=stats.index, name="score")
+    return score
+
+
+def round_like_python(values, ndigits=1):
+    """
+    Vectorized equivalent of the built-in round(x, ndigits) for floats.
+
+    np.round scales by 10**ndigits first, which can turn a value just below
+    a .x5 tie into an exact tie and round it the other way. Here the scaled
+    value is carried with its exact rounding error (Dekker two-product), so
+    ties are decided on the true binary value, half to even, like Python.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+
+    scaled = x * scale
+    with np.errstate(invalid="ignore", over="ignore"):
+        split = _SPLITTER * x
+        x_hi = split - (split - x)
+        x_lo = x - x_hi
+        error = (x_hi * scale - scaled) + x_lo * scale  # scaled + error == x * scale exactly
+
+        floor = np.floor(scaled)
+        # scaled - (floor + 0.5) is exact whenever it's near zero (Sterbenz);
+        # (scaled - floor) - 0.5 isn't: -0.49999999999999994 + 1 rounds to 0.5
+        past_half = scaled - (floor + 0.5)
+        round_up = (past_half > -error) | ((past_half == -error) & (np.fmod(floor, 2) != 0))
+
+    rounded = (floor + round_up) / scale
+    # Keep sign on values that round to zero (round(-0.04, 1) == -0.0)
+    rounded = np.copysign(rounded, x)
+    return np.where(np.isfinite(x), rounded, x)
+
+
+def score_rows(rows, key="score"):
+    """Score a list of stat dicts in one vectorized pass, writing row[key] in place."""
+    if not rows:
+        return rows
+
+    columns = {stat: [r.get(stat, 0) for r in rows] for stat, _ in SCORING_WEIGHTS}
+    for row, score in zip(rows, calculate_scores(columns).tolist()):
+        row[key] = score
+    return rows
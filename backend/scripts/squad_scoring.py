@@ -0,0 +1,407 @@
+"""
+Gameweek squad scoring, materialized.
+
+Runs after process_pending_games: loads every squad's lineup for the
+gameweek and the gameweek's player_game scores, scores all squads in one
+vectorized pass and upserts the totals, so the leaderboard reads stored
+numbers instead of aggregating every squad per request.
+
+Rules (as in the web app):
+  - a player's weekly score is the average of their games that week
+  - 10 starters score; a starter with no game is replaced by the first
+    bench player (bench_order) who played
+  - the captain's score counts double; if the captain didn't play the
+    vice-captain's does
+  - every trade beyond the squad's free ones costs TRANSFER_HIT points
+    (see transfer_hits)
+
+Whether a trade was free is decided by submit_trades, from the squad's
+own free_trades / free_trades_gameweek (what the web app shows as
+"N (Week W Free)"), and recorded on the trade:
+
+    alter table trade add column is_free boolean not null default true;
+
+squad_player is edited at any time, and edits made after Monday's lock
+belong to the next gameweek, so each gameweek is scored from a copy of
+squad_player taken at its lock (snapshot_lineups, run by the Monday
+snapshot job):
+
+    create table squad_lineup (
+      squad_id bigint references squad(id) on delete cascade,
+      gameweek int not null,
+      player_id bigint references player(id),
+      is_starting boolean,
+      is_captain boolean,
+      is_vice_captain boolean,
+      bench_order int,
+      primary key (squad_id, gameweek, player_id)
+    );
+
+Tables written:
+
+    create table squad_gameweek_points (
+      squad_id bigint references squad(id) on delete cascade,
+      gameweek int not null,
+      points numeric not null default 0,
+      rank int,
+      updated_at timestamptz,
+      primary key (squad_id, gameweek)
+    );
+
+    create table squad_season_points (
+      squad_id bigint primary key references squad(id) on delete cascade,
+      total_points numeric not null default 0,
+      rank int,
+      updated_at timestamptz
+    );
+    create index on squad_season_points (rank);
+
+Ranks are maintained by rank_engine.RankBoard and only rewritten for
+squads that moved, so get_leaderboard becomes a join of
+squad_season_points on squad ordered by rank.
+
+    python -m backend.scripts.squad_scoring --snapshot      # at the lock
+    python -m backend.scripts.squad_scoring --gameweek 3
+"""
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from backend.scripts.batching import upsert_in_batches
+from backend.scripts.gameweek_calendar import get_calendar
+from backend.scripts.metrics import incr, timed
+from backend.scripts.rank_engine import RankBoard
+from backend.scripts.table_reader import chunked, iter_rows, read_dataframe
+
+LIVE_LINEUP_TABLE = "squad_player"   # editable at any time
+LINEUP_TABLE = "squad_lineup"         # squad_player as it was at each gameweek's lock
+LINEUP_COLUMNS = "squad_id, player_id, is_starting, is_captain, is_vice_captain, bench_order"
+TRADE_TABLE = "trade"
+GAMEWEEK_POINTS_TABLE = "squad_gameweek_points"
+SEASON_POINTS_TABLE = "squad_season_points"
+CAPTAIN_MULTIPLIER = 2
+TRANSFER_HIT = 20               # points per trade beyond the free ones
+
+_boards = {}   # gameweek (None = season) -> RankBoard
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+
+def load_lineups(supabase, gameweek):
+    """The gameweek's locked lineups, one row per squad_lineup row (empty if never snapshotted)."""
+    return read_dataframe(
+        supabase, LINEUP_TABLE, LINEUP_COLUMNS,
+        key=("squad_id", "player_id"), where=lambda q: q.eq("gameweek", gameweek),
+    )
+
+
+def current_gameweek(supabase):
+    """The gameweek today (UTC) falls in, or None between gameweeks."""
+    return get_calendar(supabase).lookup(datetime.now(timezone.utc).date(), default=None)
+
+
+def snapshot_lineups(supabase, gameweek, force=False):
+    """
+    Copy squad_player into squad_lineup for gameweek. Run at the lock: a
+    gameweek that already has a snapshot is left alone unless force, so a
+    late rerun can't replace it with next week's edits. Returns rows written.
+    """
+    table = supabase.table(LINEUP_TABLE)
+    if not force and table.select("squad_id").eq("gameweek", gameweek).limit(1).execute().data:
+        print(f"📸 Gameweek {gameweek} lineups already snapshotted.")
+        return 0
+
+    lineups = read_dataframe(supabase, LIVE_LINEUP_TABLE, LINEUP_COLUMNS, key=("squad_id", "player_id"))
+    if force:
+        supabase.table(LINEUP_TABLE).delete().eq("gameweek", gameweek).execute()
+
+    rows = [
+        {**{k: (None if pd.isna(v) else v) for k, v in r.items()}, "gameweek": int(gameweek)}
+        for r in lineups.to_dict("records")
+    ]
+    upsert_in_batches(supabase, rows, LINEUP_TABLE, "squad_id,gameweek,player_id")
+    print(f"📸 Snapshotted {len(rows)} lineup rows for gameweek {gameweek}.")
+    return len(rows)
+
+
+def gameweek_game_ids(supabase, gameweek):
+    """Ids of games whose date falls in gameweek (bucketed like get_gameweek_for_date)."""
+    calendar = get_calendar(supabase)
+    hit = np.nonzero(calendar.gameweeks == gameweek)[0]
+    if not len(hit):
+        return []
+
+    # Read a day either side of the window and let the calendar decide
+    start = calendar.starts[hit[0]].astype(object) - timedelta(days=1)
+    end = calendar.ends[hit[0]].astype(object) + timedelta(days=2)
+    games = list(iter_rows(
+        supabase, "game", "id, date",
+        where=lambda q: q.gte("date", start.isoformat()).lt("date", end.isoformat()),
+    ))
+    if not games:
+        return []
+
+    weeks = calendar.lookup_many([g["date"] for g in games])
+    return [g["id"] for g, week in zip(games, weeks) if week == gameweek]
+
+
+def load_player_scores(supabase, game_ids):
+    """Weekly score per player: the mean fantasy score over their games in game_ids."""
+    frames = []
+    for chunk in chunked(game_ids):
+        frames.append(read_dataframe(
+            supabase, "player_game", "player_id, game_id, score",
+            key=("game_id", "player_id"),
+            where=lambda q, chunk=chunk: q.in_("game_id", chunk),
+        ))
+
+    games = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["player_id", "score"])
+    games["score"] = pd.to_numeric(games["score"], errors="coerce").fillna(0.0)
+    return games.groupby("player_id")["score"].mean()
+
+
+def transfer_hits(supabase, gameweek):
+    """
+    Points each squad loses in gameweek for trades submit_trades recorded
+    as not free (Series squad_id -> points, absent = no hit). A trade
+    counts toward the first gameweek that locks after it was made.
+    """
+    calendar = get_calendar(supabase)
+    at = np.nonzero(calendar.gameweeks == gameweek)[0]
+    if not len(at):
+        return pd.Series(dtype="float64")
+    week = at[0]
+
+    def where(q):
+        q = q.eq("is_free", False).lt("created_at", str(calendar.starts[week]))
+        return q.gte("created_at", str(calendar.starts[week - 1])) if week else q
+
+    try:
+        trades = read_dataframe(supabase, TRADE_TABLE, "id, squad_id", where=where)
+    except APIError as e:
+        print(f"⚠️ Couldn't read trades ({e.message}); no transfer hits applied.")
+        return pd.Series(dtype="float64")
+    if trades.empty:
+        return pd.Series(dtype="float64")
+
+    paid = trades["squad_id"].astype("int64").value_counts()
+    return (paid * TRANSFER_HIT).astype("float64")
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+
+def score_squads(lineups, scores):
+    """
+    Gameweek points per squad. `lineups` is one row per squad_player,
+    `scores` a Series of weekly score by player_id (absent = didn't play).
+    Returns a DataFrame of squad_id, points.
+    """
+    if lineups.empty:
+        return pd.DataFrame({"squad_id": pd.Series(dtype="int64"), "points": pd.Series(dtype="float64")})
+
+    df = lineups.copy()
+    for col in ("is_starting", "is_captain", "is_vice_captain"):
+        df[col] = df[col].fillna(False).astype(bool)
+    df["score"] = df["player_id"].map(scores)
+    df["played"] = df["score"].notna()
+    df["score"] = df["score"].fillna(0.0)
+
+    # Auto-subs: the first k bench players who played replace the k starters who didn't
+    starter = df["is_starting"]
+    missing = (starter & ~df["played"]).groupby(df["squad_id"]).transform("sum")
+    bench = ~starter & df["played"]
+    bench_rank = (
+        df["bench_order"].where(bench)
+        .groupby(df["squad_id"]).rank(method="first")
+    )
+    counts = (starter & df["played"]) | (bench & (bench_rank <= missing))
+
+    # Captaincy: captain's score again if they played, otherwise the vice's
+    captain_played = (df["is_captain"] & counts).groupby(df["squad_id"]).transform("any")
+    doubled = (df["is_captain"] & counts) | (df["is_vice_captain"] & counts & ~captain_played)
+
+    df["points"] = df["score"] * counts + df["score"] * doubled * (CAPTAIN_MULTIPLIER - 1)
+    return df.groupby("squad_id", as_index=False)["points"].sum()
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+
+def get_board(supabase, gameweek=None, refresh=False):
+    """
+    The RankBoard for a gameweek (or the season when gameweek is None),
+    loaded from the stored points and ranks on first use and then kept in
+    memory, so a live-scoring run only pays for the load once.
+    """
+    if gameweek in _boards and not refresh:
+        return _boards[gameweek]
+
+    if gameweek is None:
+        rows = iter_rows(supabase, SEASON_POINTS_TABLE, "squad_id, total_points, rank", key="squad_id")
+        rows = [(r["squad_id"], r["total_points"], r["rank"]) for r in rows]
+    else:
+        rows = iter_rows(
+            supabase, GAMEWEEK_POINTS_TABLE, "squad_id, points, rank",
+            key=("squad_id", "gameweek"), where=lambda q: q.eq("gameweek", gameweek),
+        )
+        rows = [(r["squad_id"], r["points"], r["rank"]) for r in rows]
+
+    board = _boards[gameweek] = RankBoard(
+        points={s: float(p or 0) for s, p, _ in rows},
+        published={s: r for s, _, r in rows if r is not None},
+    )
+    return board
+
+
+def _publish(supabase, board, changed, table_name, points_col, on_conflict, extra=None):
+    """
+    Upsert points and rank for squads whose points changed or whose rank
+    moved, in one bulk write. Returns the number of rows written.
+    """
+    ranks = board.moved()
+    squads = set(changed) | set(ranks)
+    if not squads:
+        return 0
+
+    now = datetime.now().isoformat()
+    rows = [
+        {
+            "squad_id": int(s),
+            **(extra or {}),
+            points_col: round(board.points[s], 2),
+            "rank": ranks.get(s, board.published.get(s)),
+            "updated_at": now,
+        }
+        for s in sorted(squads)
+    ]
+    upsert_in_batches(supabase, rows, table_name, on_conflict)
+    board.mark_published(ranks)
+    incr("ranks.moved", len(ranks))
+    return len(rows)
+
+
+@timed("write")
+def write_gameweek_points(supabase, gameweek, points):
+    """
+    Store this gameweek's points and ranks for squads whose points or rank
+    changed, then move their season totals. Returns squads whose points changed.
+    """
+    board = get_board(supabase, gameweek)
+    new = points.set_index("squad_id")["points"].round(2)
+    old = pd.Series(board.points, dtype="float64").reindex(new.index)
+    changed = new[~np.isclose(new.to_numpy(), old.to_numpy())]
+
+    board.apply(changed.to_dict())
+    _publish(supabase, board, changed.index, GAMEWEEK_POINTS_TABLE, "points", "squad_id,gameweek",
+             extra={"gameweek": int(gameweek)})
+
+    # Season total = sum over gameweeks, so it moves by the same delta
+    update_season_points(supabase, changed.sub(old.reindex(changed.index).fillna(0.0)))
+    return len(changed)
+
+
+def update_season_points(supabase, delta):
+    """Add delta (Series squad_id -> points) to season totals and republish moved ranks."""
+    board = get_board(supabase)
+    delta = delta[(delta != 0) | ~delta.index.isin(list(board.points))]   # new squads get a row even at 0
+    # Rank on the rounded totals that are stored, not on accumulated float error
+    board.apply({s: round(board.points.get(s, 0.0) + d, 2) for s, d in delta.items()})
+    return _publish(supabase, board, delta.index, SEASON_POINTS_TABLE, "total_points", "squad_id")
+
+
+def rebuild_season_points(supabase):
+    """Recompute every season total from squad_gameweek_points (repair path)."""
+    stored = read_dataframe(supabase, GAMEWEEK_POINTS_TABLE, "squad_id, gameweek, points", key=("squad_id", "gameweek"))
+    if stored.empty:
+        return 0
+    totals = stored.astype({"points": "float64"}).groupby("squad_id")["points"].sum().round(2)
+
+    board = get_board(supabase, refresh=True)
+    changed = [s for s, t in totals.items() if board.points.get(s) != t]
+    board.apply(totals.to_dict())
+    return _publish(supabase, board, changed, SEASON_POINTS_TABLE, "total_points", "squad_id")
+
+
+# -----------------------------
+# Job
+# -----------------------------
+
+@timed("squad_scoring")
+def score_gameweek(supabase, gameweek, lineups=None):
+    """
+    Score every squad for gameweek from its locked lineups (or `lineups`,
+    if given) less transfer hits, and store the changes. Returns squads changed.
+    """
+    if lineups is None:
+        lineups = load_lineups(supabase, gameweek)
+    if lineups.empty:
+        if gameweek != current_gameweek(supabase):
+            print(f"⚠️ Gameweek {gameweek} has no lineup snapshot; not scoring it from today's lineups.")
+            return 0
+        print(f"⚠️ Gameweek {gameweek} has no lineup snapshot; taking one now (edits since the lock are included).")
+        snapshot_lineups(supabase, gameweek)
+        lineups = load_lineups(supabase, gameweek)
+
+    game_ids = gameweek_game_ids(supabase, gameweek)
+    scores = load_player_scores(supabase, game_ids)
+    points = score_squads(lineups, scores)
+    hits = transfer_hits(supabase, gameweek)
+    points["points"] -= points["squad_id"].map(hits).fillna(0.0)
+
+    changed = write_gameweek_points(supabase, gameweek, points)
+    print(f"🏆 Gameweek {gameweek}: scored {len(points)} squads over {len(game_ids)} games, {changed} changed.")
+    return changed
+
+
+def gameweeks_for_games(supabase, game_ids):
+    """Gameweeks touched by game_ids, in order."""
+    weeks = set()
+    for chunk in chunked(game_ids):
+        rows = iter_rows(supabase, "game", "id, date", where=lambda q, chunk=chunk: q.in_("id", chunk))
+        weeks.update(int(w) for w in get_calendar(supabase).lookup_many([r["date"] for r in rows]))
+    return sorted(weeks)
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from backend.scripts.metrics import instrument_supabase, job
+
+    parser = argparse.ArgumentParser(description="Score every squad for a gameweek and store the totals.")
+    parser.add_argument("--gameweek", type=int, nargs="+", help="gameweeks to score (default: the current one)")
+    parser.add_argument("--snapshot", action="store_true", help="snapshot squad_player as the gameweeks' lineups instead")
+    parser.add_argument("--force", action="store_true", help="with --snapshot, replace an existing snapshot")
+    parser.add_argument("--rebuild-totals", action="store_true", help="recompute every season total afterwards")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = instrument_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")))
+
+    gameweeks = args.gameweek or [w for w in [current_gameweek(supabase)] if w is not None]
+    if not gameweeks:
+        print("No gameweek is in progress today.")
+
+    if args.snapshot:
+        with job("snapshot_lineups"):
+            for gameweek in gameweeks:
+                snapshot_lineups(supabase, gameweek, force=args.force)
+        return
+
+    with job("squad_scoring"):
+        for gameweek in gameweeks:
+            score_gameweek(supabase, gameweek)
+        if args.rebuild_totals:
+            print(f"✅ Rebuilt season totals for {rebuild_season_points(supabase)} squads.")
+
+
+if __name__ == "__main__":
+    main()
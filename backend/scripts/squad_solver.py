@@ -0,0 +1,154 @@
+"""
+Best affordable squad under the game's rules, for validating prices.
+
+Prices move in 0.5 steps, so budgets are small integers (100 -> 200
+units). Each position is an exact-k 0/1 knapsack solved by DP over cost,
+and positions are combined with a max-plus convolution. 550 players solve
+in a few milliseconds.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backend.scripts.pricing_engine import PRICE_STEP, TOTAL_BUDGET
+
+SQUAD_POSITIONS = {"Guard": 5, "Forward": 5, "Center": 3}  # 13 players, as in the web app
+
+
+@dataclass
+class SquadSolution:
+    players: pd.DataFrame   # the chosen rows of the input
+    cost: float
+    points: float
+
+
+def _to_units(prices, step):
+    # Round up so the chosen squad never exceeds the real budget
+    return np.ceil(np.round(np.asarray(prices, dtype="float64") / step, 6)).astype(np.int64)
+
+
+def _position_dp(costs, points, k, capacity):
+    """
+    best[c]: max points from exactly k players costing at most c units.
+    take[i, j, c]: player i improved state (j players, c units); used to
+    walk back the choice.
+    """
+    best = np.full((k + 1, capacity + 1), -np.inf)
+    best[0, :] = 0.0
+    take = np.zeros((len(costs), k + 1, capacity + 1), dtype=bool)
+
+    for i, (cost, pts) in enumerate(zip(costs, points)):
+        if cost > capacity:
+            continue
+        for j in range(min(k, i + 1), 0, -1):
+            candidate = best[j - 1, :capacity + 1 - cost] + pts
+            improved = candidate > best[j, cost:]
+            best[j, cost:] = np.where(improved, candidate, best[j, cost:])
+            take[i, j, cost:] = improved
+
+    return best[k], take
+
+
+def _walk_back(take, costs, k, capacity):
+    chosen, j, c = [], k, capacity
+    for i in range(len(costs) - 1, -1, -1):
+        if j == 0:
+            break
+        if take[i, j, c]:
+            chosen.append(i)
+            j -= 1
+            c -= costs[i]
+    return chosen
+
+
+def _max_plus(left, right):
+    """out[c] = max over a of left[a] + right[c - a]; also returns the best a per c."""
+    size = len(left)
+    out = np.full(size, -np.inf)
+    split = np.zeros(size, dtype=np.int64)
+    for c in range(size):
+        totals = left[:c + 1] + right[c::-1]
+        a = int(np.argmax(totals))
+        out[c], split[c] = totals[a], a
+    return out, split
+
+
+def solve_squad(players, budget=TOTAL_BUDGET, positions=SQUAD_POSITIONS, price_step=PRICE_STEP,
+                points_col="points", price_col="price", pos_col="pos"):
+    """
+    Highest-scoring squad with exactly positions[pos] players per position
+    and total price <= budget. `players` needs pos, price and points columns.
+    Raises ValueError if no squad is affordable.
+    """
+    capacity = int(np.floor(round(budget / price_step, 6)))
+    pool = players[players[pos_col].isin(positions) & players[price_col].notna()].copy()
+    pool[points_col] = pool[points_col].fillna(0.0)
+
+    tables = []
+    for pos, k in positions.items():
+        group = pool[pool[pos_col] == pos]
+        costs = _to_units(group[price_col], price_step)
+        best, take = _position_dp(costs, group[points_col].to_numpy(dtype="float64"), k, capacity)
+        tables.append((group, costs, k, best, take))
+
+    # Fold positions together: combined[c] = best points for the positions so far within c units
+    combined, splits = tables[0][3], []
+    for _, _, _, best, _ in tables[1:]:
+        combined, split = _max_plus(combined, best)
+        splits.append(split)
+
+    if not np.isfinite(combined[capacity]):
+        raise ValueError(f"No squad of {sum(positions.values())} fits a budget of {budget}.")
+
+    # Split the budget back across positions, last one first
+    budgets, c = [], capacity
+    for (_, _, _, best, _), split in zip(reversed(tables[1:]), reversed(splits)):
+        a = int(split[c])
+        budgets.append(c - a)
+        c = a
+    budgets.append(c)
+    budgets.reverse()
+
+    chosen = []
+    for (group, costs, k, _, take), units in zip(tables, budgets):
+        rows = _walk_back(take, costs, k, units)
+        chosen.append(group.iloc[sorted(rows)])
+
+    squad = pd.concat(chosen)
+    return SquadSolution(players=squad, cost=float(squad[price_col].sum()), points=float(squad[points_col].sum()))
+
+
+def unconstrained_squad(players, positions=SQUAD_POSITIONS, points_col="points", pos_col="pos"):
+    """Top scorers per position, ignoring price."""
+    return pd.concat(
+        players[players[pos_col] == pos].nlargest(k, points_col) for pos, k in positions.items()
+    )
+
+
+def check_price_balance(players, budget=TOTAL_BUDGET, positions=SQUAD_POSITIONS, max_unspent=PRICE_STEP * 4,
+                        points_col="points", price_col="price", pos_col="pos"):
+    """
+    Validate prices against the squad rules. Prices are unbalanced when
+    the best squad regardless of price is affordable (the budget doesn't
+    bind), or the optimal squad leaves more than max_unspent on the table.
+    Returns a report dict with the optimal squad and any warnings.
+    """
+    best = solve_squad(players, budget, positions, points_col=points_col, price_col=price_col, pos_col=pos_col)
+    dream = unconstrained_squad(players, positions, points_col, pos_col)
+    dream_cost = float(dream[price_col].sum())
+
+    warnings = []
+    if dream_cost <= budget:
+        warnings.append(f"the top scorers at every position cost {dream_cost:.1f} <= budget {budget}")
+    if budget - best.cost > max_unspent:
+        warnings.append(f"the optimal squad leaves {budget - best.cost:.1f} of the budget unspent")
+
+    return {
+        "squad": best.players,
+        "cost": best.cost,
+        "points": best.points,
+        "unconstrained_cost": dream_cost,
+        "unconstrained_points": float(dream[points_col].sum()),
+        "warnings": warnings,
+    }
@@ -0,0 +1,194 @@
+import queue
+import threading
+
+import pandas as pd
+
+# PostgREST on Supabase caps responses at 1000 rows by default
+PAGE_SIZE = 1000
+QUEUE_PAGES = 8  # pages buffered between parallel readers and the consumer
+IN_CHUNK_SIZE = 200  # ids per `in.(...)` filter, keeps URLs well under limits
+
+_DONE = object()
+
+
+def chunked(ids, size=IN_CHUNK_SIZE):
+    """
+    Distinct ids, in first-seen order, in lists of at most `size`: one
+    `in.(...)` filter each. Ids are passed through as given, so text keys
+    like game ids ("0022500001") keep their leading zeros.
+    """
+    ids = list(dict.fromkeys(ids))
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _key_columns(key):
+    return (key,) if isinstance(key, str) else tuple(key)
+
+
+def _with_key_columns(columns, keys):
+    """Make sure the select list includes the key columns we page on."""
+    if columns.strip() == "*":
+        return columns
+    selected = [c.strip() for c in columns.split(",")]
+    return ", ".join(selected + [k for k in keys if k not in selected])
+
+
+def _quote(value):
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _after_filter(keys, last):
+    """
+    PostgREST `or` filter for rows strictly after `last` in (k1, k2, ...)
+    order: k1 > x  OR (k1 = x AND k2 > y)  OR ...
+    """
+    clauses = []
+    for i, k in enumerate(keys):
+        equal = [f"{keys[j]}.eq.{_quote(last[j])}" for j in range(i)]
+        greater = f"{k}.gt.{_quote(last[i])}"
+        clauses.append(f"and({','.join(equal + [greater])})" if equal else greater)
+    return ",".join(clauses)
+
+
+def iter_pages(supabase, table_name, columns="*", key="id", page_size=PAGE_SIZE, where=None):
+    """
+    Yield a table page by page (lists of row dicts) using keyset pagination
+    on `key` (a column or tuple of columns that is unique). Unlike
+    offset/range paging, each page is an index seek, so deep pages cost the
+    same as the first and concurrent inserts can't shift rows between pages.
+
+    where: optional callable(query) -> query adding filters.
+    """
+    keys = _key_columns(key)
+    columns = _with_key_columns(columns, keys)
+    last = None
+
+    while True:
+        query = supabase.table(table_name).select(columns)
+        if where is not None:
+            query = where(query)
+        if last is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last[0])
+            else:
+                query = query.or_(_after_filter(keys, last))
+        for k in keys:
+            query = query.order(k)
+
+        rows = query.limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = tuple(rows[-1][k] for k in keys)
+
+
+def _key_bounds(supabase, table_name, key, where):
+    def edge(desc):
+        query = supabase.table(table_name).select(key)
+        if where is not None:
+            query = where(query)
+        rows = query.order(key, desc=desc).limit(1).execute().data
+        return rows[0][key] if rows else None
+
+    return edge(False), edge(True)
+
+
+def iter_pages_parallel(supabase, table_name, columns="*", key="id", page_size=PAGE_SIZE, where=None, workers=4):
+    """
+    Like iter_pages, but splits the (numeric) first key column into
+    `workers` ranges and pages through them concurrently. Pages are yielded
+    as they arrive, not in key order. A bounded queue keeps memory flat when
+    the consumer is slower than the readers.
+    """
+    keys = _key_columns(key)
+    low, high = _key_bounds(supabase, table_name, keys[0], where)
+    if low is None:
+        return
+    if workers <= 1 or low == high:
+        yield from iter_pages(supabase, table_name, columns, key, page_size, where)
+        return
+
+    if isinstance(low, int) and isinstance(high, int):
+        bounds = [low + (high - low + 1) * i // workers for i in range(workers)] + [None]
+    else:
+        bounds = [low + (high - low) * i / workers for i in range(workers)] + [None]
+    pages = queue.Queue(maxsize=QUEUE_PAGES)
+    stop = threading.Event()
+
+    def read_range(lo, hi):
+        def range_where(query):
+            if where is not None:
+                query = where(query)
+            query = query.gte(keys[0], lo)
+            return query.lt(keys[0], hi) if hi is not None else query
+
+        try:
+            for page in iter_pages(supabase, table_name, columns, key, page_size, range_where):
+                if stop.is_set():
+                    return
+                pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    threads = [
+        threading.Thread(target=read_range, args=(bounds[i], bounds[i + 1]), daemon=True)
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+
+    finished = 0
+    try:
+        while finished < workers:
+            item = pages.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Unblock readers if the consumer stopped early
+        stop.set()
+        while any(t.is_alive() for t in threads):
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _pages(supabase, table_name, columns, key, page_size, where, workers):
+    if workers > 1:
+        return iter_pages_parallel(supabase, table_name, columns, key, page_size, where, workers)
+    return iter_pages(supabase, table_name, columns, key, page_size, where)
+
+
+def iter_rows(supabase, table_name, columns="*", key="id", page_size=PAGE_SIZE, where=None, workers=1):
+    """Stream rows one at a time (see iter_pages / iter_pages_parallel)."""
+    for page in _pages(supabase, table_name, columns, key, page_size, where, workers):
+        yield from page
+
+
+def read_dataframe(supabase, table_name, columns="*", key="id", page_size=PAGE_SIZE, where=None,
+                   workers=1, dtypes=None):
+    """
+    Build a DataFrame from a paged read. Each page is converted (and
+    downcast with `dtypes`) as it arrives, so only one page of row dicts is
+    held at a time.
+    """
+    frames = []
+    for page in _pages(supabase, table_name, columns, key, page_size, where, workers):
+        frame = pd.DataFrame(page)
+        if dtypes:
+            frame = frame.astype({c: t for c, t in dtypes.items() if c in frame.columns})
+        frames.append(frame)
+
+    if not frames:
+        names = None if columns.strip() == "*" else [c.strip() for c in _with_key_columns(columns, _key_columns(key)).split(",")]
+        return pd.DataFrame(columns=names)
+    return pd.concat(frames, ignore_index=True)
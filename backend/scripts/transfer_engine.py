@@ -0,0 +1,436 @@
+"""
+Transfer demand: net transfers and ownership per player, and the price
+rises and falls they trigger.
+
+submit_trades records one row per player swapped:
+
+    create table trade (
+      id bigint generated always as identity primary key,
+      squad_id bigint references squad(id) on delete cascade,
+      player_out_id bigint references player(id),
+      player_in_id bigint references player(id),
+      created_at timestamptz default now()
+    );
+
+Each run streams the trades after the last one it counted (keyset pages
+on id), turns every page into per-player in/out counts with np.bincount
+and adds them to a TransferBook: arrays of transfers in, transfers out,
+owners, net transfers since the player's last price move and the price
+steps demand has moved the player so far. A player whose net transfers
+cross PRICE_MOVE_SHARE of all squads rises (or falls) one PRICE_STEP and
+the threshold is taken off the counter.
+
+Identity ids are handed out before commit, so a trade can land below the
+watermark after a run has passed it. Every run re-reads the last
+OVERLAP_IDS ids and counts a trade only if it is above the watermark or
+was missing (pending) last time; ids still missing in the window are kept
+as pending for the next run.
+
+    create table player_transfer_stats (
+      player_id bigint primary key references player(id) on delete cascade,
+      transfers_in int not null default 0,
+      transfers_out int not null default 0,
+      net_since_move int not null default 0,
+      owners int not null default 0,
+      price_steps int not null default 0,   -- demand offset, in PRICE_STEPs
+      ownership_pct numeric,
+      updated_at timestamptz
+    );
+
+    create table transfer_state (
+      id int primary key default 1 check (id = 1),
+      last_trade_id bigint,
+      pending_ids jsonb not null default '[]',
+      updated_at timestamptz
+    );
+
+The touched stats rows and the new watermark are written by one database
+function, so a run either counts its trades and moves its prices or
+leaves no trace:
+
+    create or replace function commit_transfer_run(
+      p_stats jsonb, p_last_trade_id bigint, p_pending_ids jsonb
+    ) returns void language sql as $$
+      insert into player_transfer_stats
+      select * from jsonb_populate_recordset(null::player_transfer_stats, p_stats)
+      on conflict (player_id) do update set
+        transfers_in = excluded.transfers_in,
+        transfers_out = excluded.transfers_out,
+        net_since_move = excluded.net_since_move,
+        owners = excluded.owners,
+        price_steps = excluded.price_steps,
+        ownership_pct = excluded.ownership_pct,
+        updated_at = excluded.updated_at;
+      insert into transfer_state (id, last_trade_id, pending_ids, updated_at)
+      values (1, p_last_trade_id, p_pending_ids, now())
+      on conflict (id) do update set
+        last_trade_id = excluded.last_trade_id,
+        pending_ids = excluded.pending_ids,
+        updated_at = excluded.updated_at;
+    $$;
+
+current_price has one writer, publish_prices, which sets
+max(base_price + price_steps * PRICE_STEP, MIN_PRICE) (base_price null =
+price, moved by reprice) for every player whose stored current_price
+differs. It runs at the end of every run here and after a full
+init_player_prices rebalance. It only reads committed state, so a run
+that dies after the commit is finished by the next one.
+
+Picks made when a squad is created aren't trades, so owners are reseeded
+from squad_player by --refresh-ownership (run once a day).
+
+    python -m backend.scripts.transfer_engine
+    python -m backend.scripts.transfer_engine --rebuild
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from postgrest.types import CountMethod
+
+from backend.scripts.bulk_update import bulk_update_by_value, fetch_player_prices
+from backend.scripts.metrics import incr, timed
+from backend.scripts.pricing_engine import MIN_PRICE, PRICE_STEP
+from backend.scripts.table_reader import iter_pages, iter_pages_parallel, read_dataframe
+
+TRADE_TABLE = "trade"
+STATS_TABLE = "player_transfer_stats"
+STATE_TABLE = "transfer_state"
+TRADE_COLUMNS = "id, player_out_id, player_in_id"
+PRICE_MOVE_SHARE = 0.01     # net transfers, as a share of all squads, that move a price one step
+MIN_MOVE_THRESHOLD = 10     # never move on fewer net transfers than this (small leagues)
+MAX_STEPS_PER_RUN = 1       # most steps a price can move in one run
+OVERLAP_IDS = 1000          # trade ids below the watermark re-read for late commits
+READ_WORKERS = 4
+
+COUNTERS = ("transfers_in", "transfers_out", "net_since_move", "owners", "price_steps")
+
+
+# -----------------------------
+# Book
+# -----------------------------
+
+class TransferBook:
+    """Per-player transfer counters, one int64 array per counter, indexed by player."""
+
+    def __init__(self, stats=None):
+        stats = stats if stats is not None else pd.DataFrame(columns=["player_id", *COUNTERS])
+        self.player_ids = stats["player_id"].to_numpy(dtype="int64")
+        self._order = np.argsort(self.player_ids, kind="stable")
+        self.counters = {
+            name: pd.to_numeric(stats[name], errors="coerce").fillna(0).to_numpy(dtype="int64")
+            for name in COUNTERS
+        }
+        self.touched = np.zeros(len(self.player_ids), dtype=bool)
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def positions(self, player_ids):
+        """Array positions of player_ids, adding players seen for the first time."""
+        player_ids = np.asarray(player_ids, dtype="int64")
+        sorted_ids = self.player_ids[self._order]
+        at = np.searchsorted(sorted_ids, player_ids)
+        found = (
+            (at < len(sorted_ids)) & (sorted_ids[np.minimum(at, len(sorted_ids) - 1)] == player_ids)
+            if len(sorted_ids) else np.zeros(len(player_ids), dtype=bool)
+        )
+
+        if not found.all():
+            new = np.unique(player_ids[~found])
+            self.player_ids = np.concatenate([self.player_ids, new])
+            for name in COUNTERS:
+                self.counters[name] = np.concatenate([self.counters[name], np.zeros(len(new), dtype="int64")])
+            self.touched = np.concatenate([self.touched, np.zeros(len(new), dtype=bool)])
+            self._order = np.argsort(self.player_ids, kind="stable")
+            return self.positions(player_ids)
+
+        return self._order[at]
+
+    def add_trades(self, player_out_ids, player_in_ids):
+        """Count one page of trades. Cost is a searchsorted and two bincounts."""
+        outs = self.positions(player_out_ids)
+        ins = self.positions(player_in_ids)
+        size = len(self)
+        n_out = np.bincount(outs, minlength=size)
+        n_in = np.bincount(ins, minlength=size)
+
+        c = self.counters
+        c["transfers_in"] += n_in
+        c["transfers_out"] += n_out
+        c["net_since_move"] += n_in - n_out
+        c["owners"] += n_in - n_out
+        self.touched |= (n_in > 0) | (n_out > 0)
+
+    def set_owners(self, player_ids, owners):
+        """Replace owner counts (players not listed own nobody)."""
+        at = self.positions(player_ids)
+        counts = np.zeros(len(self), dtype="int64")
+        counts[at] = np.asarray(owners, dtype="int64")
+        self.touched |= counts != self.counters["owners"]
+        self.counters["owners"] = counts
+
+    def price_steps(self, player_ids):
+        """price_steps of player_ids, 0 for players the book hasn't seen."""
+        return (
+            pd.Series(self.counters["price_steps"], index=self.player_ids)
+            .reindex(np.asarray(player_ids, dtype="int64"), fill_value=0)
+            .to_numpy(dtype="int64")
+        )
+
+    def take_price_steps(self, threshold, base_prices, max_steps=MAX_STEPS_PER_RUN):
+        """
+        Whole steps each player's net transfers have earned (+ rise, - fall),
+        at most max_steps either way, added to price_steps; the thresholds
+        spent come off the counter. base_prices is a Series by player id;
+        players without one don't move, and nobody falls below MIN_PRICE,
+        so net transfers are only spent on steps that change a price.
+        Returns (player_ids, steps) of players that move.
+        """
+        c = self.counters
+        net = c["net_since_move"]
+        base = pd.to_numeric(base_prices, errors="coerce").reindex(self.player_ids).to_numpy(dtype="float64")
+        priced = ~np.isnan(base)
+
+        steps = np.clip(np.trunc(net / threshold), -max_steps, max_steps).astype("int64")
+        lowest = np.ceil(np.round((MIN_PRICE - np.where(priced, base, MIN_PRICE)) / PRICE_STEP, 6)).astype("int64")
+        steps = np.maximum(steps, np.minimum(lowest - c["price_steps"], 0))
+        steps[~priced] = 0
+
+        moving = steps != 0
+        net -= steps * threshold
+        c["price_steps"] += steps
+        self.touched |= moving
+        return self.player_ids[moving], steps[moving]
+
+    def ownership_pct(self, total_squads):
+        owners = np.maximum(self.counters["owners"], 0)
+        return np.round(100.0 * owners / total_squads, 2) if total_squads else np.zeros(len(self))
+
+    def touched_rows(self, total_squads):
+        """player_transfer_stats rows for players whose counters changed."""
+        at = np.nonzero(self.touched)[0]
+        pct = self.ownership_pct(total_squads)
+        now = datetime.now(timezone.utc).isoformat()
+        return [
+            {
+                "player_id": int(self.player_ids[i]),
+                **{name: int(self.counters[name][i]) for name in COUNTERS},
+                "ownership_pct": float(pct[i]),
+                "updated_at": now,
+            }
+            for i in at
+        ]
+
+    def mark_written(self):
+        self.touched[:] = False
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+
+def load_book(supabase):
+    return TransferBook(read_dataframe(
+        supabase, STATS_TABLE, "player_id, " + ", ".join(COUNTERS), key="player_id",
+    ))
+
+
+def load_state(supabase):
+    """(last_trade_id, pending_ids), or (None, []) before the first rebuild."""
+    rows = supabase.table(STATE_TABLE).select("last_trade_id, pending_ids").eq("id", 1).execute().data
+    if not rows or rows[0].get("last_trade_id") is None:
+        return None, []
+    return int(rows[0]["last_trade_id"]), [int(i) for i in rows[0].get("pending_ids") or []]
+
+
+def count_squads(supabase):
+    response = supabase.table("squad").select("id", count=CountMethod.exact).limit(1).execute()
+    return response.count or 0
+
+
+def owner_counts(supabase):
+    """Owners per player from squad_player: (player_ids, counts)."""
+    lineups = read_dataframe(supabase, "squad_player", "squad_id, player_id", key=("squad_id", "player_id"))
+    if lineups.empty:
+        return np.array([], dtype="int64"), np.array([], dtype="int64")
+    return np.unique(lineups["player_id"].to_numpy(dtype="int64"), return_counts=True)
+
+
+def load_player_prices(supabase):
+    """DataFrame indexed by player id: base (base_price, else price) and current_price."""
+    players = fetch_player_prices(supabase).set_index("player_id")
+    return pd.DataFrame({
+        "base": players["base_price"].fillna(players["price"]),
+        "current_price": players["current_price"],
+    })
+
+
+def stream_trades(supabase, after=None, workers=READ_WORKERS):
+    """Pages of (ids, player_out_ids, player_in_ids) arrays for trades with id > after."""
+    where = (lambda q: q.gt("id", after)) if after is not None else None
+    pages = (
+        iter_pages_parallel(supabase, TRADE_TABLE, TRADE_COLUMNS, where=where, workers=workers)
+        if workers > 1 else iter_pages(supabase, TRADE_TABLE, TRADE_COLUMNS, where=where)
+    )
+    for page in pages:
+        # Straight to one int64 block; a DataFrame per page costs more than the counting
+        block = np.array([
+            (r["id"], r["player_out_id"], r["player_in_id"])
+            for r in page if r["player_out_id"] is not None and r["player_in_id"] is not None
+        ], dtype="int64").reshape(-1, 3)
+        yield block[:, 0], block[:, 1], block[:, 2]
+
+
+def count_new_trades(supabase, book, last_id, pending_ids, workers=READ_WORKERS):
+    """
+    Add trades above last_id, or listed in pending_ids, to the book. Reads
+    from OVERLAP_IDS below last_id so late commits are seen, and dedupes by
+    id. Returns (trades counted, new last_id, new pending_ids).
+    """
+    pending = np.asarray(pending_ids, dtype="int64")
+    seen, trades, new_last = [], 0, last_id
+    for ids, outs, ins in stream_trades(supabase, max(last_id - OVERLAP_IDS, 0), workers):
+        new = (ids > last_id) | np.isin(ids, pending)
+        book.add_trades(outs[new], ins[new])
+        trades += int(new.sum())
+        seen.append(ids)
+        if len(ids):
+            new_last = max(new_last, int(ids.max()))
+
+    # Ids in the window nobody has counted yet: still pending, or new gaps above the old watermark
+    window = np.arange(max(new_last - OVERLAP_IDS, 0) + 1, new_last + 1, dtype="int64")
+    missing = np.setdiff1d(window, np.concatenate(seen) if seen else [], assume_unique=False)
+    missing = missing[(missing > last_id) | np.isin(missing, pending)]
+    return trades, new_last, [int(i) for i in missing]
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+
+def commit_run(supabase, book, total_squads, last_trade_id, pending_ids):
+    """Write the touched stats and the watermark in one transaction (commit_transfer_run)."""
+    rows = book.touched_rows(total_squads)
+    supabase.rpc("commit_transfer_run", {
+        "p_stats": rows, "p_last_trade_id": int(last_trade_id), "p_pending_ids": list(pending_ids),
+    }).execute()
+    incr(f"rows.{STATS_TABLE}", len(rows))
+    book.mark_written()
+    return len(rows)
+
+
+def publish_prices(supabase, book=None, prices=None):
+    """
+    Set current_price = max(base + price_steps * PRICE_STEP, MIN_PRICE) for
+    every player whose stored current_price differs, one grouped update per
+    price. Returns {player_id: (old, new)} of the prices written.
+    """
+    book = load_book(supabase) if book is None else book
+    prices = load_player_prices(supabase) if prices is None else prices
+    prices = prices[prices["base"].notna()]
+    target = np.round(np.maximum(
+        prices["base"].to_numpy() + book.price_steps(prices.index) * PRICE_STEP, MIN_PRICE,
+    ), 2)
+    current = prices["current_price"].to_numpy()
+    changed = np.isnan(current) | ~np.isclose(current, target)
+
+    moves = {
+        int(p): (float(old), float(new))
+        for p, old, new in zip(prices.index[changed], current[changed], target[changed])
+    }
+    now = datetime.now(timezone.utc).isoformat()
+    updated = bulk_update_by_value(
+        supabase, "player", "current_price", {p: new for p, (_, new) in moves.items()}, extra={"updated_at": now},
+    )
+    incr("rows.player", updated)
+    return moves
+
+
+# -----------------------------
+# Job
+# -----------------------------
+
+def move_threshold(total_squads, share=PRICE_MOVE_SHARE):
+    return max(int(np.ceil(total_squads * share)), MIN_MOVE_THRESHOLD)
+
+
+@timed("transfers")
+def process_transfers(supabase, book=None, refresh_ownership=False, workers=READ_WORKERS):
+    """
+    Count the trades since the last run, move prices whose demand crossed
+    the threshold, commit the counters with the watermark and publish
+    current_price. Pass the same book between calls to skip reloading it.
+    Returns {player_id: (old_price, new_price)} of the current_prices written.
+    """
+    last_id, pending_ids = load_state(supabase)
+    if last_id is None:
+        print("⚠️ No transfer state yet; run transfer_engine --rebuild once before processing trades.")
+        return {}
+    book = load_book(supabase) if book is None else book
+    total_squads = count_squads(supabase)
+
+    trades, new_last, new_pending = count_new_trades(supabase, book, last_id, pending_ids, workers)
+    incr("trades.counted", trades)
+
+    if refresh_ownership:
+        book.set_owners(*owner_counts(supabase))
+
+    prices = load_player_prices(supabase)
+    threshold = move_threshold(total_squads)
+    player_ids, steps = book.take_price_steps(threshold, prices["base"])
+    written = commit_run(supabase, book, total_squads, new_last, new_pending)
+    moves = publish_prices(supabase, book, prices)
+
+    print(f"🔁 Counted {trades} trades: {written} players updated, {int((steps > 0).sum())} rises, "
+          f"{int((steps < 0).sum())} falls (threshold {threshold} of {total_squads} squads); "
+          f"{len(moves)} current prices published, {len(new_pending)} trade ids pending")
+    return moves
+
+
+def rebuild_transfer_stats(supabase, workers=READ_WORKERS):
+    """
+    Recount every trade and reseed owners from squad_player (first run /
+    repair). price_steps are kept, so no price moves. Returns the number of
+    players written.
+    """
+    old = load_book(supabase)
+    book = TransferBook()
+    trades, last_id, pending_ids = count_new_trades(supabase, book, 0, [], workers)
+    book.set_owners(*owner_counts(supabase))
+    book.positions(old.player_ids)
+    book.counters["net_since_move"][:] = 0
+    book.counters["price_steps"][:] = old.price_steps(book.player_ids)
+    book.touched[:] = True
+
+    written = commit_run(supabase, book, count_squads(supabase), last_id, pending_ids)
+    publish_prices(supabase, book)
+    return written
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from backend.scripts.metrics import instrument_supabase, job
+
+    parser = argparse.ArgumentParser(description="Count new trades, update ownership and move prices on demand.")
+    parser.add_argument("--refresh-ownership", action="store_true", help="reseed owner counts from squad_player")
+    parser.add_argument("--rebuild", action="store_true", help="recount every trade; demand price steps are kept")
+    parser.add_argument("--workers", type=int, default=READ_WORKERS, help="concurrent trade readers")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = instrument_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")))
+
+    if args.rebuild:
+        with job("rebuild_transfer_stats"):
+            print(f"✅ Rebuilt transfer stats for {rebuild_transfer_stats(supabase, args.workers)} players.")
+    else:
+        with job("process_transfers"):
+            process_transfers(supabase, refresh_ownership=args.refresh_ownership, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
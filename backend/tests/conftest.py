@@ -0,0 +1,25 @@
+import pytest
+import supabase
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.bench.fixtures import RPCS, build_dataset
+from backend.scripts import metrics, nba_cache
+
+
+@pytest.fixture
+def league(monkeypatch, tmp_path):
+    """The bench's "night" league on a FakeSupabase, with nba_api replayed from fixtures."""
+    cache_dir = str(tmp_path / "fixtures")
+    db = FakeSupabase(build_dataset("night", cache_dir), rpcs=RPCS)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(supabase, "create_client", lambda *args, **kwargs: db)
+    monkeypatch.setattr(nba_cache, "CACHE_MODE", "replay")
+    monkeypatch.setattr(nba_cache, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+
+    from backend.scripts import squad_scoring
+    from backend.scripts.gameweek_calendar import get_calendar
+    get_calendar(db, refresh=True)
+    squad_scoring._boards.clear()
+    return db
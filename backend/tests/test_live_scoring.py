@@ -0,0 +1,37 @@
+from postgrest.exceptions import APIError
+
+from backend.bench.fixtures import build_league
+
+
+def test_failed_new_player_skips_only_their_rows(league, monkeypatch):
+    from backend.scripts import fetch_box
+    from backend.scripts.live_scoring import LiveScorer
+
+    game_id = league.rows("pending_game")[0]["game_id"]
+    game = fetch_box.fetch_box_score(game_id)
+    in_game = {int(p["personId"]) for side in ("homeTeam", "awayTeam") for p in game[side]["players"]}
+    rookie = next(p["id"] for p in build_league()[1] if p["id"] in in_game)
+
+    upsert = league._upsert
+
+    def reject_rookie(query):
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        if query.table_name == "player" and any(r["id"] == rookie for r in rows):
+            raise APIError({"code": "23514", "message": "new row violates check constraint"})
+        return upsert(query)
+
+    monkeypatch.setattr(league, "_upsert", reject_rookie)
+    details = []
+    get_details = fetch_box.get_player_details
+    monkeypatch.setattr(fetch_box, "get_player_details", lambda pid: details.append(pid) or get_details(pid))
+
+    scorer = LiveScorer(league, score_squads=False)
+    written = scorer.apply(game_id, game)
+
+    stored = {r["player_id"] for r in league.rows("player_game") if r["game_id"] == int(game_id)}
+    assert written == len(stored) > 0
+    assert rookie not in stored and rookie in scorer.roster.failed
+
+    # The next poll neither refetches the rookie nor rewrites unchanged rows
+    assert scorer.apply(game_id, game) == 0
+    assert details.count(rookie) == 1
@@ -0,0 +1,117 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.scripts import metrics
+from backend.scripts.player_aggregates import (
+    STATS,
+    WINDOWS,
+    _empty_aggregate,
+    apply_entries,
+    make_entry,
+    update_player_aggregates,
+)
+
+START = date(2025, 10, 21)
+
+
+def near(value):
+    return pytest.approx(value, abs=1e-4)   # aggregates are stored to 4 decimals
+
+
+@pytest.fixture(autouse=True)
+def metrics_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+
+
+def stat_line(rng):
+    return {col: float(rng.randint(0, 40)) for col in STATS.values()}
+
+
+def entry(day, line):
+    return make_entry(line, START + timedelta(days=day), day // 7 + 1)
+
+
+def newest_first(entries):
+    return sorted(entries.items(), key=lambda kv: (kv[1][0], kv[0]), reverse=True)
+
+
+def expected(entries):
+    """The aggregate recomputed from scratch out of {game_id: entry}."""
+    by_date = newest_first(entries)
+    result = {"games_played": len(entries)}
+    for i, name in enumerate(STATS, start=2):
+        total = sum(e[i] for e in entries.values())
+        result[f"sum_{name}"] = near(total)
+        result[f"avg_{name}"] = near(total / len(entries))
+    for n in WINDOWS:
+        window = [e for _, e in by_date[:n]]
+        result[f"last{n}_fp"] = near(sum(e[2] for e in window) / len(window))
+        minutes = 2 + list(STATS).index("minutes")
+        result[f"last{n}_minutes"] = near(sum(e[minutes] for e in window) / len(window))
+    weeks = {}
+    for e in entries.values():
+        weeks[str(e[1])] = weeks.get(str(e[1]), 0.0) + e[2]
+    result["gameweek_fp"] = {w: near(fp) for w, fp in weeks.items()}
+    return result
+
+
+def check(agg, entries):
+    want = expected(entries)
+    assert {k: agg[k] for k in want} == want
+    assert [g for g, _ in agg["recent"]] == [g for g, _ in newest_first(entries)][: max(WINDOWS)]
+
+
+def test_games_arriving_out_of_order_fill_the_recent_window():
+    rng = random.Random(0)
+    entries = {str(22500000 + day): entry(day, stat_line(rng)) for day in range(0, 40, 2)}
+    order = list(entries)
+    rng.shuffle(order)
+
+    agg = _empty_aggregate(1)
+    for i in range(0, len(order), 3):
+        assert apply_entries(agg, {g: entries[g] for g in order[i:i + 3]})
+    check(agg, entries)
+
+
+def test_corrected_stat_lines_move_sums_by_their_delta():
+    rng = random.Random(1)
+    entries = {str(22500000 + day): entry(day, stat_line(rng)) for day in range(15)}
+    agg = _empty_aggregate(1)
+    apply_entries(agg, entries)
+
+    # Rerunning the same games changes nothing
+    assert not apply_entries(agg, dict(entries))
+
+    # A stat correction to one game inside the window and one that has dropped out of it
+    for game_id in ("22500014", "22500001"):
+        entries[game_id] = entry(int(game_id) - 22500000, stat_line(rng))
+        assert apply_entries(agg, {game_id: entries[game_id]})
+    check(agg, entries)
+    assert "22500001" not in [g for g, _ in agg["recent"]]
+
+
+def test_update_player_aggregates_writes_only_changed_players():
+    db = FakeSupabase({"player_aggregate": []})
+    rng = random.Random(2)
+
+    def game(game_id, day, lines):
+        return {
+            "game": {"id": game_id, "date": (START + timedelta(days=day)).isoformat(), "gameweek": 1},
+            "player_games": [{"player_id": p, "game_id": game_id, **line} for p, line in lines.items()],
+        }
+
+    first = game("0022500001", 0, {1: stat_line(rng), 2: stat_line(rng)})
+    assert update_player_aggregates(db, [first]) == 2
+    assert update_player_aggregates(db, [first]) == 0
+
+    second = game("0022500002", 1, {1: stat_line(rng)})
+    assert update_player_aggregates(db, [second]) == 1
+
+    stored = {r["player_id"]: r for r in db.rows("player_aggregate")}
+    line_1 = [first["player_games"][0], second["player_games"][0]]
+    assert stored[1]["games_played"] == 2 and stored[2]["games_played"] == 1
+    assert stored[1]["avg_fp"] == near(sum(r["score"] for r in line_1) / 2)
+    assert [g for g, _ in stored[1]["recent"]] == ["0022500002", "0022500001"]
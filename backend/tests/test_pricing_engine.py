@@ -0,0 +1,124 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from backend.scripts.pricing_engine import (
+    MIN_PRICE,
+    PRICE_STEP,
+    PricingBounds,
+    PricingInputs,
+    PricingParams,
+    SeasonStats,
+    age_weight,
+    ages_on,
+    price_players,
+    round_half,
+    weighted_fantasy,
+)
+
+
+def season(rng, player_ids):
+    n = len(player_ids)
+    avg_fp = rng.gamma(3, 8, n)
+    avg_fp[rng.random(n) < 0.05] = np.nan
+    return SeasonStats(
+        player_id=np.asarray(player_ids, dtype="int64"),
+        avg_fp=avg_fp,
+        avg_minutes=rng.uniform(0, 38, n),
+        games_played=rng.integers(0, 30, n).astype("float64"),
+    )
+
+
+@pytest.fixture
+def inputs():
+    rng = np.random.default_rng(0)
+    ages = rng.integers(19, 40, 700).astype("float64")
+    ages[rng.random(700) < 0.1] = np.nan
+    return PricingInputs(
+        current=season(rng, range(0, 500)),
+        past=season(rng, range(100, 650)),    # 0-99 only play this season, 500-649 only played last season
+        player_id=np.arange(700, dtype="int64"),
+        age=ages,
+    )
+
+
+def test_ages_on_matches_the_calendar():
+    on = date(2025, 10, 1)
+    births = ["2000-10-01", "2000-10-02", "2000-09-30", "1999-02-28", None, "not a date"]
+    expected = [25, 24, 25, 26, np.nan, np.nan]
+    np.testing.assert_array_equal(ages_on(births, on), expected)
+
+
+def test_round_half_ties_to_even_like_round():
+    values = np.arange(-2000, 2000) / 4
+    np.testing.assert_array_equal(round_half(values), [round(v * 2) / 2 for v in values])
+    assert round_half([np.nan])[0] == 0.0
+
+
+def test_age_weight_buckets():
+    params = PricingParams()
+    ages = [19, 20, 23.9, 24, 30, 31, 34, 35, 50, np.nan]
+    weights = params.age_weights
+    expected = [weights[0], weights[1], weights[1], weights[2], weights[3],
+                weights[4], weights[4], weights[5], weights[5], params.unknown_age_weight]
+    np.testing.assert_allclose(age_weight(ages, params), expected)
+
+
+def test_weighted_fantasy_formula():
+    params = PricingParams()
+    avg_fp = np.array([10.0, 20.0, 40.0])
+    minutes = np.array([10.0, 20.0, 40.0])
+    games = np.array([5.0, 10.0, 30.0])
+    weighted, norm = weighted_fantasy(avg_fp, minutes, games, params=params)
+
+    expected = [
+        fp * (params.fp_weight + params.games_weight * min(g / params.full_games, 1) + params.minutes_weight * m / 40)
+        for fp, m, g in zip(avg_fp, minutes, games)
+    ]
+    np.testing.assert_allclose(weighted, expected)
+    np.testing.assert_allclose(norm, (np.array(expected) - expected[0]) / (expected[-1] - expected[0]))
+
+
+def test_prices_are_steps_above_the_minimum_and_hit_the_target_mean(inputs):
+    params = PricingParams()
+    result = price_players(inputs, params)
+
+    np.testing.assert_array_equal(result.player_id, np.arange(650))
+    assert (result.price >= MIN_PRICE).all()
+    np.testing.assert_array_equal(result.price % PRICE_STEP, 0)
+    assert result.raw_price.mean() == pytest.approx(params.avg_budget_per_player)
+
+
+def test_best_current_season_is_the_most_expensive(inputs):
+    base = price_players(inputs, PricingParams())
+    avg_fp = inputs.current.avg_fp.copy()
+    avg_fp[7] = np.nanmax(avg_fp) * 2
+    better = PricingInputs(
+        current=SeasonStats(inputs.current.player_id, avg_fp, inputs.current.avg_minutes, inputs.current.games_played),
+        past=inputs.past, player_id=inputs.player_id, age=inputs.age,
+    )
+    moved = price_players(better, PricingParams())
+    at = np.searchsorted(base.player_id, 7)
+    assert moved.price[at] >= base.price[at]
+    assert moved.price[at] == moved.price.max()
+
+
+def test_subset_priced_on_stored_bounds_matches_the_full_run(inputs):
+    full = price_players(inputs, PricingParams())
+    bounds = PricingBounds.from_dict(full.bounds.to_dict())
+
+    picked = np.arange(0, 700, 7)
+
+    def subset(stats):
+        keep = np.isin(stats.player_id, picked)
+        return SeasonStats(stats.player_id[keep], stats.avg_fp[keep], stats.avg_minutes[keep], stats.games_played[keep])
+
+    keep = np.isin(inputs.player_id, picked)
+    part = price_players(
+        PricingInputs(subset(inputs.current), subset(inputs.past), inputs.player_id[keep], inputs.age[keep]),
+        PricingParams(), bounds,
+    )
+    prices = dict(zip(full.player_id, full.price))
+    assert len(part.player_id) > 50
+    assert all(prices[p] == price for p, price in zip(part.player_id, part.price))
@@ -0,0 +1,28 @@
+import sys
+
+import pandas as pd
+
+from backend.bench.fixtures import game_dates
+
+
+def test_morning_job_scores_the_landed_gameweeks(league, monkeypatch):
+    db = league
+    from backend.daily import process_pending_games
+    from backend.scripts import squad_scoring
+    from backend.scripts.gameweek_calendar import get_calendar
+
+    monkeypatch.setattr(process_pending_games, "create_client", lambda *args, **kwargs: db)
+    gameweek = int(get_calendar(db).lookup(game_dates(1)[0]))
+    squad_scoring.snapshot_lineups(db, gameweek)
+
+    monkeypatch.setattr(sys, "argv", ["process_pending_games.py"])
+    process_pending_games.main()
+
+    landed = [r["game_id"] for r in db.rows("pending_game") if r["processed"]]
+    assert landed and squad_scoring.gameweeks_for_games(db, landed) == [gameweek]
+
+    points = pd.DataFrame(db.rows(squad_scoring.GAMEWEEK_POINTS_TABLE))
+    assert set(points["gameweek"]) == {gameweek}
+    assert len(points) == len({r["squad_id"] for r in db.rows("squad_player")})
+    assert (points["points"] > 0).any()
+    assert len(db.rows(squad_scoring.SEASON_POINTS_TABLE)) == len(points)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from backend.scripts import rank_engine
+from backend.scripts.rank_engine import RankBoard, SortedBuckets
+
+
+def full_ranks(points):
+    """Competition ranks by a full sort: 1 + squads with strictly more points."""
+    ordered = sorted(points.values(), reverse=True)
+    first = {}
+    for i, p in enumerate(ordered):
+        first.setdefault(p, i + 1)
+    return {s: first[p] for s, p in points.items()}
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(monkeypatch):
+    # Small buckets so splits and bucket removal happen in every test
+    monkeypatch.setattr(rank_engine, "BUCKET_SIZE", 4)
+
+
+def test_sorted_buckets_matches_sorted_list():
+    rng = random.Random(0)
+    keys = [rng.randint(0, 50) for _ in range(200)]
+    buckets, reference = SortedBuckets(keys), sorted(keys)
+    for _ in range(2000):
+        if reference and rng.random() < 0.5:
+            key = rng.choice(reference)
+            buckets.remove(key)
+            reference.remove(key)
+        else:
+            key = rng.randint(0, 50)
+            buckets.add(key)
+            reference.append(key)
+            reference.sort()
+        probe, low, high = rng.randint(-1, 51), *sorted(rng.randint(-1, 51) for _ in range(2))
+        assert len(buckets) == len(reference)
+        assert buckets.bisect_left(probe) == sum(k < probe for k in reference)
+        assert list(buckets.irange(low, high)) == [k for k in reference if low < k <= high]
+
+
+def test_sorted_buckets_remove_missing_raises():
+    with pytest.raises(KeyError):
+        SortedBuckets([1, 2]).remove(3)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_moved_ranks_match_full_recompute(seed):
+    rng = random.Random(seed)
+    points = {s: float(rng.randint(0, 30)) for s in range(1, 80)}   # plenty of ties
+    board = RankBoard(points)
+    board.mark_published(board.moved())
+    assert board.published == full_ranks(points)
+
+    next_squad = 80
+    for _ in range(30):
+        updates = {}
+        for _ in range(rng.randint(1, 10)):
+            if rng.random() < 0.1:
+                squad, next_squad = next_squad, next_squad + 1
+            else:
+                squad = rng.choice(list(points))
+            updates[squad] = float(rng.randint(0, 30))
+
+        if rng.random() < 0.5:
+            board.apply(updates)
+        else:
+            board.apply_deltas({s: p - points.get(s, 0.0) for s, p in updates.items()})
+        points.update(updates)
+
+        expected = full_ranks(points)
+        moved = board.moved()
+        assert all(expected[s] == r for s, r in moved.items())
+        board.mark_published(moved)
+        assert board.published == expected
+        assert board.ranks() == expected
+
+
+def test_published_ranks_are_only_rewritten_when_they_move():
+    board = RankBoard({1: 10.0, 2: 5.0, 3: 1.0}, published={1: 1, 2: 2, 3: 3})
+    assert board.moved() == {}
+
+    board.set_points(3, 7.0)
+    assert board.moved() == {2: 3, 3: 2}
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.scripts import metrics, reprice, transfer_engine
+from backend.scripts.player_aggregates import STATS
+from backend.scripts.pricing_engine import MIN_PRICE, PRICE_STEP, PRICING_PARAMS, PricingInputs, price_players
+from backend.scripts.pricing_inputs import fetch_player_birthdates
+from backend.scripts.pricing_state import load_pricing_state, save_pricing_state
+
+PLAYERS = list(range(1, 41))
+RUN_AT = "2025-11-01T06:00:00+00:00"
+LATER = "2025-11-02T06:00:00+00:00"
+
+
+@pytest.fixture(autouse=True)
+def metrics_file(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+
+
+def aggregate(player_id, avg_fp, updated_at=RUN_AT):
+    row = {"player_id": player_id, "games_played": 10, "updated_at": updated_at}
+    row.update({f"avg_{s}": 5.0 for s in STATS})
+    row.update(avg_fp=avg_fp, avg_minutes=min(12.0 + avg_fp / 2, 38.0))
+    return row
+
+
+@pytest.fixture
+def db():
+    """A league priced by a full run (prices, bounds and watermark stored), no demand moves yet."""
+    players = [{"id": p, "birthdate": f"{1990 + p % 12}-03-01", "pos": "G",
+                "price": None, "base_price": None, "current_price": None} for p in PLAYERS]
+    stats = [{"player_id": p, "transfers_in": 0, "transfers_out": 0, "net_since_move": 0,
+              "owners": 0, "price_steps": 0} for p in PLAYERS]
+    db = FakeSupabase({
+        "player": players,
+        "player_aggregate": [aggregate(p, 2.0 * p) for p in PLAYERS],
+        "player_history": [],
+        "player_transfer_stats": stats,
+    })
+
+    current_df = reprice.fetch_changed_averages(db)
+    age_df = fetch_player_birthdates(db)
+    past_df = pd.DataFrame(columns=["player_id", "avg_fp", "avg_minutes", "games_played"])
+    result = price_players(PricingInputs.from_frames(current_df, past_df, age_df), PRICING_PARAMS)
+    for p, price in zip(result.player_id, result.price):
+        db.tables["player"][(int(p),)]["price"] = float(price)
+    db.mark_changed("player")
+    save_pricing_state(db, result.bounds, aggregated_through=RUN_AT)
+    transfer_engine.publish_prices(db)
+    return db
+
+
+def players(db):
+    return {r["id"]: dict(r) for r in db.rows("player")}
+
+
+def test_capped_move():
+    current = [6.0, 6.0, 6.0, np.nan]
+    target = [9.0, 4.0, 6.5, 8.0]
+    np.testing.assert_array_equal(reprice.capped_move(current, target, 1.0), [7.0, 5.0, 6.5, 8.0])
+
+
+def test_nothing_new_changes_nothing(db):
+    before = players(db)
+    assert reprice.reprice_changed_players(db) == 0
+    assert players(db) == before
+
+
+def test_reprice_moves_base_price_toward_the_new_price(db):
+    before = players(db)
+    db.load("player_aggregate", [aggregate(3, 70.0, LATER), aggregate(40, 1.0, LATER), aggregate(20, 40.0, LATER)])
+
+    assert reprice.reprice_changed_players(db) == 2
+    after = players(db)
+    assert after[3]["price"] > before[3]["price"] + reprice.MAX_DAILY_MOVE
+    assert after[3]["base_price"] == before[3]["price"] + reprice.MAX_DAILY_MOVE
+    assert after[40]["base_price"] == before[40]["price"] - reprice.MAX_DAILY_MOVE
+    # 20 was read again but priced the same; nobody else was read at all
+    assert {p: r for p, r in after.items() if p not in (3, 40)} == {
+        p: r for p, r in before.items() if p not in (3, 40)
+    }
+    assert load_pricing_state(db)[1] == LATER
+
+    # current_price is still transfer_engine's to publish
+    assert after[3]["current_price"] == before[3]["current_price"]
+    assert transfer_engine.publish_prices(db)[3] == (before[3]["price"], after[3]["base_price"])
+
+
+def test_current_price_is_base_price_plus_demand(db):
+    db.tables["player_transfer_stats"][(3,)]["price_steps"] = 2
+    db.tables["player_transfer_stats"][(1,)]["price_steps"] = -40
+    db.mark_changed("player_transfer_stats")
+    db.load("player_aggregate", [aggregate(3, 70.0, LATER)])
+    reprice.reprice_changed_players(db)
+    transfer_engine.publish_prices(db)
+
+    p = players(db)
+    assert p[3]["current_price"] == p[3]["base_price"] + 2 * PRICE_STEP
+    assert p[1]["current_price"] == MIN_PRICE
+
+    # The full rebalance drops the form moves, and demand stays on top of the new price
+    from backend.scripts.init_player_prices import reset_base_prices
+    assert reset_base_prices(db) == 1
+    transfer_engine.publish_prices(db)
+    p = players(db)
+    assert p[3]["base_price"] is None
+    assert p[3]["current_price"] == p[3]["price"] + 2 * PRICE_STEP
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from backend.scripts.scoring import SCORING_WEIGHTS, calculate_scores, round_like_python, score_rows
+
+
+def reference_score(stats):
+    """The original row-by-row formula: weighted terms summed in order, then round(x, 1)."""
+    score = 0
+    for stat, weight in SCORING_WEIGHTS:
+        value = stats.get(stat, 0)
+        score = score - value * -weight if weight < 0 else score + value * weight
+    return round(score, 1)
+
+
+def random_stat_lines(rng, n):
+    return pd.DataFrame({stat: rng.integers(0, 40, n) for stat, _ in SCORING_WEIGHTS})
+
+
+def test_round_like_python_matches_builtin_near_ties():
+    rng = np.random.default_rng(0)
+    ties = np.arange(-20000, 20000) / 20 + 0.05   # every .x5 between -1000 and 1000
+    nudged = np.concatenate([np.nextafter(ties, -np.inf), ties, np.nextafter(ties, np.inf)])
+    values = np.concatenate([nudged, rng.uniform(-500, 500, 50000), [0.0, -0.04, 0.04]])
+
+    expected = np.array([round(v, 1) for v in values.tolist()])
+    np.testing.assert_array_equal(round_like_python(values, 1), expected)
+    assert np.array_equal(np.signbit(round_like_python(values, 1)), np.signbit(expected))
+
+
+def test_round_like_python_keeps_non_finite():
+    values = np.array([np.nan, np.inf, -np.inf])
+    np.testing.assert_array_equal(round_like_python(values), values)
+
+
+def test_calculate_scores_matches_scalar_formula():
+    lines = random_stat_lines(np.random.default_rng(1), 20000)
+    expected = [reference_score(row) for row in lines.to_dict("records")]
+
+    scores = calculate_scores(lines)
+    assert scores.index.equals(lines.index)
+    assert scores.tolist() == expected
+
+
+def test_missing_stats_count_as_zero():
+    assert calculate_scores({"points": [10], "rebounds": [5]}).tolist() == [reference_score({"points": 10, "rebounds": 5})]
+
+
+def test_score_rows_writes_in_place():
+    rows = random_stat_lines(np.random.default_rng(2), 50).to_dict("records")
+    expected = [reference_score(r) for r in rows]
+    assert [r["score"] for r in score_rows(rows)] == expected
+    assert score_rows([]) == []
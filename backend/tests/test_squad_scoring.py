@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.scripts.gameweek_calendar import get_calendar
+from backend.scripts.squad_scoring import TRANSFER_HIT, gameweeks_for_games, score_squads, transfer_hits
+
+START = date(2025, 10, 20)   # a Monday
+
+
+@pytest.fixture
+def db():
+    weeks = [
+        {"gameweek": w + 1,
+         "start_date": (START + timedelta(weeks=w)).isoformat(),
+         "end_date": (START + timedelta(weeks=w, days=6)).isoformat()}
+        for w in range(3)
+    ]
+    games = [
+        {"id": "0022500001", "date": START.isoformat()},
+        {"id": "0022500002", "date": (START + timedelta(days=6)).isoformat()},
+        {"id": "0022500003", "date": (START + timedelta(days=8)).isoformat()},
+    ]
+    db = FakeSupabase({"gameweek": weeks, "game": games, "trade": []})
+    get_calendar(db, refresh=True)
+    return db
+
+
+def lineup(squad_id, starters, bench=(), captain=None, vice=None):
+    rows = [
+        {"squad_id": squad_id, "player_id": p, "is_starting": True, "bench_order": None}
+        for p in starters
+    ] + [
+        {"squad_id": squad_id, "player_id": p, "is_starting": False, "bench_order": i + 1}
+        for i, p in enumerate(bench)
+    ]
+    for r in rows:
+        r["is_captain"] = r["player_id"] == captain
+        r["is_vice_captain"] = r["player_id"] == vice
+    return rows
+
+
+def points(lineups, scores):
+    result = score_squads(pd.DataFrame(lineups), pd.Series(scores, dtype="float64"))
+    return dict(zip(result["squad_id"], result["points"]))
+
+
+def test_captain_counts_double_and_the_vice_covers_a_no_show():
+    scores = {1: 10.0, 2: 20.0, 3: 30.0}
+    assert points(lineup(1, [1, 2, 3], captain=3, vice=2), scores) == {1: 90.0}
+    assert points(lineup(1, [1, 2, 4], captain=4, vice=2), scores) == {1: 50.0}
+    assert points(lineup(1, [1, 5, 4], captain=4, vice=5), scores) == {1: 10.0}
+
+
+def test_first_bench_players_who_played_replace_starters_who_didnt():
+    scores = {1: 10.0, 3: 30.0, 5: 5.0, 6: 6.0, 7: 7.0}
+    # 2 and 4 missed; bench 8 didn't play either, so 6 and 5 (in bench order) come on, 7 doesn't.
+    # The captain came off the bench, so they still count double.
+    rows = lineup(1, [1, 2, 3, 4], bench=[8, 6, 5, 7], captain=6, vice=1)
+    assert points(rows, scores) == {1: 10.0 + 30.0 + 5.0 + 6.0 * 2}
+
+    # With every starter playing nobody comes on, and the benched captain hands over to the vice
+    scores[2] = scores[4] = 1.0
+    assert points(rows, scores) == {1: 10.0 * 2 + 1.0 + 30.0 + 1.0}
+
+
+def test_squads_are_scored_independently():
+    scores = {1: 10.0, 2: 20.0}
+    rows = lineup(1, [1], bench=[2]) + lineup(2, [3], bench=[2], captain=3, vice=2)
+    assert points(rows, scores) == {1: 10.0, 2: 40.0}
+    assert score_squads(pd.DataFrame(), pd.Series(dtype="float64")).empty
+
+
+def test_transfer_hits_count_paid_trades_made_before_the_lock(db):
+    def trade(i, squad_id, day, is_free=False):
+        return {"id": i, "squad_id": squad_id, "player_out_id": 1, "player_in_id": 2,
+                "is_free": is_free, "created_at": f"{START + timedelta(days=day)}T12:00:00+00:00"}
+
+    db.load("trade", [
+        trade(1, 1, -3),                   # before gameweek 1 locks
+        trade(2, 1, -2, is_free=True),
+        trade(3, 2, -1),
+        trade(4, 1, 2),                    # made during gameweek 1: counts toward gameweek 2
+        trade(5, 1, 3),
+        trade(6, 2, 5, is_free=True),
+    ])
+
+    assert transfer_hits(db, 1).to_dict() == {1: TRANSFER_HIT, 2: TRANSFER_HIT}
+    assert transfer_hits(db, 2).to_dict() == {1: 2 * TRANSFER_HIT}
+    assert transfer_hits(db, 3).empty
+    assert transfer_hits(db, 99).empty
+
+
+def test_gameweeks_for_games_takes_string_game_ids(db):
+    assert gameweeks_for_games(db, ["0022500001", "0022500002"]) == [1]
+    assert gameweeks_for_games(db, ["0022500003", "0022500001", "0022500003"]) == [1, 2]
+    assert gameweeks_for_games(db, []) == []
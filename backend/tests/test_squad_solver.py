@@ -0,0 +1,60 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.scripts.squad_solver import check_price_balance, solve_squad
+
+POSITIONS = {"Guard": 2, "Forward": 2, "Center": 1}
+
+
+def random_league(rng, per_position=5):
+    rows = []
+    for pos in POSITIONS:
+        for _ in range(per_position):
+            rows.append({"pos": pos, "price": rng.integers(8, 25) * 0.5, "points": round(rng.uniform(0, 50), 1)})
+    return pd.DataFrame(rows)
+
+
+def brute_force(players, budget):
+    """Best points over every legal squad, or None if none is affordable."""
+    price, points = players["price"].to_numpy(), players["points"].to_numpy()
+    per_position = [
+        list(itertools.combinations(np.nonzero(players["pos"].to_numpy() == pos)[0], k))
+        for pos, k in POSITIONS.items()
+    ]
+    best = None
+    for picks in itertools.product(*per_position):
+        chosen = list(itertools.chain(*picks))
+        if price[chosen].sum() <= budget + 1e-9:
+            total = points[chosen].sum()
+            best = total if best is None else max(best, total)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_solve_squad_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    players = random_league(rng)
+    budget = float(rng.integers(30, 70))
+
+    expected = brute_force(players, budget)
+    if expected is None:
+        with pytest.raises(ValueError):
+            solve_squad(players, budget, POSITIONS)
+        return
+
+    solution = solve_squad(players, budget, POSITIONS)
+    assert solution.points == pytest.approx(expected)
+    assert solution.cost <= budget
+    assert solution.players["pos"].value_counts().to_dict() == POSITIONS
+    assert not solution.players.index.duplicated().any()
+
+
+def test_check_price_balance_flags_a_budget_that_doesnt_bind():
+    rng = np.random.default_rng(0)
+    players = random_league(rng)
+    report = check_price_balance(players, budget=1000, positions=POSITIONS)
+    assert report["points"] == pytest.approx(report["unconstrained_points"])
+    assert report["warnings"]
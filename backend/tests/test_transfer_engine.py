@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.bench.fake_supabase import FakeSupabase
+from backend.bench.fixtures import RPCS
+from backend.scripts import metrics, transfer_engine
+from backend.scripts.pricing_engine import MIN_PRICE, PRICE_STEP
+from backend.scripts.transfer_engine import TransferBook
+
+PLAYERS = [1, 2, 3, 4, 5, 6]
+THRESHOLD = 10   # move_threshold of 100 squads
+
+
+@pytest.fixture(autouse=True)
+def metrics_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+
+
+@pytest.fixture
+def db():
+    players = [{"id": p, "price": 6.0, "base_price": None, "current_price": None} for p in PLAYERS]
+    players[0]["price"] = None          # unpriced
+    players[1]["price"] = MIN_PRICE     # already at the floor
+    db = FakeSupabase({"player": players, "squad": [{"id": i} for i in range(1, 101)]}, rpcs=RPCS)
+    transfer_engine.rebuild_transfer_stats(db, workers=1)
+    return db
+
+
+def trade_rows(first_id, pairs):
+    return [
+        {"id": first_id + i, "squad_id": 1, "player_out_id": out, "player_in_id": into}
+        for i, (out, into) in enumerate(pairs)
+    ]
+
+
+def stats(db):
+    return {r["player_id"]: r for r in db.rows("player_transfer_stats")}
+
+
+def current_prices(db):
+    return {r["id"]: r["current_price"] for r in db.rows("player")}
+
+
+def test_take_price_steps_spends_net_only_on_written_moves():
+    book = TransferBook(pd.DataFrame({
+        "player_id": [1, 2, 3, 4],
+        "transfers_in": 0, "transfers_out": 0, "owners": 0,
+        "net_since_move": [25, -25, -25, 25],
+        "price_steps": 0,
+    }))
+    base = pd.Series([6.0, 6.0, MIN_PRICE, np.nan], index=[1, 2, 3, 4])
+    moved, steps = book.take_price_steps(THRESHOLD, base)
+
+    assert dict(zip(moved, steps)) == {1: 1, 2: -1}
+    assert list(book.counters["net_since_move"]) == [15, -15, -25, 25]
+    assert list(book.counters["price_steps"]) == [1, -1, 0, 0]
+
+
+def test_process_transfers_publishes_base_plus_demand(db):
+    pairs = [(5, 3)] * 12 + [(6, 1)] * 12 + [(2, 4)] * 12
+    db.load("trade", trade_rows(1, pairs))
+    transfer_engine.process_transfers(db, workers=1)
+
+    s, prices = stats(db), current_prices(db)
+    assert s[3]["price_steps"] == 1 and s[3]["net_since_move"] == 2
+    assert s[5]["price_steps"] == -1
+    assert s[1]["net_since_move"] == 12 and s[1]["price_steps"] == 0
+    assert s[2]["net_since_move"] == -12 and s[2]["price_steps"] == 0
+    assert prices[3] == 6.0 + PRICE_STEP and prices[5] == 6.0 - PRICE_STEP
+    assert prices[1] is None and prices[2] == MIN_PRICE
+
+    # base_price moves (reprice) carry the demand offset with them
+    db.tables["player"][(3,)]["base_price"] = 7.0
+    db.mark_changed("player")
+    transfer_engine.process_transfers(db, workers=1)
+    assert current_prices(db)[3] == 7.0 + PRICE_STEP
+
+
+def test_process_transfers_is_idempotent(db):
+    db.load("trade", trade_rows(1, [(5, 3)] * 12))
+    transfer_engine.process_transfers(db, workers=1)
+    before = stats(db)
+
+    db.reset_counters()
+    assert transfer_engine.process_transfers(db, workers=1) == {}
+    assert db.rows_written["player"] == 0
+    assert stats(db)[3]["transfers_in"] == before[3]["transfers_in"] == 12
+
+    # A run that committed but died before publishing is finished by the next one
+    db.tables["player"][(3,)]["current_price"] = 6.0
+    db.mark_changed("player")
+    assert transfer_engine.process_transfers(db, workers=1) == {3: (6.0, 6.0 + PRICE_STEP)}
+
+
+def test_late_committed_trades_are_counted_once(db):
+    rows = trade_rows(1, [(5, 3)] * 20)
+    late = [rows.pop(3), rows.pop(10)]
+    db.load("trade", rows)
+    transfer_engine.process_transfers(db, workers=1)
+    assert db.rows("transfer_state")[0]["pending_ids"] == [4, 12]
+    assert stats(db)[3]["transfers_in"] == 18
+
+    db.load("trade", late)
+    transfer_engine.process_transfers(db, workers=1)
+    transfer_engine.process_transfers(db, workers=1)
+    state = db.rows("transfer_state")[0]
+    assert state["last_trade_id"] == 20 and state["pending_ids"] == []
+    assert stats(db)[3]["transfers_in"] == 20